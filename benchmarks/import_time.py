@@ -0,0 +1,65 @@
+"""
+Import time of the entry points, each measured in a fresh interpreter, and
+the heavy dependencies each import pulls in.
+
+    python -m benchmarks.import_time --repeat 5
+
+Entry points should load only what they need up front; explainability,
+MLflow, plotting and Kafka load when the stage that uses them runs.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# The modules under src/ are run as scripts, so they import as top-level modules
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+ENTRY_POINTS = ["main", "serve_model", "batch_score", "kafka_consumer", "dashboard"]
+HEAVY_MODULES = ["pandas", "sklearn", "mlflow", "shap", "lime", "matplotlib", "kafka", "redis"]
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": seconds, "loaded": heavy}}))
+"""
+
+
+def measure_import(module, repeat=3):
+    """
+    :return: {"seconds": fastest of repeat fresh imports, "loaded": heavy
+        modules present afterwards}
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=SRC,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "module": module,
+        "seconds": round(min(run["seconds"] for run in runs), 3),
+        "loaded": runs[-1]["loaded"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entry point import time benchmark")
+    parser.add_argument("--modules", default=",".join(ENTRY_POINTS))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    for module in args.modules.split(","):
+        print(json.dumps(measure_import(module, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+"""
+Times and memory-profiles each pipeline stage on synthetic data, writes the
+results as JSON and compares them against a stored baseline.
+
+    python -m benchmarks.run_benchmarks --rows 100000 --baseline benchmarks/baseline.json
+
+Exits with status 1 when a metric regressed by more than --tolerance.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+
+from benchmarks.synthetic import generate_dataset
+from src.data_cleaner import DataCleaner
+from src.data_loader import (
+    CREDITCARD_SCHEMA,
+    FRAUD_DATA_DATE_COLUMNS,
+    FRAUD_DATA_SCHEMA,
+    DataLoader,
+)
+from src.feature_engineer import FeatureEngineer
+
+STAGES = ["load", "clean", "features", "train", "serve"]
+CATEGORICAL_COLUMNS = ["source", "browser", "sex", "country"]
+COLUMNS_TO_DROP = [
+    "signup_time",
+    "purchase_time",
+    "device_id",
+    "ip_address",
+    "lower_bound_ip_address",
+    "upper_bound_ip_address",
+]
+DEFAULT_MODELS = "Logistic Regression,Random Forest,Hist Gradient Boosting"
+# Baseline values below these are too small to compare reliably
+NOISE_FLOORS = {"seconds": 0.005, "ms": 0.05, "mb": 1.0}
+
+
+def measure(fn, setup=None, repeat=3, memory=True):
+    """
+    Times fn(*setup()) and records its peak traced allocation.
+    :param setup: Optional fn returning the arguments; not timed, so inputs that
+        fn mutates can be copied fresh for every run
+    :param repeat: Timed runs; the fastest is reported
+    :param memory: Run once more under tracemalloc for the peak allocation
+    :return: (result of the last run, {"seconds", "peak_mb"})
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        gc.collect()
+        started = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - started)
+
+    metrics = {"seconds": min(timings)}
+    if memory:
+        # Separate run: tracing slows allocation-heavy code down
+        args = setup() if setup else ()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        metrics["peak_mb"] = peak / 2**20
+    return result, metrics
+
+
+def _with_throughput(metrics, rows):
+    metrics["rows"] = rows
+    metrics["rows_per_s"] = rows / metrics["seconds"] if metrics["seconds"] else 0.0
+    return metrics
+
+
+def bench_load(context, options):
+    paths = context["paths"]
+    results = {}
+    loader = DataLoader(paths["fraud_data"], paths["ip_country"], paths["creditcard"])
+    fraud_df, metrics = measure(loader.load_fraud_data, **options)
+    results["load.fraud_csv"] = _with_throughput(metrics, len(fraud_df))
+    creditcard_df, metrics = measure(loader.load_creditcard_data, **options)
+    results["load.creditcard_csv"] = _with_throughput(metrics, len(creditcard_df))
+
+    cache_dir = os.path.join(context["workdir"], "cache")
+    typed = DataLoader(
+        paths["fraud_data"],
+        paths["ip_country"],
+        paths["creditcard"],
+        typed=True,
+        cache_dir=cache_dir,
+    )
+    # Cold: parse with the explicit schema and write the Parquet cache
+    _, metrics = measure(
+        lambda: typed._load_typed(
+            paths["fraud_data"], FRAUD_DATA_SCHEMA, FRAUD_DATA_DATE_COLUMNS
+        ),
+        setup=lambda: _clear_directory(cache_dir),
+        **options,
+    )
+    results["load.fraud_typed_cold"] = _with_throughput(metrics, len(fraud_df))
+    typed_df, metrics = measure(typed.load_fraud_data, **options)
+    results["load.fraud_typed_cached"] = _with_throughput(metrics, len(typed_df))
+    _, metrics = measure(
+        lambda: typed._load_typed(paths["creditcard"], CREDITCARD_SCHEMA), **options
+    )
+    results["load.creditcard_typed_cached"] = _with_throughput(metrics, len(creditcard_df))
+
+    index_path = os.path.join(context["workdir"], "ip_country.idx")
+    geo_index, metrics = measure(
+        lambda: DataLoader(
+            paths["fraud_data"], paths["ip_country"], paths["creditcard"], index_path
+        ).load_ip_country_index(),
+        setup=lambda: _remove(index_path),
+        **options,
+    )
+    results["load.ip_index_build"] = metrics
+
+    context.update(fraud_df=fraud_df, geo_index=geo_index)
+    return results
+
+
+def bench_clean(context, options):
+    results = {}
+    fraud_df = context["fraud_df"]
+    rows = len(fraud_df)
+    cleaner = DataCleaner()
+    for step in ("handle_missing_values", "remove_duplicates", "correct_data_types"):
+        fraud_df, metrics = measure(
+            getattr(cleaner, step), setup=lambda df=fraud_df: (df.copy(),), **options
+        )
+        results[f"clean.{step}"] = _with_throughput(metrics, rows)
+    context["clean_df"] = fraud_df
+    return results
+
+
+def bench_features(context, options):
+    results = {}
+    df = context["clean_df"]
+    rows = len(df)
+    engineer = FeatureEngineer()
+    df, metrics = measure(
+        engineer.add_time_features, setup=lambda: (context["clean_df"].copy(),), **options
+    )
+    results["features.add_time_features"] = _with_throughput(metrics, rows)
+    df, metrics = measure(
+        lambda frame: engineer.merge_with_geolocation(frame, context["geo_index"]),
+        setup=lambda frame=df: (frame,),
+        **options,
+    )
+    results["features.merge_with_geolocation"] = _with_throughput(metrics, rows)
+    df = FeatureEngineer.drop_unnecessary_columns(df, columns_to_drop=COLUMNS_TO_DROP)
+    df, metrics = measure(
+        lambda frame: engineer.encode_categorical_features(frame, CATEGORICAL_COLUMNS),
+        setup=lambda frame=df: (frame,),
+        **options,
+    )
+    results["features.encode_categorical_features"] = _with_throughput(metrics, rows)
+    context["processed_df"] = df
+    return results
+
+
+def bench_train(context, options):
+    import mlflow
+
+    from src.model_builder import ModelBuilder
+
+    processed = context["processed_df"]
+    sample = processed.sample(n=min(len(processed), options["train_rows"]), random_state=0)
+    data_path = os.path.join(context["workdir"], "train.csv")
+    sample.to_csv(data_path, index=False)
+
+    mlflow.set_tracking_uri(f"sqlite:///{os.path.join(context['workdir'], 'mlflow.db')}")
+    mlflow.set_experiment(
+        experiment_id=mlflow.create_experiment(
+            f"benchmarks-{time.time_ns()}",
+            artifact_location=os.path.join(context["workdir"], "mlruns"),
+        )
+    )
+    builder = ModelBuilder(
+        data_path=data_path,
+        target_column="class",
+        n_jobs=options["n_jobs"],
+        models=options["models"],
+    )
+    builder.split_data(test_size=0.2, random_state=42)
+    fitted = builder.train_and_evaluate()
+
+    results = {}
+    for name, metrics in fitted.items():
+        key = "train." + name.lower().replace(" ", "_")
+        results[key] = {
+            "seconds": metrics["fit_time_s"],
+            "fit_peak_rss_mb": metrics["fit_peak_rss_mb"],
+            "latency_single_ms": metrics["latency_single_ms"],
+            "latency_batch_ms": metrics["latency_batch_ms"],
+            "rows": len(builder.X_train),
+            # Validation metrics; only the selected model is scored on the test split
+            "f1_score": metrics["f1_score"],
+            "pr_auc": metrics["pr_auc"],
+        }
+    return results
+
+
+def _create_serve_app(context):
+    from sklearn.linear_model import LogisticRegression
+
+    from src.feature_transformer import FeatureTransformer
+
+    workdir = context["workdir"]
+    processed = context["processed_df"]
+    transformer = FeatureTransformer.fit(processed, CATEGORICAL_COLUMNS, context["geo_index"])
+    model = LogisticRegression(max_iter=200).fit(
+        processed[transformer.feature_names].to_numpy(dtype=np.float64),
+        processed["class"].to_numpy(),
+    )
+    model_path = os.path.join(workdir, "serve_model.pkl")
+    transformer_path = os.path.join(workdir, "serve_transformer.pkl")
+    joblib.dump(model, model_path)
+    transformer.save(transformer_path)
+
+    from src.serve_model import create_app
+
+    return create_app(
+        {
+            "MODEL_PATH": model_path,
+            "TRANSFORMER_PATH": transformer_path,
+            "LOG_FILE": os.path.join(workdir, "audit.log"),
+            "INSIGHTS_PATH": os.path.join(workdir, "fraud_insights.json"),
+            "JWT_SECRET_KEY": os.getenv("JWT_SECRET_KEY", "benchmark-secret-key-" + "0" * 32),
+            # Nothing listens here, so the cache runs on its local tier only
+            "REDIS_HOST": "127.0.0.1",
+            "REDIS_PORT": 1,
+        }
+    )
+
+
+def _latency_metrics(timings, elapsed):
+    timings = np.asarray(timings) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "requests": len(timings),
+        "requests_per_s": len(timings) / elapsed,
+    }
+
+
+def _post_all(app, headers, path, payloads):
+    client = app.test_client()
+    timings = []
+    for payload in payloads:
+        started = time.perf_counter()
+        response = client.post(path, json=payload, headers=headers)
+        timings.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.data!r}")
+    return timings
+
+
+def bench_serve(context, options):
+    from flask_jwt_extended import create_access_token
+
+    app = _create_serve_app(context)
+    service = app.extensions["scoring"]
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity='benchmark')}"}
+
+    raw = context["fraud_df"].drop(columns=["class"])
+    records = raw.sample(
+        n=min(len(raw), options["requests"] + options["batch_rows"]), random_state=1
+    ).astype(str).to_dict(orient="records")
+    payloads = [{"features": record} for record in records[: options["requests"]]]
+    # Warm up the app, the engine thread and the code paths
+    _post_all(app, headers, "/predict", payloads[:10])
+
+    results = {}
+    service.cache.local.clear()
+    started = time.perf_counter()
+    timings = _post_all(app, headers, "/predict", payloads)
+    results["serve.predict_sequential"] = _latency_metrics(
+        timings, time.perf_counter() - started
+    )
+
+    # Same payloads again: every request is a local cache hit
+    started = time.perf_counter()
+    timings = _post_all(app, headers, "/predict", payloads)
+    results["serve.predict_cached"] = _latency_metrics(timings, time.perf_counter() - started)
+
+    service.cache.local.clear()
+    concurrency = options["concurrency"]
+    shards = [payloads[i::concurrency] for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        timings = [
+            timing
+            for shard_timings in pool.map(
+                lambda shard: _post_all(app, headers, "/predict", shard), shards
+            )
+            for timing in shard_timings
+        ]
+    metrics = _latency_metrics(timings, time.perf_counter() - started)
+    metrics["concurrency"] = concurrency
+    results["serve.predict_concurrent"] = metrics
+
+    batch = records[options["requests"] :] or records
+    started = time.perf_counter()
+    timings = _post_all(app, headers, "/predict/batch", [batch] * 5)
+    elapsed = time.perf_counter() - started
+    results["serve.predict_batch"] = {
+        "p50_ms": float(np.median(timings)) * 1000.0,
+        "rows": len(batch),
+        "rows_per_s": 5 * len(batch) / elapsed,
+    }
+    return results
+
+
+BENCHMARKS = {
+    "load": bench_load,
+    "clean": bench_clean,
+    "features": bench_features,
+    "train": bench_train,
+    "serve": bench_serve,
+}
+
+
+def _clear_directory(path):
+    if os.path.isdir(path):
+        for name in os.listdir(path):
+            os.remove(os.path.join(path, name))
+    return ()
+
+
+def _remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+    return ()
+
+
+def run(paths, workdir, stages=STAGES, **options):
+    """
+    Runs the selected stages in pipeline order. Later stages use the outputs of
+    earlier ones, so the stages they depend on always run.
+    :return: {benchmark name: metrics}
+    """
+    last = max(STAGES.index(stage) for stage in stages)
+    context = {"paths": paths, "workdir": workdir}
+    measure_options = {"repeat": options["repeat"], "memory": options["memory"]}
+    results = {}
+    for stage in STAGES[: last + 1]:
+        stage_options = measure_options if stage in ("load", "clean", "features") else options
+        stage_results = BENCHMARKS[stage](context, stage_options)
+        if stage in stages:
+            results.update(stage_results)
+            for name, metrics in stage_results.items():
+                print(f"{name}: {_format(metrics)}")
+    return results
+
+
+def _format(metrics):
+    return ", ".join(
+        f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+        for key, value in metrics.items()
+    )
+
+
+def _direction(metric):
+    # 1 when higher is better, -1 when lower is better, 0 when not compared
+    if metric.endswith("_per_s"):
+        return 1
+    if metric == "seconds" or metric.endswith("_ms") or metric.endswith("_mb"):
+        return -1
+    return 0
+
+
+def _noise_floor(metric):
+    if metric == "seconds":
+        return NOISE_FLOORS["seconds"]
+    return NOISE_FLOORS[metric.rsplit("_", 1)[-1]]
+
+
+def compare(current, baseline, tolerance=0.2):
+    """
+    Compares two benchmark reports metric by metric.
+    :param tolerance: Allowed relative slowdown (0.2 = 20% slower/larger)
+    :return: List of regressions, each a dict with benchmark, metric, baseline,
+        current and change (relative, signed so that positive is worse)
+    """
+    regressions = []
+    for name, metrics in current["results"].items():
+        baseline_metrics = baseline["results"].get(name, {})
+        for metric, value in metrics.items():
+            direction = _direction(metric)
+            reference = baseline_metrics.get(metric)
+            if not direction or reference is None or not isinstance(value, (int, float)):
+                continue
+            if direction < 0 and reference < _noise_floor(metric):
+                continue
+            if reference <= 0:
+                continue
+            change = (reference - value) / reference * direction
+            if change > tolerance:
+                regressions.append(
+                    {
+                        "benchmark": name,
+                        "metric": metric,
+                        "baseline": reference,
+                        "current": value,
+                        "change": change,
+                    }
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fraud pipeline benchmarks")
+    parser.add_argument("--rows", type=int, default=10_000, help="Fraud data rows")
+    parser.add_argument("--creditcard-rows", type=int, help="Defaults to --rows")
+    parser.add_argument("--ip-ranges", type=int, default=10_000)
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc runs")
+    parser.add_argument("--train-rows", type=int, default=100_000)
+    parser.add_argument("--models", default=DEFAULT_MODELS)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-rows", type=int, default=1000)
+    parser.add_argument("--workdir", help="Keep the generated data here (default: temporary)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="Write the results to --baseline"
+    )
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or tmp
+        started = time.perf_counter()
+        paths = generate_dataset(
+            os.path.join(workdir, "data"), args.rows, args.creditcard_rows, args.ip_ranges
+        )
+        print(f"Generated {args.rows} rows in {time.perf_counter() - started:.1f}s")
+        results = run(
+            paths,
+            workdir,
+            stages=stages,
+            repeat=args.repeat,
+            memory=not args.no_memory,
+            train_rows=args.train_rows,
+            models=[name.strip() for name in args.models.split(",")],
+            n_jobs=args.n_jobs,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            batch_rows=args.batch_rows,
+        )
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "rows": args.rows,
+            "creditcard_rows": args.creditcard_rows or args.rows,
+            "ip_ranges": args.ip_ranges,
+            "stages": stages,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if not args.baseline:
+        return 0
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["meta"].get("rows") != args.rows:
+        print(f"Warning: baseline was recorded with {baseline['meta'].get('rows')} rows")
+    regressions = compare(report, baseline, tolerance=args.tolerance)
+    for regression in regressions:
+        print(
+            "REGRESSION {benchmark} {metric}: {baseline:.4g} -> {current:.4g} "
+            "({change:+.0%})".format(**regression)
+        )
+    if regressions:
+        return 1
+    print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
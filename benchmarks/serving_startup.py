@@ -0,0 +1,117 @@
+"""
+Cold start and per-worker memory of the gunicorn serving mode, with and
+without preload_app (Linux only: memory is read from /proc).
+
+    python -m benchmarks.serving_startup --model models/fraud_detection_model.pkl --workers 4
+
+Cold start is the time from launching gunicorn until every worker has
+answered /ready. Private memory is what each worker does not share with the
+master or its siblings.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def memory_mb(pid):
+    """
+    :return: {"private_mb", "pss_mb"} of one process from /proc/<pid>/smaps_rollup
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    private_kb = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {"private_mb": private_kb / 1024, "pss_mb": fields.get("Pss", 0) / 1024}
+
+
+def _children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def _ready_pid(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return json.load(response)["pid"]
+    except Exception:
+        return None
+
+
+def measure_startup(model_path, workers=2, preload=True, port=5099, timeout_s=120):
+    """
+    Starts gunicorn, waits until each worker has answered /ready, then reads
+    the workers' memory and stops the server.
+    :return: Dict with cold_start_s, private_mb_per_worker and pss_mb_total
+        (master and workers)
+    """
+    env = dict(
+        os.environ,
+        MODEL_PATH=os.path.abspath(model_path),
+        APP_HOST="127.0.0.1",
+        APP_PORT=str(port),
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_PRELOAD=str(preload).lower(),
+        MODEL_RELOAD_INTERVAL_S="0",
+    )
+    env.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-with-at-least-32-bytes")
+    url = f"http://127.0.0.1:{port}/ready"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        ready = set()
+        while len(ready) < workers:
+            if server.poll() is not None:
+                raise RuntimeError("gunicorn exited during startup")
+            if time.perf_counter() - started > timeout_s:
+                raise TimeoutError(f"{len(ready)}/{workers} workers ready after {timeout_s}s")
+            pid = _ready_pid(url)
+            if pid is None:
+                time.sleep(0.05)
+            else:
+                ready.add(pid)
+        cold_start_s = time.perf_counter() - started
+        memory = [memory_mb(pid) for pid in _children(server.pid)]
+        master = memory_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {
+        "preload": preload,
+        "workers": workers,
+        "cold_start_s": round(cold_start_s, 3),
+        "private_mb_per_worker": round(
+            sum(m["private_mb"] for m in memory) / len(memory), 1
+        ),
+        "pss_mb_total": round(master["pss_mb"] + sum(m["pss_mb"] for m in memory), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serving cold start and memory benchmark")
+    parser.add_argument("--model", default="models/fraud_detection_model.pkl")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=5099)
+    args = parser.parse_args(argv)
+
+    for preload in (False, True):
+        print(json.dumps(measure_startup(args.model, args.workers, preload, args.port)))
+
+
+if __name__ == "__main__":
+    main()
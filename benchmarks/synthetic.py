@@ -0,0 +1,169 @@
+"""
+Synthetic datasets shaped like Fraud_Data.csv, IpAddress_to_Country.csv and
+creditcard.csv, for benchmarking at any scale. Rows are generated in chunks
+seeded by (seed, first row), so a file of any size is deterministic and is
+written with bounded memory.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+SOURCES = ["SEO", "Ads", "Direct"]
+SOURCE_WEIGHTS = [0.4, 0.4, 0.2]
+BROWSERS = ["Chrome", "IE", "Safari", "FireFox", "Opera"]
+BROWSER_WEIGHTS = [0.41, 0.24, 0.16, 0.16, 0.03]
+COUNTRIES = [
+    "United States",
+    "China",
+    "Japan",
+    "United Kingdom",
+    "Korea Republic of",
+    "Germany",
+    "France",
+    "Canada",
+    "Brazil",
+    "Italy",
+    "Australia",
+    "Netherlands",
+    "Russian Federation",
+    "India",
+    "Taiwan; Republic of China (ROC)",
+    "Mexico",
+    "Sweden",
+    "Spain",
+    "South Africa",
+    "Switzerland",
+]
+SIGNUP_START = np.datetime64("2015-01-01T00:00:00")
+SIGNUP_SPAN_S = 120 * 24 * 3600
+# Share of fraud-data rows that purchase within seconds of signing up
+QUICK_PURCHASE_RATE = 0.05
+CREDITCARD_FRAUD_RATE = 0.0017
+CHUNK_ROWS = 500_000
+
+
+def _rng(seed, start):
+    return np.random.default_rng([seed, start])
+
+
+def _random_strings(rng, n, length):
+    codes = rng.integers(ord("A"), ord("Z") + 1, size=(n, length), dtype=np.uint8)
+    return codes.view(f"S{length}").ravel().astype(str)
+
+
+def fraud_data(n_rows, seed=0, start=0):
+    """
+    :param n_rows: Number of transactions
+    :param start: Index of the first row, so chunks of one file get distinct ids
+    :return: DataFrame with the Fraud_Data.csv columns
+    """
+    rng = _rng(seed, start)
+    signup = SIGNUP_START + rng.integers(0, SIGNUP_SPAN_S, n_rows).astype("timedelta64[s]")
+    quick = rng.random(n_rows) < QUICK_PURCHASE_RATE
+    delay = np.where(
+        quick,
+        rng.integers(1, 10, n_rows),
+        rng.exponential(50 * 24 * 3600, n_rows).astype(np.int64) + 60,
+    )
+    fraud = np.where(quick, rng.random(n_rows) < 0.9, rng.random(n_rows) < 0.05)
+    return pd.DataFrame(
+        {
+            "user_id": start + rng.permutation(n_rows) + 1,
+            "signup_time": signup,
+            "purchase_time": signup + delay.astype("timedelta64[s]"),
+            "purchase_value": np.clip(rng.lognormal(3.4, 0.5, n_rows), 9, 154).astype(int),
+            "device_id": _random_strings(rng, n_rows, 13),
+            "source": rng.choice(SOURCES, n_rows, p=SOURCE_WEIGHTS),
+            "browser": rng.choice(BROWSERS, n_rows, p=BROWSER_WEIGHTS),
+            "sex": rng.choice(["M", "F"], n_rows),
+            "age": rng.integers(18, 77, n_rows),
+            "ip_address": rng.uniform(0, 2**32 - 1, n_rows),
+            "class": fraud.astype(int),
+        }
+    )
+
+
+def ip_country(n_ranges, seed=0):
+    """
+    :return: DataFrame with the IpAddress_to_Country.csv columns: sorted,
+        non-overlapping ranges covering the IPv4 space
+    """
+    # A stream of its own, distinct from every row chunk
+    rng = np.random.default_rng([seed, 0, 1])
+    bounds = np.unique(rng.integers(1, 2**32 - 1, n_ranges - 1, dtype=np.int64))
+    lower = np.concatenate([[0], bounds])
+    upper = np.concatenate([bounds - 1, [2**32 - 1]])
+    return pd.DataFrame(
+        {
+            "lower_bound_ip_address": lower.astype(np.float64),
+            "upper_bound_ip_address": upper,
+            "country": rng.choice(COUNTRIES, len(lower)),
+        }
+    )
+
+
+def creditcard_data(n_rows, seed=0, start=0):
+    """
+    :return: DataFrame with the creditcard.csv columns (Time, V1-V28, Amount, Class)
+    """
+    rng = _rng(seed, start)
+    fraud = rng.random(n_rows) < CREDITCARD_FRAUD_RATE
+    V = rng.normal(size=(n_rows, 28))
+    # Give fraud rows the kind of shifted components the real PCA features show
+    V[fraud, 13] -= 6.0
+    V[fraud, 16] -= 5.0
+    df = pd.DataFrame(V, columns=[f"V{i}" for i in range(1, 29)])
+    df.insert(0, "Time", np.sort(rng.uniform(0, 172792, n_rows)).round())
+    df["Amount"] = rng.lognormal(3.0, 1.5, n_rows).round(2)
+    df["Class"] = fraud.astype(int)
+    return df
+
+
+def write_csv(generate, path, n_rows, seed=0, chunk_rows=CHUNK_ROWS):
+    """
+    Writes n_rows of generate(n, seed=seed, start=i) to path, chunk by chunk.
+    """
+    for start in range(0, n_rows, chunk_rows):
+        generate(min(chunk_rows, n_rows - start), seed=seed, start=start).to_csv(
+            path, mode="a" if start else "w", header=not start, index=False
+        )
+    return path
+
+
+def generate_dataset(directory, fraud_rows, creditcard_rows=None, ip_ranges=10000, seed=0):
+    """
+    Writes the three raw input files under directory.
+    :return: Dict with the fraud_data, ip_country and creditcard paths
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {
+        "fraud_data": os.path.join(directory, "Fraud_Data.csv"),
+        "ip_country": os.path.join(directory, "IpAddress_to_Country.csv"),
+        "creditcard": os.path.join(directory, "creditcard.csv"),
+    }
+    write_csv(fraud_data, paths["fraud_data"], fraud_rows, seed=seed)
+    ip_country(ip_ranges, seed=seed).to_csv(paths["ip_country"], index=False)
+    write_csv(
+        creditcard_data,
+        paths["creditcard"],
+        fraud_rows if creditcard_rows is None else creditcard_rows,
+        seed=seed,
+    )
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic fraud datasets")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--creditcard-rows", type=int)
+    parser.add_argument("--ip-ranges", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="data/synthetic")
+    args = parser.parse_args()
+    paths = generate_dataset(
+        args.output, args.rows, args.creditcard_rows, args.ip_ranges, args.seed
+    )
+    print(f"Synthetic datasets written to {', '.join(paths.values())}")
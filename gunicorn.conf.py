@@ -0,0 +1,83 @@
+# Gunicorn settings for the fraud scoring API:
+#   gunicorn --config gunicorn.conf.py
+#
+# The app factory loads the model once in the master (preload_app) and workers
+# are forked from it, so they share its memory copy-on-write. The master also
+# watches the model files: it loads a changed bundle once and restarts the
+# workers gracefully (as on SIGHUP), so the new model is shared as well. Workers
+# keep velocity counts in Redis (by default) and flush insights when they exit;
+# only their local cache tier starts empty. Without preload_app each worker
+# watches and reloads the files itself.
+import gc
+import os
+import signal
+
+wsgi_app = "serve_model:create_app()"
+# Pickled artifacts reference the modules under src/ by their top-level names
+pythonpath = "src"
+
+bind = f"{os.getenv('APP_HOST', '0.0.0.0')}:{os.getenv('APP_PORT', 5000)}"
+workers = int(os.getenv("GUNICORN_WORKERS", os.cpu_count() or 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+# Threads let concurrent requests share a worker's micro-batches
+worker_class = "gthread"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG")
+
+reload_interval = float(os.getenv("MODEL_RELOAD_INTERVAL_S", 10))
+
+
+def _freeze_heap():
+    # Move everything loaded so far out of the collector's reach, so garbage
+    # collections in the workers do not write to (and un-share) those pages.
+    # Unfrozen first, so the cycles of a replaced bundle can be collected
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+
+
+def _scoring_service(app):
+    return app.extensions["scoring"]
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    # The app the workers will inherit, built in the master by preload_app
+    service = _scoring_service(server.app.wsgi())
+    _freeze_heap()
+    if reload_interval > 0:
+
+        def restart_workers(bundle):
+            # Runs in the master's watcher thread once the new bundle is loaded;
+            # the arbiter forks fresh workers from it and stops the old ones
+            _freeze_heap()
+            server.log.info(f"Model version {bundle.version} loaded; restarting workers")
+            os.kill(os.getpid(), signal.SIGHUP)
+
+        service.store.subscribe(restart_workers)
+        service.store.watch(reload_interval)
+
+
+def post_worker_init(worker):
+    service = _scoring_service(worker.wsgi)
+    # Start the micro-batch threads and serve a warm-up prediction before
+    # /ready reports this worker healthy
+    service.warm_up()
+    if reload_interval > 0 and not preload_app:
+        # Nothing is shared without preload_app, so each worker polls the model
+        # files and swaps its own bundle in place
+        service.store.watch(reload_interval)
+    # Dashboard counts are merged into the shared insights file periodically
+    service.watch_insights()
+
+
+def worker_exit(server, worker):
+    # Counts recorded since the last periodic flush
+    try:
+        _scoring_service(worker.wsgi).flush_insights()
+    except Exception as e:
+        server.log.error(f"Insights flush failed: {e}")
@@ -0,0 +1,246 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+BACKPRESSURE_POLICIES = ("block", "drop", "sample")
+# Queue fill ratio above which the "sample" policy starts shedding records
+SAMPLE_HIGH_WATER = 0.8
+# Longest a "block" caller waits for queue space before its record is dropped
+BLOCK_TIMEOUT_S = 1.0
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogger:
+    """
+    Non-blocking audit log: callers enqueue structured records and a background
+    thread writes them as JSON lines in batches, with one write and flush per batch.
+
+    The queue is bounded. When it is full, the back-pressure policy decides what
+    happens: "block" waits for space (up to block_timeout), "drop" discards the
+    new record, and "sample" keeps only sample_rate of the records once the
+    queue passes its high-water mark. Files rotate at max_bytes, keeping
+    backup_count old files. Pending records are flushed on close() and at exit.
+
+    Several processes (e.g. gunicorn workers) may share one path: each batch is
+    written, and the file rotated, under an exclusive lock on path + ".lock",
+    and a process reopens the file when another one has rotated it, so no
+    records go to a renamed backup or are lost to concurrent rotations.
+
+    A batch that fails to write is logged, counted in failed and skipped; the
+    file is reopened for the next batch. A writer thread that died anyway is
+    restarted by the next log() call, so a full queue never blocks callers for
+    good.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_queue=10000,
+        batch_size=500,
+        flush_interval=0.5,
+        policy="block",
+        sample_rate=0.1,
+        block_timeout=BLOCK_TIMEOUT_S,
+        max_bytes=50 * 1024 * 1024,
+        backup_count=5,
+    ):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown back-pressure policy: {policy}")
+        self.path = path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.sample_rate = sample_rate
+        self.block_timeout = block_timeout
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        self._pid = None
+        self._worker = None
+        self._closed = False
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        atexit.register(self.close)
+
+    def _running(self):
+        return self._pid == os.getpid() and self._worker.is_alive()
+
+    def _ensure_started(self):
+        if self._running():
+            return
+        with self._lock:
+            if self._running():
+                return
+            if self._pid != os.getpid():
+                # After a fork the parent's queue and writer thread are unusable
+                self._queue = queue.Queue(maxsize=self.max_queue)
+            else:
+                # Same process: the pending records are kept for the new writer
+                logger.error("Audit log writer thread died; restarting it")
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+            self._pid = os.getpid()
+
+    def log(self, message, user="anonymous", ip=None, endpoint=None, **fields):
+        """
+        Enqueues one audit record.
+        :return: True if the record was queued, False if back-pressure discarded it
+        """
+        if self._closed:
+            return False
+        self._ensure_started()
+        record = {
+            "ts": time.time(),
+            "user": user,
+            "ip": ip,
+            "endpoint": endpoint,
+            "message": message,
+            **fields,
+        }
+
+        try:
+            if self.policy == "block":
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                if (
+                    self.policy == "sample"
+                    and self._queue.qsize() >= SAMPLE_HIGH_WATER * self.max_queue
+                    and random.random() >= self.sample_rate
+                ):
+                    self.dropped += 1
+                    return False
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        stream = None
+        try:
+            while True:
+                batch = self._next_batch()
+                stop = any(record is _STOP for record in batch)
+                records = [record for record in batch if record is not _STOP]
+                if records:
+                    written = self.written
+                    try:
+                        stream = self._write(stream, records)
+                    except (OSError, ValueError) as e:
+                        # e.g. a full disk; reopened for the next batch
+                        logger.error(f"Failed to write {len(records)} audit records: {e}")
+                        if self.written == written:
+                            self.failed += len(records)
+                        stream = self._close_quietly(stream)
+                if stop:
+                    return
+        finally:
+            self._close_quietly(stream)
+
+    @staticmethod
+    def _close_quietly(stream):
+        if stream is not None:
+            try:
+                stream.close()
+            except (OSError, ValueError):
+                pass
+        return None
+
+    def _write(self, stream, records):
+        import fcntl
+
+        lines = []
+        for record in records:
+            record["ts"] = datetime.fromtimestamp(record["ts"], timezone.utc).isoformat()
+            lines.append(json.dumps(record, default=str))
+
+        with open(f"{self.path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            stream = self._reopen_if_rotated(stream)
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+            self.written += len(records)
+
+            if self.max_bytes and os.fstat(stream.fileno()).st_size >= self.max_bytes:
+                stream.close()
+                self._rotate()
+                stream = open(self.path, "a", encoding="utf-8")
+        return stream
+
+    def _reopen_if_rotated(self, stream):
+        # Another process may have rotated the file since this one last wrote
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            current = None
+        if (
+            stream is None
+            or current is None
+            or not os.path.samestat(os.fstat(stream.fileno()), current)
+        ):
+            self._close_quietly(stream)
+            stream = open(self.path, "a", encoding="utf-8")
+        return stream
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def close(self, timeout=10):
+        """
+        Flushes every pending record and stops the writer thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._pid == os.getpid() and self._worker is not None:
+            # A live writer is needed to drain the queue
+            self._ensure_started()
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                logger.error("Audit log queue did not drain; pending records are lost")
+                return
+            self._worker.join(timeout=timeout)
+
+    def stats(self):
+        return {
+            "policy": self.policy,
+            "queue_depth": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+        }
@@ -0,0 +1,249 @@
+import argparse
+import collections
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from src.evaluation import model_threshold
+    from src.feature_transformer import FeatureTransformer
+    from src.fraud_insights import FraudInsights
+    from src.model_builder import load_model
+    from src.prediction_io import PredictionWriter, iter_chunks
+    from src.velocity import ChunkedVelocityCounts, velocity_counts, velocity_feature_names
+except ImportError:
+    from evaluation import model_threshold
+    from feature_transformer import FeatureTransformer
+    from fraud_insights import FraudInsights
+    from model_builder import load_model
+    from prediction_io import PredictionWriter, iter_chunks
+    from velocity import ChunkedVelocityCounts, velocity_counts, velocity_feature_names
+
+# Model and transformer loaded once per worker process
+_worker_scorer = {}
+
+
+def load_scorer(model_path, transformer_path=None, threshold=None):
+    """
+    :param threshold: Overrides the threshold saved next to the model
+    """
+    if threshold is None:
+        threshold = model_threshold(model_path)
+    transformer = None
+    if transformer_path and os.path.exists(transformer_path):
+        transformer = FeatureTransformer.load(transformer_path)
+    return {
+        "model": load_model(model_path),
+        "transformer": transformer,
+        "threshold": threshold,
+    }
+
+
+def unwrap_features(df):
+    # Accept the same {"features": {...}} envelope as the /predict endpoint
+    if "features" in df.columns:
+        return pd.DataFrame(df["features"].tolist(), index=df.index)
+    return df
+
+
+def missing_velocity_features(feature_names, df):
+    """
+    :return: Velocity features the model uses that df lacks but can be counted
+        from (empty if df has no purchase_time)
+    """
+    if "purchase_time" not in df.columns:
+        return []
+    return [
+        name
+        for name in velocity_feature_names()
+        if name in feature_names and name not in df.columns
+    ]
+
+
+def _feature_names(model, transformer=None):
+    if transformer is not None:
+        return transformer.feature_names
+    return list(model.feature_names_in_)
+
+
+def score_frame(df, model, transformer=None, threshold=0.5):
+    """
+    Scores a DataFrame of raw transactions with one vectorized predict_proba call.
+    :param df: Raw transactions, either flat columns or a "features" column of dicts
+    :param model: Fitted classifier exposing predict_proba
+    :param transformer: Optional FeatureTransformer; without one the model's own
+        feature columns are read from df
+    :param threshold: Fraud probability at or above which the label is 1
+    :return: Tuple of (labels, probabilities) arrays. Velocity features missing
+        from df are counted over the rows of df; score_file counts them over
+        the whole file instead
+    """
+    df = unwrap_features(df)
+    missing = missing_velocity_features(_feature_names(model, transformer), df)
+    if missing:
+        counts = velocity_counts(df)
+        df = df.assign(**{name: counts[name] for name in missing if name in counts})
+    if transformer is not None:
+        X = transformer.transform_frame(df)
+    else:
+        X = df[list(model.feature_names_in_)].to_numpy(dtype="float64")
+    probabilities = model.predict_proba(X)[:, 1]
+    return (probabilities >= threshold).astype(np.int8), probabilities
+
+
+def _init_worker(model_path, transformer_path, threshold):
+    _worker_scorer.update(load_scorer(model_path, transformer_path, threshold))
+
+
+def _score_chunk(chunk, id_column=None):
+    chunk = unwrap_features(chunk)
+    labels, probabilities = score_frame(chunk, **_worker_scorer)
+    return _predictions_frame(chunk, labels, probabilities, id_column)
+
+
+def _predictions_frame(chunk, labels, probabilities, id_column):
+    predictions = pd.DataFrame({"prediction": labels, "probability": probabilities})
+    if id_column:
+        predictions.insert(0, id_column, chunk[id_column].to_numpy())
+    return predictions
+
+
+def _load_feature_names(model_path, transformer_path=None):
+    if transformer_path and os.path.exists(transformer_path):
+        return FeatureTransformer.load(transformer_path).feature_names
+    return list(getattr(load_model(model_path), "feature_names_in_", []))
+
+
+def _with_velocity(input_path, chunk_size, feature_names):
+    """
+    Yields the unwrapped chunks of input_path. If the model uses velocity
+    features the file lacks, a first pass counts them over the whole file, as
+    training did, and each chunk gets its rows' counts.
+    """
+    first = next(iter_chunks(input_path, chunk_size), None)
+    if first is None or not missing_velocity_features(feature_names, unwrap_features(first)):
+        for chunk in iter_chunks(input_path, chunk_size):
+            yield unwrap_features(chunk)
+        return
+
+    velocity = ChunkedVelocityCounts()
+    for chunk in iter_chunks(input_path, chunk_size):
+        velocity.add(unwrap_features(chunk))
+    counts = velocity.counts()
+    offset = 0
+    for chunk in iter_chunks(input_path, chunk_size):
+        chunk = unwrap_features(chunk)
+        end = offset + len(chunk)
+        missing = missing_velocity_features(feature_names, chunk)
+        chunk = chunk.assign(
+            **{name: counts[name][offset:end] for name in missing if name in counts}
+        )
+        offset = end
+        yield chunk
+
+
+def score_file(
+    input_path,
+    output_path,
+    model_path,
+    transformer_path=None,
+    threshold=None,
+    chunk_size=100_000,
+    workers=1,
+    id_column=None,
+    insights_path=None,
+):
+    """
+    Streams input_path through the model in vectorized chunks and writes predictions.
+    With workers > 1 chunks are scored in a process pool; at most two chunks per
+    worker are in flight, so memory stays bounded and output keeps the input order.
+    :param threshold: Overrides the threshold saved next to the model (0.5 if none)
+    :param insights_path: Optional FraudInsights JSON file that each scored chunk
+        is added to, so the dashboard aggregates include the backfill
+    :return: Number of rows scored
+    """
+    if threshold is None:
+        # Selected at training time and saved with the model, as the API applies it
+        threshold = model_threshold(model_path)
+    writer = PredictionWriter(output_path)
+    chunks = _with_velocity(
+        input_path, chunk_size, _load_feature_names(model_path, transformer_path)
+    )
+    # Merged into the file at the end; servers may be updating it meanwhile
+    insights = FraudInsights() if insights_path else None
+
+    def publish(chunk, predictions):
+        writer.write(predictions)
+        if insights is not None:
+            insights.update_frame(
+                unwrap_features(chunk), labels=predictions["prediction"].to_numpy()
+            )
+
+    def finish():
+        rows = writer.close()
+        if insights is not None:
+            insights.merge_into(insights_path)
+        return rows
+
+    if workers <= 1:
+        scorer = load_scorer(model_path, transformer_path, threshold)
+        for chunk in chunks:
+            chunk = unwrap_features(chunk)
+            labels, probabilities = score_frame(chunk, **scorer)
+            publish(chunk, _predictions_frame(chunk, labels, probabilities, id_column))
+        return finish()
+
+    import multiprocessing
+
+    # Each worker loads the model once; chunks are the unit of work
+    with multiprocessing.Pool(
+        workers,
+        initializer=_init_worker,
+        initargs=(model_path, transformer_path, threshold),
+    ) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.apply_async(_score_chunk, (chunk, id_column))))
+            if len(pending) >= 2 * workers:
+                chunk, result = pending.popleft()
+                publish(chunk, result.get())
+        while pending:
+            chunk, result = pending.popleft()
+            publish(chunk, result.get())
+    return finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk fraud scoring for offline backfills")
+    parser.add_argument("input", help="JSONL/NDJSON, CSV or Parquet file of transactions")
+    parser.add_argument("output", help="CSV, JSONL or Parquet file for the predictions")
+    parser.add_argument("--model", default="models/fraud_detection_model.pkl")
+    parser.add_argument("--transformer", default="models/feature_transformer.pkl")
+    parser.add_argument(
+        "--threshold", type=float, help="Overrides the threshold saved next to the model"
+    )
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--id-column", help="Input column copied to the output")
+    parser.add_argument(
+        "--insights", help="FraudInsights JSON file to add the predictions to"
+    )
+    args = parser.parse_args()
+
+    rows = score_file(
+        args.input,
+        args.output,
+        model_path=args.model,
+        transformer_path=args.transformer,
+        threshold=args.threshold,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        id_column=args.id_column,
+        insights_path=args.insights,
+    )
+    print(f"Scored {rows} transactions into '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
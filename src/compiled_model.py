@@ -0,0 +1,268 @@
+"""
+NumPy-only inference artifacts for the scoring hot path.
+
+compile_model() turns a fitted binary classifier into flat arrays: linear
+coefficients, the nodes of every tree of a tree ensemble, or the weight
+matrices of an MLP. CompiledModel scores them with vectorized array
+operations, so serving needs neither scikit-learn nor pandas, and it skips
+their per-call input validation.
+"""
+
+import json
+import os
+
+import numpy as np
+
+COMPILED_EXTENSION = ".npz"
+INDEX_ARRAYS = ("feature", "left", "right", "roots")
+# Activation functions of MLPClassifier hidden layers
+ACTIVATIONS = {
+    "identity": lambda z: z,
+    "relu": lambda z: np.maximum(z, 0.0),
+    "tanh": np.tanh,
+    "logistic": lambda z: _sigmoid(z),
+}
+
+
+def _sigmoid(z):
+    # exp of non-positive values only, so large |z| cannot overflow
+    e = np.exp(-np.abs(z))
+    return np.where(z >= 0, 1.0 / (1.0 + e), e / (1.0 + e))
+
+
+def _check_binary(model):
+    classes = getattr(model, "classes_", None)
+    if classes is None or len(classes) != 2:
+        raise ValueError(f"Only binary classifiers can be compiled, got {type(model).__name__}")
+
+
+def _tree_nodes(tree, leaf_values):
+    """
+    :param tree: sklearn Tree (estimator.tree_)
+    :param leaf_values: Value to return at each node (only leaves are read)
+    :return: Node arrays in which a leaf points back to itself, which is how
+        the scorer recognizes it
+    """
+    nodes = np.arange(tree.node_count)
+    is_leaf = tree.children_left == -1
+    missing_left = getattr(tree, "missing_go_to_left", None)
+    return {
+        "feature": np.where(is_leaf, 0, tree.feature).astype(np.int32),
+        "threshold": np.where(is_leaf, np.inf, tree.threshold),
+        "left": np.where(is_leaf, nodes, tree.children_left).astype(np.int32),
+        "right": np.where(is_leaf, nodes, tree.children_right).astype(np.int32),
+        "missing_left": (
+            np.zeros(tree.node_count, dtype=bool)
+            if missing_left is None
+            else np.asarray(missing_left, dtype=bool)
+        ),
+        "value": np.asarray(leaf_values, dtype=np.float64),
+        "depth": int(tree.max_depth),
+    }
+
+
+def _hist_predictor_nodes(predictor):
+    nodes = predictor.nodes
+    if nodes["is_categorical"].any():
+        raise TypeError("Categorical splits are not supported by compiled models")
+    positions = np.arange(len(nodes))
+    is_leaf = nodes["is_leaf"].astype(bool)
+    depth = int(nodes["depth"].max())
+    return {
+        "feature": np.where(is_leaf, 0, nodes["feature_idx"]).astype(np.int32),
+        "threshold": np.where(is_leaf, np.inf, nodes["num_threshold"]),
+        "left": np.where(is_leaf, positions, nodes["left"]).astype(np.int32),
+        "right": np.where(is_leaf, positions, nodes["right"]).astype(np.int32),
+        "missing_left": nodes["missing_go_to_left"].astype(bool),
+        "value": nodes["value"].astype(np.float64),
+        "depth": depth,
+    }
+
+
+def _concatenate_trees(trees):
+    # One node array for the whole ensemble; child indices become global
+    offsets = np.cumsum([0] + [len(tree["feature"]) for tree in trees[:-1]])
+    return {
+        "feature": np.concatenate([tree["feature"] for tree in trees]),
+        "threshold": np.concatenate([tree["threshold"] for tree in trees]),
+        "left": np.concatenate(
+            [tree["left"] + offset for tree, offset in zip(trees, offsets)]
+        ).astype(np.int32),
+        "right": np.concatenate(
+            [tree["right"] + offset for tree, offset in zip(trees, offsets)]
+        ).astype(np.int32),
+        "missing_left": np.concatenate([tree["missing_left"] for tree in trees]),
+        "value": np.concatenate([tree["value"] for tree in trees]),
+        "roots": offsets.astype(np.int32),
+        "depth": np.int32(max(tree["depth"] for tree in trees)),
+    }
+
+
+def _classifier_leaf_values(tree):
+    # Share of the positive class at each node (counts or fractions alike)
+    value = tree.value[:, 0, :]
+    totals = value.sum(axis=1)
+    return np.divide(value[:, 1], totals, out=np.zeros(len(value)), where=totals > 0)
+
+
+def compile_model(model):
+    """
+    :param model: Fitted binary LogisticRegression (or other linear model with a
+        logistic link), DecisionTree, RandomForest, ExtraTrees, GradientBoosting,
+        HistGradientBoosting or MLP classifier
+    :return: CompiledModel with the same predict_proba
+    """
+    _check_binary(model)
+    name = type(model).__name__
+    meta = {"source": name, "classes": np.asarray(model.classes_).tolist()}
+    if hasattr(model, "feature_names_in_"):
+        meta["feature_names"] = [str(feature) for feature in model.feature_names_in_]
+    n_features = int(model.n_features_in_)
+
+    if name in ("DecisionTreeClassifier", "RandomForestClassifier", "ExtraTreesClassifier"):
+        estimators = getattr(model, "estimators_", [model])
+        arrays = _concatenate_trees(
+            [_tree_nodes(e.tree_, _classifier_leaf_values(e.tree_)) for e in estimators]
+        )
+        return CompiledModel("forest", arrays, n_features, meta)
+
+    if name == "GradientBoostingClassifier":
+        if model.loss != "log_loss":
+            raise TypeError(f"Unsupported GradientBoosting loss: {model.loss}")
+        arrays = _concatenate_trees(
+            [
+                _tree_nodes(e.tree_, model.learning_rate * e.tree_.value[:, 0, 0])
+                for e in model.estimators_[:, 0]
+            ]
+        )
+        # The prior (init estimator) is constant in X
+        arrays["bias"] = np.float64(model._raw_predict_init(np.zeros((1, n_features)))[0, 0])
+        return CompiledModel("boosting", arrays, n_features, meta)
+
+    if name == "HistGradientBoostingClassifier":
+        arrays = _concatenate_trees(
+            [_hist_predictor_nodes(predictors[0]) for predictors in model._predictors]
+        )
+        arrays["bias"] = np.float64(np.ravel(model._baseline_prediction)[0])
+        return CompiledModel("boosting", arrays, n_features, meta)
+
+    if name == "MLPClassifier":
+        if model.out_activation_ != "logistic":
+            raise TypeError(f"Unsupported MLP output activation: {model.out_activation_}")
+        arrays = {}
+        for i, (weights, bias) in enumerate(zip(model.coefs_, model.intercepts_)):
+            arrays[f"weights_{i}"] = np.asarray(weights, dtype=np.float64)
+            arrays[f"bias_{i}"] = np.asarray(bias, dtype=np.float64)
+        meta["layers"] = len(model.coefs_)
+        meta["activation"] = model.activation
+        return CompiledModel("mlp", arrays, n_features, meta)
+
+    if hasattr(model, "coef_") and hasattr(model, "intercept_") and hasattr(model, "predict_proba"):
+        arrays = {
+            "coef": np.ravel(model.coef_).astype(np.float64),
+            "bias": np.float64(np.ravel(model.intercept_)[0]),
+        }
+        return CompiledModel("linear", arrays, n_features, meta)
+
+    raise TypeError(f"{name} cannot be compiled")
+
+
+class CompiledModel:
+    """
+    Scores a compiled artifact with the predict_proba/predict interface of the
+    estimator it was compiled from (binary classifiers only).
+
+    Tree ensembles are evaluated for all rows and all trees at once: each step
+    of a vectorized gather moves every (row, tree) pair still at a split one
+    level down, and pairs that reached a leaf drop out of the next step.
+    """
+
+    def __init__(self, kind, arrays, n_features, meta=None):
+        self.kind = kind
+        # Node indices are stored as int32 and indexed with as native intp
+        self.arrays = {
+            name: values.astype(np.intp) if name in INDEX_ARRAYS else values
+            for name, values in arrays.items()
+        }
+        self.n_features_in_ = n_features
+        self.meta = meta or {}
+        self.classes_ = np.asarray(self.meta.get("classes", [0, 1]))
+        if "feature_names" in self.meta:
+            self.feature_names_in_ = np.asarray(self.meta["feature_names"], dtype=object)
+
+    def _leaf_values(self, X):
+        a = self.arrays
+        n_features = X.shape[1]
+        n_trees = len(a["roots"])
+        flat_X = X.ravel()
+        node = np.tile(a["roots"], len(X))
+        # Offset of each pair's row in flat_X
+        row_offsets = np.repeat(np.arange(len(X)) * n_features, n_trees)
+        has_nan = np.isnan(flat_X).any()
+        # (row, tree) pairs still at a split; the rest have reached their leaf
+        active = np.arange(len(node))
+        for _ in range(int(a["depth"])):
+            current = node[active]
+            values = flat_X[row_offsets[active] + a["feature"][current]]
+            go_left = values <= a["threshold"][current]
+            if has_nan:
+                go_left = np.where(np.isnan(values), a["missing_left"][current], go_left)
+            current = np.where(go_left, a["left"][current], a["right"][current])
+            node[active] = current
+            active = active[a["left"][current] != current]
+            if not len(active):
+                break
+        return a["value"][node].reshape(len(X), n_trees)
+
+    def decision_function(self, X):
+        """
+        :return: Log-odds of the positive class (probability for "forest")
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got {X.shape[1]}")
+        a = self.arrays
+        if self.kind == "linear":
+            return X @ a["coef"] + a["bias"]
+        if self.kind == "forest":
+            # scikit-learn trees compare float32 inputs against their thresholds
+            return self._leaf_values(X.astype(np.float32).astype(np.float64)).mean(axis=1)
+        if self.kind == "boosting":
+            source = self.meta["source"]
+            if source == "GradientBoostingClassifier":
+                X = X.astype(np.float32).astype(np.float64)
+            return self._leaf_values(X).sum(axis=1) + a["bias"]
+        activation = ACTIVATIONS[self.meta["activation"]]
+        for i in range(self.meta["layers"]):
+            X = X @ a[f"weights_{i}"] + a[f"bias_{i}"]
+            if i < self.meta["layers"] - 1:
+                X = activation(X)
+        return X[:, 0]
+
+    def predict_proba(self, X):
+        score = self.decision_function(X)
+        positive = score if self.kind == "forest" else _sigmoid(score)
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        # Ties go to the first class, as with the argmax in scikit-learn
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(np.int64)]
+
+    def save(self, path):
+        header = {"kind": self.kind, "n_features": self.n_features_in_, "meta": self.meta}
+        arrays = {
+            name: values.astype(np.int32) if name in INDEX_ARRAYS else values
+            for name, values in self.arrays.items()
+        }
+        # Written aside and renamed, so a watching server never loads half a file
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, _header=np.array(json.dumps(header)), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data["_header"]))
+            arrays = {name: data[name] for name in data.files if name != "_header"}
+        return cls(header["kind"], arrays, header["n_features"], header["meta"])
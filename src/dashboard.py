@@ -1,3 +1,5 @@
+import os
+
 import dash
 from dash import dcc, html
 from dash.dependencies import Input, Output
@@ -5,6 +7,9 @@ import requests
 import plotly.express as px
 import pandas as pd
 
+INSIGHTS_URL = os.getenv("INSIGHTS_URL", "http://localhost:5000/fraud-insights")
+REFRESH_INTERVAL_MS = int(os.getenv("DASHBOARD_REFRESH_MS", 10000))
+
 # Initialize Dash app
 app = dash.Dash(__name__)
 
@@ -23,21 +28,31 @@ app.layout = html.Div(
         ),
         # Line Chart for Fraud Trends
         dcc.Graph(id="fraud-trends-chart"),
-        # Bar Chart for Device Analysis
+        # Bar Charts for Device, Country and Browser Analysis
         dcc.Graph(id="device-analysis-chart"),
+        dcc.Graph(id="country-analysis-chart"),
+        dcc.Graph(id="browser-analysis-chart"),
+        dcc.Interval(id="interval-component", interval=REFRESH_INTERVAL_MS),
     ]
 )
 
 
 # Fetch data from Flask API
 def fetch_fraud_insights():
-    response = requests.get("http://localhost:5000/fraud-insights")
+    response = requests.get(INSIGHTS_URL, timeout=5)
     if response.status_code == 200:
         return response.json()
     else:
         raise Exception("Failed to fetch fraud insights")
 
 
+def top_n_chart(rows, label, title):
+    # Rows are the precomputed top-N entries of one dimension
+    top = pd.DataFrame(rows, columns=["key", "transactions", "fraud_cases"])
+    top = top.rename(columns={"key": label, "fraud_cases": "Fraud Cases"})
+    return px.bar(top, x=label, y="Fraud Cases", hover_data=["transactions"], title=title)
+
+
 # Callbacks to update dashboard components
 @app.callback(
     [
@@ -46,12 +61,14 @@ def fetch_fraud_insights():
         Output("fraud-percentage", "children"),
         Output("fraud-trends-chart", "figure"),
         Output("device-analysis-chart", "figure"),
+        Output("country-analysis-chart", "figure"),
+        Output("browser-analysis-chart", "figure"),
     ],
     [Input("interval-component", "n_intervals")],
 )
 def update_dashboard(n):
+    # Only the aggregates maintained by the API are read, never the raw data
     insights = fetch_fraud_insights()
-    fraud_data = pd.read_csv("data/processed_fraud_data.csv")
 
     # Update summary boxes
     total_transactions = f"Total Transactions: {insights['total_transactions']}"
@@ -59,16 +76,21 @@ def update_dashboard(n):
     fraud_percentage = f"Fraud Percentage: {insights['fraud_percentage']}%"
 
     # Update fraud trends chart
-    fraud_trends = pd.Series(insights["fraud_trends"]).reset_index()
+    fraud_trends = pd.Series(insights["fraud_trends"], dtype="int64").reset_index()
     fraud_trends.columns = ["Date", "Fraud Cases"]
     fraud_trends_chart = px.line(
         fraud_trends, x="Date", y="Fraud Cases", title="Fraud Trends Over Time"
     )
 
-    # Update device analysis chart
-    device_analysis = fraud_data.groupby("device_id")["class"].sum().reset_index()
-    device_analysis_chart = px.bar(
-        device_analysis, x="device_id", y="class", title="Fraud Cases by Device"
+    # Update top-N analysis charts
+    device_analysis_chart = top_n_chart(
+        insights["top_devices"], "Device", "Top Devices by Fraud Cases"
+    )
+    country_analysis_chart = top_n_chart(
+        insights["top_countries"], "Country", "Top Countries by Fraud Cases"
+    )
+    browser_analysis_chart = top_n_chart(
+        insights["top_browsers"], "Browser", "Top Browsers by Fraud Cases"
     )
 
     return (
@@ -77,6 +99,8 @@ def update_dashboard(n):
         fraud_percentage,
         fraud_trends_chart,
         device_analysis_chart,
+        country_analysis_chart,
+        browser_analysis_chart,
     )
 
 
@@ -14,10 +14,12 @@ class DataCleaner:
     @staticmethod
     def correct_data_types(df):
         # Correct data types for specific columns
-        if "signup_time" in df.columns:
-            df["signup_time"] = pd.to_datetime(df["signup_time"])
-        if "purchase_time" in df.columns:
-            df["purchase_time"] = pd.to_datetime(df["purchase_time"])
+        # Typed loading already parses timestamps at read time
+        for column in ["signup_time", "purchase_time"]:
+            if column in df.columns and not pd.api.types.is_datetime64_any_dtype(
+                df[column]
+            ):
+                df[column] = pd.to_datetime(df[column])
         if "ip_address" in df.columns:
             df["ip_address"] = df["ip_address"].astype(str)
         return df
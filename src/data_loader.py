@@ -1,16 +1,120 @@
+import hashlib
+import os
+
 import pandas as pd
 
+try:
+    from src.geo_index import GeoIndex
+except ImportError:
+    from geo_index import GeoIndex
+
+# Explicit schemas used by the typed loading mode
+FRAUD_DATA_SCHEMA = {
+    "user_id": "int32",
+    "purchase_value": "float32",
+    "source": "category",
+    "browser": "category",
+    "sex": "category",
+    "age": "int8",
+    "ip_address": "float64",
+    "class": "int8",
+}
+FRAUD_DATA_DATE_COLUMNS = ["signup_time", "purchase_time"]
+
+CREDITCARD_SCHEMA = {
+    "Time": "float32",
+    **{f"V{i}": "float32" for i in range(1, 29)},
+    "Amount": "float32",
+    "Class": "int8",
+}
+
+
 class DataLoader:
-    def __init__(self, fraud_data_path, ip_country_path, creditcard_path):
+    def __init__(
+        self,
+        fraud_data_path,
+        ip_country_path,
+        creditcard_path,
+        ip_index_path=None,
+        typed=False,
+        cache_dir=None,
+    ):
         self.fraud_data_path = fraud_data_path
         self.ip_country_path = ip_country_path
         self.creditcard_path = creditcard_path
+        self.ip_index_path = ip_index_path or os.path.splitext(ip_country_path)[0] + ".idx"
+        self.typed = typed
+        self.cache_dir = cache_dir
 
     def load_fraud_data(self):
+        if self.typed:
+            return self._load_typed(
+                self.fraud_data_path, FRAUD_DATA_SCHEMA, FRAUD_DATA_DATE_COLUMNS
+            )
         return pd.read_csv(self.fraud_data_path)
 
     def load_ip_country_data(self):
         return pd.read_csv(self.ip_country_path)
 
+    def load_ip_country_index(self):
+        """
+        Opens the compiled IP geolocation index, rebuilding it when the CSV is newer.
+        :return: Memory-mapped GeoIndex
+        """
+        if not os.path.exists(self.ip_index_path) or os.path.getmtime(
+            self.ip_index_path
+        ) < os.path.getmtime(self.ip_country_path):
+            return GeoIndex.build(self.ip_country_path, self.ip_index_path)
+        return GeoIndex.open(self.ip_index_path)
+
     def load_creditcard_data(self):
-        return pd.read_csv(self.creditcard_path)
\ No newline at end of file
+        if self.typed:
+            return self._load_typed(self.creditcard_path, CREDITCARD_SCHEMA)
+        return pd.read_csv(self.creditcard_path)
+
+    def _load_typed(self, path, schema, date_columns=None):
+        """
+        Reads a CSV with an explicit schema, parsing datetimes at read time.
+        When cache_dir is set, the typed frame is cached as Parquet keyed by the
+        hash of the source file, and later calls read the cache instead.
+        :param path: Source CSV path
+        :param schema: Mapping of column name to dtype
+        :param date_columns: Columns to parse as datetimes
+        :return: Typed DataFrame
+        """
+        cache_path = None
+        if self.cache_dir:
+            cache_path = os.path.join(
+                self.cache_dir,
+                f"{os.path.splitext(os.path.basename(path))[0]}-"
+                f"{file_digest(path, salt=repr((schema, date_columns)))}.parquet",
+            )
+            if os.path.exists(cache_path):
+                return pd.read_parquet(cache_path)
+
+        df = pd.read_csv(
+            path,
+            dtype=schema,
+            parse_dates=date_columns,
+            date_format="ISO8601" if date_columns else None,
+        )
+
+        if cache_path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.tmp{os.getpid()}"
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, cache_path)
+        return df
+
+
+def file_digest(path, salt="", chunk_size=1 << 20):
+    """
+    Hashes a file's contents, so cache entries follow the data rather than mtimes.
+    :param salt: Extra text mixed into the hash (e.g. the schema the cache was built with)
+    :return: First 16 hex characters of the SHA-1 digest
+    """
+    digest = hashlib.sha1(salt.encode())
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
@@ -0,0 +1,163 @@
+"""
+Probability-based evaluation of binary fraud classifiers.
+
+threshold_curve() sorts the scores once and reads precision, recall, F1,
+alert rate and cost at every distinct threshold from cumulative counts, so a
+full sweep costs one sort instead of one metric call per threshold. PR-AUC
+and ROC-AUC come from the same curve.
+"""
+
+import json
+import os
+
+import numpy as np
+
+
+def _ratio(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=np.float64)
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros_like(numerator),
+        where=np.asarray(denominator) > 0,
+    )
+
+
+def threshold_curve(y_true, scores, fp_cost=1.0, fn_cost=1.0):
+    """
+    :param y_true: 0/1 labels
+    :param scores: Fraud probabilities; a row is alerted when its score is at
+        or above the threshold
+    :param fp_cost: Cost of one false alert
+    :param fn_cost: Cost of one missed fraud
+    :return: Dict of arrays over the distinct scores, highest threshold first:
+        threshold, tp, fp, fn, alerts, alert_rate, precision, recall, f1, fpr, cost
+    """
+    y_true = np.asarray(y_true).astype(bool)
+    scores = np.asarray(scores, dtype=np.float64)
+    order = np.argsort(-scores, kind="stable")
+    sorted_scores = scores[order]
+    # Last position of each run of tied scores: a threshold alerts all its ties
+    ends = np.r_[np.flatnonzero(sorted_scores[1:] != sorted_scores[:-1]), len(scores) - 1]
+    tp = np.cumsum(y_true[order])[ends]
+    alerts = ends + 1
+    fp = alerts - tp
+    positives = int(y_true.sum())
+    negatives = len(y_true) - positives
+    fn = positives - tp
+    return {
+        "threshold": sorted_scores[ends],
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+        "alerts": alerts,
+        "alert_rate": alerts / len(scores),
+        "precision": tp / alerts,
+        "recall": _ratio(tp, positives),
+        "f1": _ratio(2 * tp, alerts + positives),
+        "fpr": _ratio(fp, negatives),
+        "cost": fp_cost * fp + fn_cost * fn,
+    }
+
+
+def pr_auc(curve):
+    """
+    :return: Average precision (step-wise area under the precision-recall curve)
+    """
+    return float(np.sum(np.diff(curve["recall"], prepend=0.0) * curve["precision"]))
+
+
+def roc_auc(curve):
+    """
+    :return: Area under the ROC curve, NaN if only one class is present
+    """
+    if curve["tp"][-1] == 0 or curve["fp"][-1] == 0:
+        return float("nan")
+    tpr = np.r_[0.0, curve["recall"]]
+    fpr = np.r_[0.0, curve["fpr"]]
+    # Trapezoids, so tied scores count half, as in scikit-learn
+    return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2.0))
+
+
+def select_threshold(curve, target_alert_rate=None):
+    """
+    :param target_alert_rate: Largest share of transactions that may be
+        alerted; the highest F1 is picked if None
+    :return: Index into the curve of the operating threshold. Under an alert
+        budget it is the lowest threshold within the budget (the most recall
+        the budget allows), or the highest threshold if even that exceeds it
+    """
+    if target_alert_rate is None:
+        return int(np.argmax(curve["f1"]))
+    within = np.flatnonzero(curve["alert_rate"] <= target_alert_rate)
+    return int(within[-1]) if len(within) else 0
+
+
+def evaluate(y_true, scores, target_alert_rate=None, fp_cost=1.0, fn_cost=1.0, threshold=None):
+    """
+    Scores one model from its predicted probabilities.
+    :param threshold: Fixed operating threshold, e.g. one selected on a
+        validation split; selected on this curve with select_threshold if None
+    :return: (metrics at the operating threshold, threshold_curve)
+    """
+    curve = threshold_curve(y_true, scores, fp_cost=fp_cost, fn_cost=fn_cost)
+    if threshold is None:
+        threshold = curve["threshold"][select_threshold(curve, target_alert_rate)]
+    positives = int(curve["tp"][-1] + curve["fn"][-1])
+    negatives = len(scores) - positives
+    # Lowest curve threshold still at or above it; none if it alerts nothing
+    alerted = np.flatnonzero(curve["threshold"] >= threshold)
+    if len(alerted):
+        i = alerted[-1]
+        tp, fp, alerts = int(curve["tp"][i]), int(curve["fp"][i]), int(curve["alerts"][i])
+    else:
+        tp = fp = alerts = 0
+    fn = positives - tp
+    metrics = {
+        "threshold": float(threshold),
+        "alert_rate": alerts / len(scores),
+        "accuracy": float((tp + negatives - fp) / len(scores)),
+        "precision": float(_ratio(tp, alerts)),
+        "recall": float(_ratio(tp, positives)),
+        "f1_score": float(_ratio(2 * tp, alerts + positives)),
+        "cost": float(fp_cost * fp + fn_cost * fn),
+        "pr_auc": pr_auc(curve),
+        "roc_auc": roc_auc(curve),
+    }
+    return metrics, curve
+
+
+def save_threshold(path, metrics, **info):
+    """
+    Persists an operating threshold with the metrics measured at it.
+    :param metrics: evaluate() metrics of the deployed model
+    :param info: Extra fields to record, e.g. model_name, target_alert_rate
+    """
+    state = dict(info)
+    for key in ("threshold", "alert_rate", "precision", "recall", "f1_score"):
+        state[key] = metrics[key]
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def load_threshold(path):
+    """
+    :return: The threshold saved by save_threshold
+    """
+    with open(path) as f:
+        return float(json.load(f)["threshold"])
+
+
+def model_threshold(model_path, default=0.5):
+    """
+    The operating threshold deployed with a model, as serving reads it.
+    :param model_path: Model file; its threshold is threshold.json in the same directory
+    :return: The saved threshold, or default if there is none
+    """
+    path = os.path.join(os.path.dirname(model_path), "threshold.json")
+    return load_threshold(path) if os.path.exists(path) else default
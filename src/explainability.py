@@ -1,39 +1,306 @@
+import hashlib
+import os
+import pickle
+import warnings
+
+import numpy as np
 import shap
 import lime
 import lime.lime_tabular
 import pandas as pd
 import matplotlib.pyplot as plt
+from joblib import Parallel, delayed
+
+try:
+    from src.prediction_io import PredictionWriter
+    from src.reason_codes import explainer_kind
+except ImportError:
+    from prediction_io import PredictionWriter
+    from reason_codes import explainer_kind
+
+# Rows k-means summarizes into the background set
+KMEANS_MAX_ROWS = 10000
+
+
+def background_data(X, size=100, method="kmeans", random_state=42):
+    """
+    Summarizes the training data into a small background set.
+    :param method: "kmeans" (centroids weighted by cluster size) or "sample"
+        (random rows, equally weighted)
+    :return: (float64 array of at most size rows, weights summing to 1)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    rng = np.random.default_rng(random_state)
+    if len(X) > KMEANS_MAX_ROWS:
+        X = X[rng.choice(len(X), KMEANS_MAX_ROWS, replace=False)]
+    if len(X) > size and method == "kmeans":
+        summary = shap.kmeans(X, size)
+        return summary.data, np.asarray(summary.weights, dtype=np.float64)
+    if len(X) > size:
+        X = X[rng.choice(len(X), size, replace=False)]
+    return X, np.full(len(X), 1.0 / len(X))
+
+
+def _weighted_rows(rows, weights):
+    # Maskers average their rows uniformly; repeating each row in proportion to
+    # its weight (largest remainders, same row count) keeps the weighted mean
+    quotas = weights * len(rows)
+    counts = np.floor(quotas).astype(int)
+    counts[np.argsort(counts - quotas, kind="stable")[: len(rows) - counts.sum()]] += 1
+    return np.repeat(rows, counts, axis=0)
+
+
+def stratified_sample(labels, size, min_per_class=50, random_state=42):
+    """
+    Draws row positions proportionally to each class, keeping at least
+    min_per_class rows of every class so rare fraud cases are represented.
+    :return: Sorted array of row positions
+    """
+    labels = np.asarray(labels)
+    if size >= len(labels):
+        return np.arange(len(labels))
+    rng = np.random.default_rng(random_state)
+    positions = []
+    for label in np.unique(labels):
+        members = np.flatnonzero(labels == label)
+        share = max(round(size * len(members) / len(labels)), min_per_class)
+        positions.append(rng.choice(members, min(share, len(members)), replace=False))
+    return np.sort(np.concatenate(positions))
+
+
+def _positive_class(values):
+    # TreeExplainer returns one set of values per class for some models
+    if isinstance(values, list):
+        return np.asarray(values[-1])
+    values = np.asarray(values)
+    return values[..., -1] if values.ndim == 3 else values
+
+
+def _make_explainer(model, kind, background):
+    """
+    :param background: (rows, weights) from background_data; None for trees
+    """
+    if kind == "tree":
+        # Path-dependent tree SHAP needs no background data
+        return shap.TreeExplainer(model)
+    rows, weights = background
+    if kind == "linear":
+        # Linear SHAP only needs the background's (weighted) moments
+        mean = np.average(rows, axis=0, weights=weights)
+        cov = np.atleast_2d(np.cov(rows, rowvar=False, bias=True, aweights=weights))
+        return shap.LinearExplainer(model, (mean, cov))
+    rows = _weighted_rows(rows, weights)
+    return shap.explainers.Permutation(
+        lambda X: model.predict_proba(X)[:, 1],
+        shap.maskers.Independent(rows, max_samples=len(rows)),
+    )
+
+
+def _explain_chunk(model, kind, background, X):
+    explainer = _make_explainer(model, kind, background)
+    if kind == "permutation":
+        explanation = explainer(X)
+        return explanation.values, float(np.mean(explanation.base_values))
+    values = _positive_class(explainer.shap_values(X))
+    base_value = np.ravel(explainer.expected_value)[-1]
+    return values, float(base_value)
+
+
+def _digest(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, bytes):
+            digest.update(part)
+            continue
+        if isinstance(part, pd.DataFrame):
+            digest.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+            part = list(part.columns)
+        digest.update(repr(part).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+# Training rows LIME derives its sampling statistics from
+LIME_TRAINING_ROWS = 10000
+# LIME explainer and model loaded once per worker process
+_lime_worker = {}
+
+
+def lime_training_sample(X_train, size=LIME_TRAINING_ROWS, random_state=42):
+    X = np.asarray(X_train, dtype=np.float64)
+    if len(X) <= size:
+        return X
+    rng = np.random.default_rng(random_state)
+    return X[rng.choice(len(X), size, replace=False)]
+
+
+def build_lime_explainer(training_data, feature_names, random_state=None):
+    """
+    Builds a LimeTabularExplainer; the feature statistics and quartile bins are
+    computed here once, then reused for every explained instance.
+    """
+    return lime.lime_tabular.LimeTabularExplainer(
+        np.asarray(training_data, dtype=np.float64),
+        feature_names=list(feature_names),
+        class_names=["Not Fraud", "Fraud"],
+        verbose=False,
+        mode="classification",
+        random_state=random_state,
+    )
+
+
+def _init_lime_worker(model, training_data, feature_names, num_features, num_samples, seed):
+    # LIME passes bare arrays to models fitted on DataFrames
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    _lime_worker.update(
+        explainer=build_lime_explainer(training_data, feature_names, seed),
+        model=model,
+        feature_names=feature_names,
+        num_features=num_features,
+        num_samples=num_samples,
+    )
+
+
+def _lime_chunk(instance_ids, rows):
+    explainer = _lime_worker["explainer"]
+    feature_names = _lime_worker["feature_names"]
+    records = []
+    for instance_id, row in zip(instance_ids, rows):
+        # One predict_proba call over all num_samples perturbations of the instance
+        exp = explainer.explain_instance(
+            row,
+            _lime_worker["model"].predict_proba,
+            num_features=_lime_worker["num_features"],
+            num_samples=_lime_worker["num_samples"],
+        )
+        for rank, ((feature, weight), (condition, _)) in enumerate(
+            zip(exp.as_map()[1], exp.as_list())
+        ):
+            records.append(
+                {
+                    "instance": instance_id,
+                    "probability": float(exp.predict_proba[1]),
+                    "local_prediction": float(np.ravel(exp.local_pred)[0]),
+                    "intercept": float(exp.intercept[1]),
+                    "score": float(exp.score),
+                    "rank": rank,
+                    "feature": feature_names[feature],
+                    "condition": condition,
+                    "weight": float(weight),
+                }
+            )
+    return pd.DataFrame(records)
+
+
+def _lime_chunk_args(chunk):
+    return _lime_chunk(*chunk)
 
 
 class Explainability:
-    def __init__(self, model, X_train, X_test, feature_names):
+    def __init__(self, model, X_train, X_test, feature_names, y_test=None):
+        """
+        :param y_test: Optional labels used to stratify the SHAP sample; the
+            model's predictions are used when they are not given
+        """
         self.model = model
         self.X_train = X_train
         self.X_test = X_test
         self.feature_names = feature_names
+        self.y_test = y_test
 
-    def explain_with_shap(self):
-        # Initialize SHAP explainer
-        # Generate SHAP values
-        explainer = shap.Explainer(self.model)
-        shap_values = explainer(self.X_train)
-        shap_values = explainer(self.X_test)
+    def compute_shap_values(
+        self,
+        sample_size=2000,
+        background_size=100,
+        background_method="kmeans",
+        n_jobs=-1,
+        chunk_size=500,
+        cache_dir="shap_cache",
+        random_state=42,
+    ):
+        """
+        Computes SHAP values for the positive class on a stratified sample of X_test.
+        Chunks of the sample are explained in parallel processes. Results are cached
+        in cache_dir keyed by the model, the data and these settings, so plots can
+        be regenerated without recomputation.
+        :return: shap.Explanation for the sampled rows
+        """
+        kind = explainer_kind(self.model)
+        cache_path = None
+        if cache_dir:
+            key = _digest(
+                pickle.dumps(self.model),
+                self.X_train,
+                self.X_test,
+                None if self.y_test is None else list(self.y_test),
+                (kind, sample_size, background_size, background_method, random_state),
+                # So values from before the background kept its k-means weights
+                # are not reused
+                "weighted-background",
+            )
+            cache_path = os.path.join(cache_dir, f"shap-{key}.npz")
+            if os.path.exists(cache_path):
+                with np.load(cache_path) as cached:
+                    return self._explanation(
+                        cached["values"], float(cached["base_value"]), cached["positions"]
+                    )
+
+        labels = self.y_test if self.y_test is not None else self.model.predict(self.X_test)
+        positions = stratified_sample(labels, sample_size, random_state=random_state)
+        X = self.X_test.iloc[positions].to_numpy(dtype=np.float64)
+        background = (
+            None
+            if kind == "tree"
+            else background_data(self.X_train, background_size, background_method, random_state)
+        )
 
-        # Create a force plot
-        shap.plots.force(explainer.expected_value[0], shap_values[0])
+        chunks = [X[i : i + chunk_size] for i in range(0, len(X), chunk_size)]
+        if len(chunks) > 1 and n_jobs != 1:
+            outputs = Parallel(n_jobs=n_jobs)(
+                delayed(_explain_chunk)(self.model, kind, background, chunk) for chunk in chunks
+            )
+        else:
+            outputs = [_explain_chunk(self.model, kind, background, chunk) for chunk in chunks]
+        values = np.vstack([chunk_values for chunk_values, _ in outputs])
+        base_value = outputs[0][1]
+
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.tmp{os.getpid()}.npz"
+            np.savez_compressed(
+                tmp_path, values=values, base_value=base_value, positions=positions
+            )
+            os.replace(tmp_path, cache_path)
+        return self._explanation(values, base_value, positions)
+
+    def _explanation(self, values, base_value, positions):
+        return shap.Explanation(
+            values=values,
+            base_values=np.full(len(values), base_value),
+            data=self.X_test.iloc[positions].to_numpy(),
+            feature_names=list(self.feature_names),
+        )
+
+    def explain_with_shap(self, **options):
+        """
+        Saves SHAP summary, force and dependence plots for the sampled test rows.
+        :param options: Passed to compute_shap_values
+        :return: shap.Explanation the plots were drawn from
+        """
+        shap_values = self.compute_shap_values(**options)
+        X_sample = pd.DataFrame(shap_values.data, columns=shap_values.feature_names)
 
         # Summary Plot
         shap.summary_plot(
-            shap_values, self.X_test, feature_names=self.feature_names, show=False
+            shap_values.values, X_sample, feature_names=self.feature_names, show=False
         )
         plt.savefig("shap_summary_plot.png")
         plt.close()
 
         # Force Plot (for the first instance)
         shap.force_plot(
-            explainer.expected_value,
-            shap_values[0],
-            self.X_test.iloc[0],
+            shap_values.base_values[0],
+            shap_values.values[0],
+            X_sample.iloc[0],
             feature_names=self.feature_names,
             show=False,
             matplotlib=True,
@@ -43,31 +310,26 @@ class Explainability:
 
         # Dependence Plot (for the most important feature)
         shap.dependence_plot(
-            shap_values.abs.mean(0).argsort[-1],
+            int(np.abs(shap_values.values).mean(0).argmax()),
             shap_values.values,
-            self.X_test,
+            X_sample,
             feature_names=self.feature_names,
             show=False,
         )
         plt.savefig("shap_dependence_plot.png")
         plt.close()
+        return shap_values
 
-    def explain_with_lime(self):
+    def explain_with_lime(self, instance_idx=0, num_features=10, num_samples=5000):
         # Initialize LIME explainer
-        explainer = lime.lime_tabular.LimeTabularExplainer(
-            self.X_train.values,
-            feature_names=self.feature_names,
-            class_names=["Not Fraud", "Fraud"],
-            verbose=True,
-            mode="classification",
-        )
+        explainer = build_lime_explainer(self.X_train, self.feature_names)
 
         # Explain a single prediction
-        instance_idx = 0
         exp = explainer.explain_instance(
             self.X_test.iloc[instance_idx].values,
             self.model.predict_proba,
-            num_features=len(self.feature_names),
+            num_features=num_features,
+            num_samples=num_samples,
         )
         exp.save_to_file("lime_explanation.html")
 
@@ -75,3 +337,53 @@ class Explainability:
         exp.as_pyplot_figure()
         plt.savefig("lime_feature_importance_plot.png")
         plt.close()
+
+    def explain_many_with_lime(
+        self,
+        output_path,
+        indices=None,
+        num_features=10,
+        num_samples=1000,
+        workers=1,
+        chunk_size=50,
+        random_state=42,
+    ):
+        """
+        Explains many test instances with LIME across a process pool and writes the
+        feature weights to one JSONL/CSV/Parquet file, one row per (instance, feature).
+        :param indices: Row positions in X_test to explain; all rows if None
+        :param num_samples: Perturbations per instance
+        :return: Number of instances explained
+        """
+        X = self.X_test if indices is None else self.X_test.iloc[indices]
+        rows = X.to_numpy(dtype=np.float64)
+        instance_ids = list(X.index)
+        chunks = [
+            (instance_ids[i : i + chunk_size], rows[i : i + chunk_size])
+            for i in range(0, len(rows), chunk_size)
+        ]
+        initargs = (
+            self.model,
+            lime_training_sample(self.X_train, random_state=random_state),
+            list(self.feature_names),
+            num_features,
+            num_samples,
+            random_state,
+        )
+
+        writer = PredictionWriter(output_path)
+        if workers <= 1:
+            _init_lime_worker(*initargs)
+            for chunk in chunks:
+                writer.write(_lime_chunk(*chunk))
+        else:
+            import multiprocessing
+
+            # Each worker builds its LIME explainer once; chunks are the unit of work
+            with multiprocessing.Pool(
+                workers, initializer=_init_lime_worker, initargs=initargs
+            ) as pool:
+                for weights in pool.imap(_lime_chunk_args, chunks):
+                    writer.write(weights)
+        writer.close()
+        return len(rows)
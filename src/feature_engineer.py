@@ -1,5 +1,13 @@
+import numpy as np
 import pandas as pd
 
+try:
+    from src.geo_index import GeoIndex
+    from src.velocity import VELOCITY_KEYS, VELOCITY_WINDOWS, velocity_counts
+except ImportError:
+    from geo_index import GeoIndex
+    from velocity import VELOCITY_KEYS, VELOCITY_WINDOWS, velocity_counts
+
 
 class FeatureEngineer:
     @staticmethod
@@ -10,26 +18,110 @@ class FeatureEngineer:
         return df
 
     @staticmethod
-    def merge_with_geolocation(fraud_df, ip_country_df):
-        # Convert IP addresses to integers
-        fraud_df["ip_address_int"] = fraud_df["ip_address"].apply(
-            lambda x: int("".join([f"{int(octet):08b}" for octet in x.split(".")]), 2)
+    def add_signup_to_purchase(df):
+        if "signup_time" in df.columns and "purchase_time" in df.columns:
+            df["signup_to_purchase_s"] = (
+                df["purchase_time"] - df["signup_time"]
+            ).dt.total_seconds()
+        return df
+
+    @staticmethod
+    def add_velocity_features(df, keys=VELOCITY_KEYS, windows=VELOCITY_WINDOWS):
+        """
+        Adds transactions per key in each trailing window, e.g. device_id_txn_1h.
+        Streaming scoring computes the same values with a VelocityTracker.
+        :param df: DataFrame with purchase_time and any of the key columns
+        :param keys: Entity columns to count transactions for
+        :param windows: Mapping of window label to length in seconds
+        :return: DataFrame with one column per (key, window)
+        """
+        if "purchase_time" not in df.columns:
+            return df
+        for name, values in velocity_counts(df, keys, windows).items():
+            df[name] = values
+        return df
+
+    @staticmethod
+    def ip_to_int(ip_series):
+        """
+        Converts IPv4 addresses to their integer value without a Python-level loop.
+        :param ip_series: Series of dotted-quad strings, integers or float-encoded IPs
+        :return: float64 array of integer IP values, NaN where the value is malformed
+        """
+        # Numeric values (and numeric strings such as "732758368.79972")
+        ip_int = np.floor(
+            pd.to_numeric(ip_series, errors="coerce").to_numpy(dtype="float64")
         )
 
-        # Merge datasets based on IP address range
-        merged_df = pd.merge(
-            fraud_df,
-            ip_country_df,
-            how="left",
-            left_on="ip_address_int",
-            right_on="lower_bound_ip_address",
+        # Dotted-quad strings
+        if not pd.api.types.is_numeric_dtype(ip_series):
+            octets = (
+                ip_series.astype(str)
+                .str.extract(r"^\s*(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})\s*$")
+                .astype("float64")
+                .to_numpy()
+            )
+            valid_quad = (octets <= 255).all(axis=1)
+            dotted = octets @ np.array([2.0**24, 2.0**16, 2.0**8, 1.0])
+            ip_int = np.where(np.isnan(ip_int) & valid_quad, dotted, ip_int)
+
+        ip_int[(ip_int < 0) | (ip_int > 2**32 - 1)] = np.nan
+        return ip_int
+
+    @staticmethod
+    def merge_with_geolocation(fraud_df, ip_country):
+        """
+        Adds the country of each IP address using an interval join on the IP ranges.
+        :param fraud_df: Input DataFrame with an ip_address column
+        :param ip_country: IP-to-country DataFrame or a prebuilt GeoIndex
+        :return: DataFrame with ip_address_int, range bounds and country columns
+        """
+        geo_index = (
+            ip_country
+            if isinstance(ip_country, GeoIndex)
+            else GeoIndex.from_frame(ip_country)
+        )
+
+        # Convert IP addresses to integers
+        fraud_df["ip_address_int"] = FeatureEngineer.ip_to_int(fraud_df["ip_address"])
+
+        # Match each IP to the [lower, upper] range containing it
+        pos = geo_index.lookup_positions(fraud_df["ip_address_int"].to_numpy())
+        matched = pos >= 0
+        safe_pos = np.clip(pos, 0, None)
+
+        merged_df = fraud_df.copy()
+        merged_df["lower_bound_ip_address"] = np.nan
+        merged_df["upper_bound_ip_address"] = np.nan
+        if len(geo_index):
+            merged_df["lower_bound_ip_address"] = np.where(
+                matched, geo_index.lower_bounds[safe_pos], np.nan
+            )
+            merged_df["upper_bound_ip_address"] = np.where(
+                matched, geo_index.upper_bounds[safe_pos], np.nan
+            )
+        merged_df["country"] = geo_index.lookup_many(
+            merged_df["ip_address_int"].to_numpy()
         )
-        merged_df["country"] = merged_df["country"].fillna("Unknown")
         return merged_df
 
     @staticmethod
-    def encode_categorical_features(df, categorical_columns):
-        # One-hot encoding for categorical features
+    def encode_categorical_features(df, categorical_columns, categories=None):
+        """
+        One-hot encodes categorical features.
+        :param df: Input DataFrame
+        :param categorical_columns: Columns to encode
+        :param categories: Optional mapping of column to its full vocabulary, so
+            every batch produces the same dummy columns regardless of the values it holds
+        :return: Encoded DataFrame
+        """
+        if categories:
+            df = df.copy()
+            for column in categorical_columns:
+                if column in categories:
+                    df[column] = pd.Categorical(
+                        df[column].astype(str), categories=categories[column]
+                    )
         return pd.get_dummies(df, columns=categorical_columns, drop_first=True)
 
     @staticmethod
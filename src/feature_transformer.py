@@ -0,0 +1,194 @@
+import math
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+try:
+    from src.geo_index import parse_ip
+except ImportError:
+    from geo_index import parse_ip
+
+
+def _parse_timestamp(value):
+    if isinstance(value, datetime):
+        return value
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _to_float(value):
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class FeatureTransformer:
+    """
+    Turns raw transaction dicts into model feature rows, with no pandas involved
+    (transform_frame is the vectorized path for bulk DataFrames).
+
+    Fitted from the columns the training pipeline produced, so the serving path
+    builds exactly the features (and column order) the model was trained on.
+    Categories that were unseen at training time, or dropped by drop_first,
+    encode as all zeros just like in the training data.
+    """
+
+    def __init__(self, feature_names, categorical_columns, geo_index):
+        self.feature_names = list(feature_names)
+        self.categorical_columns = list(categorical_columns)
+        self.geo_index = geo_index
+        self._compile()
+
+    @classmethod
+    def fit(cls, processed_df, categorical_columns, geo_index, target_column="class"):
+        """
+        Captures the column order and category vocabularies of the processed training data.
+        :param processed_df: Output of the preprocessing pipeline (or just its columns)
+        :param categorical_columns: Columns that were one-hot encoded
+        :param geo_index: GeoIndex used for the country feature
+        :param target_column: Label column to leave out of the features
+        :return: Fitted FeatureTransformer
+        """
+        columns = getattr(processed_df, "columns", processed_df)
+        feature_names = [column for column in columns if column != target_column]
+        return cls(feature_names, categorical_columns, geo_index)
+
+    def _compile(self):
+        # Position of every dummy column, keyed by (source column, category value)
+        self._dummy_positions = {column: {} for column in self.categorical_columns}
+        self._numeric_positions = []
+        for position, name in enumerate(self.feature_names):
+            for column in self.categorical_columns:
+                prefix = f"{column}_"
+                if name.startswith(prefix):
+                    self._dummy_positions[column][name[len(prefix) :]] = position
+                    break
+            else:
+                self._numeric_positions.append((position, name))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_dummy_positions"], state["_numeric_positions"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    def _derived_features(self, record):
+        # Features the training pipeline computes from raw columns
+        derived = {}
+        purchase_time = _parse_timestamp(record.get("purchase_time"))
+        if purchase_time is not None:
+            derived["hour_of_day"] = purchase_time.hour
+            derived["day_of_week"] = purchase_time.weekday()
+            signup_time = _parse_timestamp(record.get("signup_time"))
+            if signup_time is not None:
+                derived["signup_to_purchase_s"] = (purchase_time - signup_time).total_seconds()
+        ip_address = record.get("ip_address")
+        ip_int = parse_ip(ip_address)
+        derived["ip_address_int"] = math.nan if ip_int is None else ip_int
+        if "country" in self._dummy_positions and "country" not in record:
+            derived["country"] = self.geo_index.lookup(ip_address)
+        return derived
+
+    def transform_record(self, record, out=None):
+        """
+        Encodes one raw transaction.
+        :param record: Dict of raw transaction fields
+        :param out: Optional preallocated float64 row to fill
+        :return: float64 array of shape (n_features,)
+        """
+        if out is None:
+            out = np.zeros(self.n_features, dtype=np.float64)
+        else:
+            out[:] = 0.0
+
+        derived = self._derived_features(record)
+        for position, name in self._numeric_positions:
+            out[position] = _to_float(derived[name] if name in derived else record.get(name))
+        for column, positions in self._dummy_positions.items():
+            value = derived.get(column, record.get(column))
+            position = positions.get(str(value))
+            if position is not None:
+                out[position] = 1.0
+        return out
+
+    def transform_records(self, records):
+        """
+        Encodes a batch of raw transactions into a preallocated matrix.
+        :param records: Sequence of raw transaction dicts
+        :return: float64 array of shape (len(records), n_features)
+        """
+        matrix = np.zeros((len(records), self.n_features), dtype=np.float64)
+        for i, record in enumerate(records):
+            self.transform_record(record, out=matrix[i])
+        return matrix
+
+    def transform_frame(self, df):
+        """
+        Vectorized equivalent of transform_records for a DataFrame of raw transactions.
+        :param df: DataFrame of raw transaction fields
+        :return: float64 array of shape (len(df), n_features)
+        """
+        import pandas as pd
+
+        try:
+            from src.feature_engineer import FeatureEngineer
+        except ImportError:
+            from feature_engineer import FeatureEngineer
+
+        derived = {}
+        if "purchase_time" in df.columns:
+            purchase_time = pd.to_datetime(df["purchase_time"], errors="coerce")
+            derived["hour_of_day"] = purchase_time.dt.hour.to_numpy(dtype="float64")
+            derived["day_of_week"] = purchase_time.dt.dayofweek.to_numpy(dtype="float64")
+            if "signup_time" in df.columns:
+                signup_time = pd.to_datetime(df["signup_time"], errors="coerce")
+                derived["signup_to_purchase_s"] = (
+                    (purchase_time - signup_time).dt.total_seconds().to_numpy(dtype="float64")
+                )
+        if "ip_address" in df.columns:
+            derived["ip_address_int"] = FeatureEngineer.ip_to_int(df["ip_address"])
+        else:
+            derived["ip_address_int"] = np.full(len(df), np.nan)
+        if "country" in self._dummy_positions and "country" not in df.columns:
+            derived["country"] = self.geo_index.lookup_many(derived["ip_address_int"])
+
+        matrix = np.zeros((len(df), self.n_features), dtype=np.float64)
+        for position, name in self._numeric_positions:
+            if name in derived:
+                matrix[:, position] = derived[name]
+            elif name in df.columns:
+                matrix[:, position] = pd.to_numeric(df[name], errors="coerce")
+            else:
+                matrix[:, position] = np.nan
+        for column, positions in self._dummy_positions.items():
+            if column in derived:
+                values = derived[column].astype(str)
+            elif column in df.columns:
+                values = df[column].astype(str).to_numpy()
+            else:
+                continue
+            for value, position in positions.items():
+                matrix[:, position] = values == value
+        return matrix
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
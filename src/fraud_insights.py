@@ -0,0 +1,265 @@
+import contextlib
+import heapq
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+DIMENSIONS = {"device": "device_id", "country": "country", "browser": "browser"}
+# Keys kept per dimension; beyond this the least fraudulent keys are evicted
+MAX_KEYS = 100_000
+
+
+@contextlib.contextmanager
+def _file_lock(path):
+    # Exclusive lock on path + ".lock", shared by every process writing path
+    import fcntl
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+class FraudInsights:
+    """
+    Incrementally maintained fraud aggregates for the dashboard: totals, fraud
+    counts, daily trends and per-device/country/browser counts.
+
+    Every update touches only the counters of the records it adds, so keeping
+    the aggregates current never rescans earlier data, and snapshot() cost
+    depends on the number of distinct keys rather than on the number of
+    transactions. Snapshots are cached until the next update.
+
+    Processes that update the same aggregates (serving workers, backfills)
+    each add their counts to one shared file with merge_into(), which merges
+    under an exclusive file lock so no process overwrites another's counts.
+    """
+
+    def __init__(self, top_n=10, max_keys=MAX_KEYS):
+        self.top_n = top_n
+        self.max_keys = max_keys
+        self.total = 0
+        self.fraud = 0
+        # date (YYYY-MM-DD) -> [transactions, fraud]
+        self.daily = {}
+        # dimension -> key -> [transactions, fraud]
+        self.dimensions = {name: {} for name in DIMENSIONS}
+        self.version = 0
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _day(value):
+        if value is None:
+            return datetime.now(timezone.utc).date().isoformat()
+        if isinstance(value, datetime):
+            return value.date().isoformat()
+        return str(value)[:10]
+
+    def update(self, label, day=None, device=None, country=None, browser=None):
+        """
+        Adds one transaction.
+        :param label: 1 for fraud (labeled or flagged by the model), else 0
+        :param day: Transaction date or timestamp; today (UTC) if None
+        """
+        label = int(label)
+        keys = {"device": device, "country": country, "browser": browser}
+        with self._lock:
+            self.total += 1
+            self.fraud += label
+            counts = self.daily.setdefault(self._day(day), [0, 0])
+            counts[0] += 1
+            counts[1] += label
+            for name, key in keys.items():
+                if key is not None:
+                    counts = self.dimensions[name].setdefault(str(key), [0, 0])
+                    counts[0] += 1
+                    counts[1] += label
+                    self._evict(name)
+            self._changed()
+
+    def update_frame(self, df, labels=None, label_column="class", time_column="purchase_time"):
+        """
+        Adds a batch of transactions, aggregating the batch before merging it in.
+        :param df: DataFrame with any of purchase_time, device_id, country, browser
+        :param labels: Fraud labels or predictions; df[label_column] if None
+        """
+        import pandas as pd
+
+        labels = np.asarray(df[label_column] if labels is None else labels, dtype=np.int64)
+        if not len(labels):
+            return
+        batch = pd.DataFrame({"label": labels}, index=df.index)
+        if time_column in df.columns:
+            batch["day"] = pd.to_datetime(df[time_column], errors="coerce").dt.strftime(
+                "%Y-%m-%d"
+            )
+        else:
+            batch["day"] = self._day(None)
+        for name, column in DIMENSIONS.items():
+            if column in df.columns:
+                batch[name] = df[column].astype(str)
+
+        grouped = {
+            name: batch.groupby(name, observed=True)["label"].agg(["size", "sum"])
+            for name in ["day", *DIMENSIONS]
+            if name in batch.columns
+        }
+        with self._lock:
+            self.total += len(labels)
+            self.fraud += int(labels.sum())
+            for name, counts in grouped.items():
+                target = self.daily if name == "day" else self.dimensions[name]
+                for key, size, fraud in zip(counts.index, counts["size"], counts["sum"]):
+                    entry = target.setdefault(key, [0, 0])
+                    entry[0] += int(size)
+                    entry[1] += int(fraud)
+            for name in DIMENSIONS:
+                self._evict(name)
+            self._changed()
+
+    def merge(self, other):
+        """
+        Adds the counts of another FraudInsights.
+        """
+        with other._lock:
+            total, fraud = other.total, other.fraud
+            daily = {day: list(counts) for day, counts in other.daily.items()}
+            dimensions = {
+                name: {key: list(counts) for key, counts in keys.items()}
+                for name, keys in other.dimensions.items()
+            }
+        with self._lock:
+            self.total += total
+            self.fraud += fraud
+            for target, source in [(self.daily, daily)] + [
+                (self.dimensions[name], dimensions[name]) for name in DIMENSIONS
+            ]:
+                for key, (transactions, fraud_cases) in source.items():
+                    entry = target.setdefault(key, [0, 0])
+                    entry[0] += transactions
+                    entry[1] += fraud_cases
+            for name in DIMENSIONS:
+                self._evict(name)
+            self._changed()
+
+    def merge_into(self, path):
+        """
+        Adds these counts to the aggregates saved at path (created if missing),
+        holding an exclusive lock on path + ".lock" from reading to writing.
+        :return: FraudInsights holding the merged aggregates
+        """
+        with _file_lock(path):
+            merged = (
+                self.load(path, top_n=self.top_n, max_keys=self.max_keys)
+                if os.path.exists(path)
+                else type(self)(top_n=self.top_n, max_keys=self.max_keys)
+            )
+            if self.total:
+                merged.merge(self)
+                merged.save(path)
+        return merged
+
+    def seed(self, path):
+        """
+        Replaces the aggregates saved at path with these counts, under the same
+        lock as merge_into(). Counts merged into the file earlier are dropped:
+        preprocessing rebuilds it from the whole training data, which merging
+        would add again on every run.
+        """
+        with _file_lock(path):
+            self.save(path)
+
+    def _evict(self, name, slack=1.2):
+        counts = self.dimensions[name]
+        # Prune in steps so eviction is amortized over many updates
+        if len(counts) <= self.max_keys * slack:
+            return
+        keep = heapq.nlargest(
+            self.max_keys, counts.items(), key=lambda item: (item[1][1], item[1][0])
+        )
+        self.dimensions[name] = dict(keep)
+
+    def _changed(self):
+        self.version += 1
+        self._snapshot = None
+
+    def _top(self, name, top_n):
+        counts = self.dimensions[name]
+        top = heapq.nlargest(top_n, counts.items(), key=lambda item: (item[1][1], item[1][0]))
+        return [
+            {"key": key, "transactions": transactions, "fraud_cases": fraud}
+            for key, (transactions, fraud) in top
+        ]
+
+    def snapshot(self, top_n=None):
+        """
+        :return: JSON-serializable aggregates for the /fraud-insights endpoint
+        """
+        top_n = top_n or self.top_n
+        with self._lock:
+            if self._snapshot is not None and self._snapshot[0] == top_n:
+                return self._snapshot[1]
+            days = sorted(self.daily)
+            snapshot = {
+                "total_transactions": self.total,
+                "fraud_cases": self.fraud,
+                "fraud_percentage": round(100.0 * self.fraud / self.total, 2) if self.total else 0.0,
+                "fraud_trends": {day: self.daily[day][1] for day in days},
+                "transaction_trends": {day: self.daily[day][0] for day in days},
+                "top_devices": self._top("device", top_n),
+                "top_countries": self._top("country", top_n),
+                "top_browsers": self._top("browser", top_n),
+                "version": self.version,
+                "updated_at": time.time(),
+            }
+            self._snapshot = (top_n, snapshot)
+            return snapshot
+
+    @classmethod
+    def from_frame(cls, df, label_column="class", **kwargs):
+        insights = cls(**kwargs)
+        insights.update_frame(df, label_column=label_column)
+        return insights
+
+    def save(self, path):
+        with self._lock:
+            state = {
+                "top_n": self.top_n,
+                "max_keys": self.max_keys,
+                "total": self.total,
+                "fraud": self.fraud,
+                "daily": self.daily,
+                "dimensions": self.dimensions,
+            }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """
+        :param kwargs: top_n and max_keys, overriding the ones saved with the file
+        """
+        with open(path) as f:
+            state = json.load(f)
+        settings = {name: state[name] for name in ("top_n", "max_keys") if name in state}
+        insights = cls(**{**settings, **kwargs})
+        insights.total = state["total"]
+        insights.fraud = state["fraud"]
+        insights.daily = state["daily"]
+        insights.dimensions.update(state["dimensions"])
+        # The file may have been written with a larger max_keys
+        for name in DIMENSIONS:
+            insights._evict(name, slack=1)
+        return insights
@@ -0,0 +1,204 @@
+import argparse
+import mmap
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"GEOIDX01"
+# magic, number of ranges, number of countries, size of the country name blob
+HEADER = struct.Struct("<8sQQQ")
+
+
+def parse_ip(value):
+    """
+    Converts a single IP (dotted quad, integer, float or numeric string) to an int.
+    :return: Integer IP value, or None if the value is malformed
+    """
+    if isinstance(value, str):
+        parts = value.strip().split(".")
+        if len(parts) == 4:
+            try:
+                octets = [int(part) for part in parts]
+            except ValueError:
+                return None
+            if any(octet < 0 or octet > 255 for octet in octets):
+                return None
+            return (octets[0] << 24) | (octets[1] << 16) | (octets[2] << 8) | octets[3]
+    try:
+        ip = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not 0 <= ip <= 2**32 - 1:  # also rejects NaN
+        return None
+    return int(ip)
+
+
+class GeoIndex:
+    """
+    Sorted IP ranges with interned country codes.
+
+    Indexes opened from a file are memory-mapped read-only, so every process
+    that opens the same file shares one physical copy of the arrays.
+    """
+
+    def __init__(
+        self, lower_bounds, upper_bounds, country_codes, countries, mm=None, path=None
+    ):
+        self.lower_bounds = lower_bounds
+        self.upper_bounds = upper_bounds
+        self.country_codes = country_codes
+        self.countries = countries
+        self._country_array = np.array(countries + ("Unknown",), dtype=object)
+        self._mm = mm
+        self.path = path
+
+    @classmethod
+    def from_frame(cls, ip_country_df):
+        ranges = ip_country_df.sort_values("lower_bound_ip_address")
+        countries, codes = np.unique(
+            ranges["country"].astype(str).to_numpy(), return_inverse=True
+        )
+        return cls(
+            ranges["lower_bound_ip_address"].to_numpy().astype(np.uint32),
+            ranges["upper_bound_ip_address"].to_numpy().astype(np.uint32),
+            codes.astype(np.uint16),
+            tuple(countries.tolist()),
+        )
+
+    @classmethod
+    def build(cls, csv_path, index_path):
+        import pandas as pd
+
+        index = cls.from_frame(pd.read_csv(csv_path))
+        index.save(index_path)
+        return cls.open(index_path)
+
+    def save(self, index_path):
+        names = "\n".join(self.countries).encode("utf-8")
+        header = HEADER.pack(MAGIC, len(self.lower_bounds), len(self.countries), len(names))
+
+        # Write to a temporary file first so readers never see a partial index
+        tmp_path = f"{index_path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(np.ascontiguousarray(self.lower_bounds, dtype="<u4").tobytes())
+            f.write(np.ascontiguousarray(self.upper_bounds, dtype="<u4").tobytes())
+            f.write(np.ascontiguousarray(self.country_codes, dtype="<u2").tobytes())
+            f.write(names)
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def open(cls, index_path):
+        with open(index_path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, n_ranges, n_countries, names_size = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            mm.close()
+            raise ValueError(f"{index_path} is not a geolocation index")
+
+        offset = HEADER.size
+        lower_bounds = np.frombuffer(mm, dtype="<u4", count=n_ranges, offset=offset)
+        offset += 4 * n_ranges
+        upper_bounds = np.frombuffer(mm, dtype="<u4", count=n_ranges, offset=offset)
+        offset += 4 * n_ranges
+        country_codes = np.frombuffer(mm, dtype="<u2", count=n_ranges, offset=offset)
+        offset += 2 * n_ranges
+        names = mm[offset : offset + names_size].decode("utf-8")
+        countries = tuple(names.split("\n")) if n_countries else ()
+        return cls(
+            lower_bounds, upper_bounds, country_codes, countries, mm=mm, path=index_path
+        )
+
+    def __getstate__(self):
+        # File-backed indexes are re-opened (and re-shared) when unpickled
+        if self.path is not None:
+            return {"path": self.path}
+        return {
+            "arrays": (self.lower_bounds, self.upper_bounds, self.country_codes),
+            "countries": self.countries,
+        }
+
+    def __setstate__(self, state):
+        if "path" in state:
+            other = GeoIndex.open(state["path"])
+        else:
+            other = GeoIndex(*state["arrays"], state["countries"])
+        self.__dict__.update(other.__dict__)
+
+    def __len__(self):
+        return len(self.lower_bounds)
+
+    def lookup_positions(self, ip_int):
+        """
+        Finds the range containing each IP with a binary search over the lower bounds.
+        :param ip_int: Array of integer IP values (NaN for malformed values)
+        :return: int64 array of range positions, -1 where no range contains the IP
+        """
+        ip_int = np.asarray(ip_int, dtype="float64")
+        valid = ~np.isnan(ip_int)
+        ip_u32 = np.where(valid, ip_int, 0).astype(np.uint32)
+        if len(self) == 0:
+            return np.full(len(ip_u32), -1, dtype=np.int64)
+
+        pos = np.searchsorted(self.lower_bounds, ip_u32, side="right") - 1
+        safe_pos = np.clip(pos, 0, None)
+        matched = valid & (pos >= 0) & (ip_u32 <= self.upper_bounds[safe_pos])
+        return np.where(matched, pos, -1)
+
+    def lookup_many(self, ip_int):
+        """
+        Vectorized lookup of integer IP values.
+        :return: Object array of country names, "Unknown" where no range matches
+        """
+        pos = self.lookup_positions(ip_int)
+        codes = np.where(
+            pos >= 0, self.country_codes[np.clip(pos, 0, None)], len(self.countries)
+        )
+        return self._country_array[codes]
+
+    def lookup(self, ip, default="Unknown"):
+        """
+        Looks up a single IP (any format accepted by parse_ip).
+        """
+        ip_int = parse_ip(ip)
+        if ip_int is None or len(self) == 0:
+            return default
+        pos = int(np.searchsorted(self.lower_bounds, np.uint32(ip_int), side="right")) - 1
+        if pos < 0 or ip_int > self.upper_bounds[pos]:
+            return default
+        return self.countries[self.country_codes[pos]]
+
+    def close(self):
+        # Drop the array views before closing the underlying map
+        self.lower_bounds = self.upper_bounds = self.country_codes = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IP geolocation index tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Compile the IP-to-country CSV")
+    build_parser.add_argument("--csv", default="data/IpAddress_to_Country.csv")
+    build_parser.add_argument("--output", default="data/IpAddress_to_Country.idx")
+
+    lookup_parser = subparsers.add_parser("lookup", help="Look up IP addresses")
+    lookup_parser.add_argument("--index", default="data/IpAddress_to_Country.idx")
+    lookup_parser.add_argument("ips", nargs="+")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        index = GeoIndex.build(args.csv, args.output)
+        print(f"Built geolocation index with {len(index)} ranges at '{args.output}'.")
+    else:
+        index = GeoIndex.open(args.index)
+        for ip in args.ips:
+            print(f"{ip}: {index.lookup(ip)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class MicroBatchEngine:
+    """
+    Collects concurrently submitted items into micro-batches for a vectorized batch function.
+
+    A batch is dispatched as soon as it holds max_batch_size items, or max_wait_ms
+    after its first item arrived, whichever comes first. The worker thread starts
+    on first use (and again after a fork), so the engine can be created before
+    a pre-forking server spawns its workers. Every future of a batch is resolved:
+    if the batch function raises, or returns a different number of results than
+    items, the futures it did not resolve get the exception.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=64, max_wait_ms=2.0):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._queue = queue.Queue()
+        self._worker = None
+        self._pid = None
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+        self._batch_sizes = [0] * (self.max_batch_size + 1)
+        self._latency_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self._latency_total_ms = 0.0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+                self._pid = os.getpid()
+
+    def submit(self, item):
+        """
+        Queues one item for the next batch.
+        :return: Future resolved with the batch function's result for this item
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout=timeout)
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._dispatch(batch)
+            except Exception as e:
+                # No caller is left waiting on a future that will never resolve
+                self._errors += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _dispatch(self, batch):
+        results = list(self.batch_fn([item for item, _, _ in batch]))
+        if len(results) != len(batch):
+            raise RuntimeError(
+                f"Batch function returned {len(results)} results for {len(batch)} items"
+            )
+
+        finished = time.perf_counter()
+        for (_, future, submitted), result in zip(batch, results):
+            future.set_result(result)
+            latency_ms = (finished - submitted) * 1000.0
+            self._latency_counts[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+            self._latency_total_ms += latency_ms
+        self._requests += len(batch)
+        self._batches += 1
+        self._batch_sizes[len(batch)] += 1
+
+    def stats(self):
+        """
+        Snapshot of queue depth, batch size and latency histograms.
+        """
+        latency_labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [
+            f">{LATENCY_BUCKETS_MS[-1]}ms"
+        ]
+        return {
+            "queue_depth": self._queue.qsize(),
+            "requests": self._requests,
+            "batches": self._batches,
+            "errors": self._errors,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "mean_batch_size": self._requests / self._batches if self._batches else 0.0,
+            "batch_size_histogram": {
+                str(size): count for size, count in enumerate(self._batch_sizes) if count
+            },
+            "mean_latency_ms": (
+                self._latency_total_ms / self._requests if self._requests else 0.0
+            ),
+            "latency_histogram": dict(zip(latency_labels, self._latency_counts)),
+        }
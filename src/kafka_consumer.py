@@ -1,19 +1,329 @@
 # src/kafka_consumer.py
-from kafka import KafkaConsumer
-import json
-from model_builder import load_model  # Your existing model loader
+import argparse
+import logging
+import multiprocessing
+import os
+import time
 
+import numpy as np
 
-def process_transaction():
-    consumer = KafkaConsumer(
-        "fraud-transactions",
-        bootstrap_servers="localhost:9092",
-        value_deserializer=lambda m: json.loads(m.decode("utf-8")),
+try:
+    from src.feature_transformer import FeatureTransformer
+    from src.kafka_producer import get_serializer
+    from src.velocity import create_tracker, update_once
+except ImportError:
+    from feature_transformer import FeatureTransformer
+    from kafka_producer import get_serializer
+    from velocity import create_tracker, update_once
+
+logger = logging.getLogger(__name__)
+
+
+def _message_key(message):
+    return (message.topic, message.partition, message.offset)
+
+
+class ScoringWorker:
+    """
+    Scores transactions from Kafka in batches and publishes the scores to an output topic.
+
+    Each poll returns up to max_records messages across the assigned partitions.
+    They are encoded with the shared feature transformer and scored with one
+    vectorized predict_proba call. Offsets are committed only after every score
+    in the batch has been delivered, so a failed batch is rewound and retried
+    rather than lost.
+
+    A batch that fails max_retries times in a row is then scored one message
+    at a time. Messages that still fail to score (e.g. malformed transactions)
+    go to dead_letter_topic with the error, or are logged if there is none,
+    and are committed with the rest, so one bad message cannot stall its
+    partitions. Delivery failures still rewind, so scores are never skipped
+    because the broker is down.
+
+    A message is counted by the velocity tracker once, however often its batch
+    is retried: its features are kept until the batch is committed, and a
+    retry is scored with the same counts.
+    """
+
+    def __init__(
+        self,
+        consumer,
+        producer,
+        model,
+        transformer=None,
+        output_topic="fraud-scores",
+        threshold=0.5,
+        max_records=500,
+        poll_timeout_ms=1000,
+        velocity=None,
+        max_retries=3,
+        dead_letter_topic=None,
+    ):
+        self.consumer = consumer
+        self.producer = producer
+        self.model = model
+        self.transformer = transformer
+        self.output_topic = output_topic
+        self.threshold = threshold
+        self.max_records = max_records
+        self.poll_timeout_ms = poll_timeout_ms
+        # Optional velocity tracker; with several workers it must be shared
+        # (RedisVelocityTracker), since each worker sees only some of a key's events
+        self.velocity = velocity
+        self.max_retries = max_retries
+        self.dead_letter_topic = dead_letter_topic
+        self.scored = 0
+        self.dead_lettered = 0
+        # Failed attempts at the current batch, keyed by its first offsets
+        self._failures = {}
+        # (topic, partition, offset) -> velocity features of uncommitted messages
+        self._velocity_applied = {}
+
+    def score(self, transactions, keys=None):
+        """
+        :param transactions: List of raw transaction dicts
+        :param keys: Optional (topic, partition, offset) per transaction; one
+            already counted by the velocity tracker reuses its features
+        :return: Fraud probabilities, one per transaction
+        """
+        if self.velocity is not None:
+            applied = self._velocity_applied
+            transactions = [
+                {**transaction, **update_once(self.velocity, transaction, key, applied)}
+                for transaction, key in zip(transactions, keys or [None] * len(transactions))
+            ]
+        if self.transformer is not None:
+            X = self.transformer.transform_records(transactions)
+        else:
+            X = np.array(
+                [
+                    [transaction[name] for name in self.model.feature_names_in_]
+                    for transaction in transactions
+                ],
+                dtype=np.float64,
+            )
+        return self.model.predict_proba(X)[:, 1]
+
+    def run_once(self):
+        """
+        Polls, scores and publishes one batch.
+        :return: Number of messages scored
+        """
+        batches = self.consumer.poll(
+            timeout_ms=self.poll_timeout_ms, max_records=self.max_records
+        )
+        messages = [message for records in batches.values() for message in records]
+        if not messages:
+            return 0
+
+        batch = frozenset((partition, records[0].offset) for partition, records in batches.items())
+        failures = self._failures.get(batch, 0)
+        try:
+            if failures >= self.max_retries:
+                scored = self._score_each(messages)
+            else:
+                probabilities = self.score(
+                    [message.value for message in messages],
+                    [_message_key(message) for message in messages],
+                )
+                for message, probability in zip(messages, probabilities):
+                    self._publish(message, probability)
+                scored = len(messages)
+            self.producer.flush()
+        except Exception:
+            # Rewind to the start of the batch so it is consumed again
+            self._failures = {batch: failures + 1}
+            for partition, records in batches.items():
+                self.consumer.seek(partition, records[0].offset)
+            raise
+
+        self._failures = {}
+        self.consumer.commit()
+        self._velocity_applied = {}
+        self.scored += scored
+        return scored
+
+    def _publish(self, message, probability):
+        self.producer.send(
+            self.output_topic,
+            key=message.key,
+            value={
+                "topic": message.topic,
+                "partition": message.partition,
+                "offset": message.offset,
+                "transaction": message.value,
+                "prediction": int(probability >= self.threshold),
+                "probability": float(probability),
+            },
+        )
+
+    def _score_each(self, messages):
+        # Last resort for a batch that keeps failing: only the messages that
+        # fail on their own are dead-lettered
+        scored = 0
+        for message in messages:
+            try:
+                probability = self.score([message.value], [_message_key(message)])[0]
+            except Exception as e:
+                self._dead_letter(message, e)
+                continue
+            self._publish(message, probability)
+            scored += 1
+        return scored
+
+    def _dead_letter(self, message, error):
+        if self.dead_letter_topic is None:
+            logger.error(
+                f"Skipping message {message.topic}/{message.partition}/{message.offset}: "
+                f"{str(error)}"
+            )
+        else:
+            self.producer.send(
+                self.dead_letter_topic,
+                key=message.key,
+                value={
+                    "topic": message.topic,
+                    "partition": message.partition,
+                    "offset": message.offset,
+                    "transaction": message.value,
+                    "error": str(error),
+                },
+            )
+        self.dead_lettered += 1
+
+    def run(self, stop_event=None, retry_backoff_s=1.0):
+        while stop_event is None or not stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Scoring batch failed: {str(e)}", exc_info=True)
+                time.sleep(retry_backoff_s)
+
+
+def create_consumer(bootstrap_servers, topic, group_id, max_records=500, serializer="json"):
+    from kafka import KafkaConsumer
+
+    # Must match the serializer the TransactionProducer publishes with
+    _, deserialize = get_serializer(serializer)
+
+    return KafkaConsumer(
+        topic,
+        bootstrap_servers=bootstrap_servers,
+        group_id=group_id,
+        enable_auto_commit=False,
+        auto_offset_reset="earliest",
+        max_poll_records=max_records,
+        value_deserializer=deserialize,
+    )
+
+
+def create_producer(bootstrap_servers, serializer="json"):
+    from kafka import KafkaProducer
+
+    serialize, _ = get_serializer(serializer)
+    return KafkaProducer(
+        bootstrap_servers=bootstrap_servers,
+        linger_ms=5,
+        value_serializer=serialize,
+    )
+
+
+def run_worker(args):
+    # Imported by the scoring processes only, not by the launcher
+    try:
+        from src.evaluation import model_threshold
+        from src.model_builder import load_model
+    except ImportError:
+        from evaluation import model_threshold
+        from model_builder import load_model
+
+    transformer = None
+    if args.transformer and os.path.exists(args.transformer):
+        transformer = FeatureTransformer.load(args.transformer)
+    model = load_model(args.model)
+    feature_names = (
+        transformer.feature_names
+        if transformer is not None
+        else list(getattr(model, "feature_names_in_", []))
+    )
+    velocity = create_tracker(
+        feature_names, args.velocity_store, args.redis_host, args.redis_port
     )
+    worker = ScoringWorker(
+        consumer=create_consumer(
+            args.bootstrap_servers,
+            args.input_topic,
+            args.group_id,
+            args.batch_size,
+            serializer=args.serializer,
+        ),
+        producer=create_producer(args.bootstrap_servers, serializer=args.serializer),
+        model=model,
+        transformer=transformer,
+        output_topic=args.output_topic,
+        # Selected at training time and saved with the model, as the API applies it
+        threshold=model_threshold(args.model) if args.threshold is None else args.threshold,
+        max_records=args.batch_size,
+        velocity=velocity,
+        max_retries=args.max_retries,
+        dead_letter_topic=args.dead_letter_topic or None,
+    )
+    worker.run()
+
+
+def process_transaction(args=None):
+    """
+    Runs args.workers scoring processes in one consumer group; Kafka spreads the
+    input topic's partitions across them.
+    """
+    parser = argparse.ArgumentParser(description="Kafka fraud scoring worker")
+    parser.add_argument("--bootstrap-servers", default="localhost:9092")
+    parser.add_argument("--input-topic", default="fraud-transactions")
+    parser.add_argument("--output-topic", default="fraud-scores")
+    parser.add_argument("--group-id", default="fraud-scorer")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--model", default="models/fraud_detection_model.pkl")
+    parser.add_argument("--transformer", default="models/feature_transformer.pkl")
+    parser.add_argument(
+        "--threshold", type=float, help="Overrides the threshold saved next to the model"
+    )
+    parser.add_argument(
+        "--max-retries", type=int, default=3, help="Failures before a batch is scored per message"
+    )
+    parser.add_argument(
+        "--dead-letter-topic",
+        default="fraud-dead-letters",
+        help="Topic for messages that cannot be scored ('' to only log them)",
+    )
+    parser.add_argument(
+        "--serializer", default="json", choices=["json", "orjson", "msgpack"]
+    )
+    parser.add_argument(
+        "--velocity-store",
+        default="redis",
+        choices=["redis", "local"],
+        help="Where velocity counts are kept; 'local' only with a single worker",
+    )
+    parser.add_argument("--redis-host", default="localhost")
+    parser.add_argument("--redis-port", type=int, default=6379)
+    args = parser.parse_args(args)
+    if args.velocity_store == "local" and args.workers > 1:
+        parser.error("--velocity-store local would split each key's counts across workers")
+
+    if args.workers <= 1:
+        run_worker(args)
+        return
+
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(args,), daemon=True)
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
 
-    model = load_model()  # Load your trained model
 
-    for message in consumer:
-        transaction = message.value
-        prediction = model.predict([list(transaction.values())])
-        print(f"Transaction {transaction} is {'Fraud' if prediction else 'Legit'}")
+if __name__ == "__main__":
+    process_transaction()
@@ -1,20 +1,167 @@
 # src/kafka_producer.py
-from kafka import KafkaProducer
 import json
 
 
+def _json_dumps(value):
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def _json_loads(data):
+    return json.loads(data.decode("utf-8"))
+
+
+def get_serializer(name):
+    """
+    Returns (serialize, deserialize) functions for a wire format.
+    :param name: "json", "orjson" (JSON-compatible, faster) or "msgpack" (compact binary)
+    """
+    if name == "json":
+        return _json_dumps, _json_loads
+    if name == "orjson":
+        import orjson
+
+        return orjson.dumps, orjson.loads
+    if name == "msgpack":
+        import msgpack
+
+        return (
+            lambda value: msgpack.packb(value, use_bin_type=True),
+            lambda data: msgpack.unpackb(data, raw=False),
+        )
+    raise ValueError(f"Unknown serializer: {name}")
+
+
+def default_serializer():
+    try:
+        import orjson  # noqa: F401
+
+        return "orjson"
+    except ImportError:
+        return "json"
+
+
 class TransactionProducer:
-    def __init__(self, bootstrap_servers="localhost:9092"):
-        self.producer = KafkaProducer(
-            bootstrap_servers=bootstrap_servers,
-            value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+    """
+    Asynchronous, batched producer for transaction messages.
+
+    Messages are batched by size (batch_size bytes per partition) and linger
+    time, and compressed per batch. send_transaction returns immediately with a
+    future; delivery is reported through on_delivery(error, metadata). Only
+    flush() and close() wait for outstanding messages.
+    """
+
+    def __init__(
+        self,
+        bootstrap_servers="localhost:9092",
+        serializer=None,
+        batch_size=64 * 1024,
+        linger_ms=20,
+        compression_type="gzip",
+        acks=1,
+        producer=None,
+    ):
+        self.serializer = serializer or default_serializer()
+        self._serialize, self._deserialize = get_serializer(self.serializer)
+        if producer is None:
+            from kafka import KafkaProducer
+
+            producer = KafkaProducer(
+                bootstrap_servers=bootstrap_servers,
+                batch_size=batch_size,
+                linger_ms=linger_ms,
+                compression_type=compression_type,
+                acks=acks,
+            )
+        self.producer = producer
+        self.sent = 0
+        self.delivered = 0
+        self.failed = 0
+
+    def _on_success(self, metadata, on_delivery=None):
+        self.delivered += 1
+        if on_delivery is not None:
+            on_delivery(None, metadata)
+
+    def _on_error(self, error, on_delivery=None):
+        self.failed += 1
+        if on_delivery is not None:
+            on_delivery(error, None)
+
+    def _send_bytes(self, topic, value, key=None, on_delivery=None):
+        if isinstance(key, str):
+            key = key.encode("utf-8")
+        future = self.producer.send(topic, key=key, value=value)
+        future.add_callback(self._on_success, on_delivery=on_delivery)
+        future.add_errback(self._on_error, on_delivery=on_delivery)
+        self.sent += 1
+        return future
+
+    def send_transaction(self, topic, transaction_data, key=None, on_delivery=None):
+        """
+        Queues one transaction without waiting for the broker.
+        :return: Future resolved with the record metadata once delivered
+        """
+        return self._send_bytes(
+            topic, self._serialize(transaction_data), key=key, on_delivery=on_delivery
         )
 
-    def send_transaction(self, topic, transaction_data):
-        self.producer.send(topic, transaction_data)
-        self.producer.flush()
+    def send_many(self, topic, transactions, key_field=None, on_delivery=None):
+        """
+        Queues many transactions.
+        :param transactions: Iterable of dicts, or the path of a JSONL file
+        :param key_field: Optional transaction field used as the message key
+        :return: Number of messages queued
+        """
+        if isinstance(transactions, str):
+            return self._send_file(topic, transactions, key_field, on_delivery)
+
+        count = 0
+        for transaction in transactions:
+            key = transaction.get(key_field) if key_field else None
+            self.send_transaction(
+                topic, transaction, key=None if key is None else str(key), on_delivery=on_delivery
+            )
+            count += 1
+        return count
+
+    def _send_file(self, topic, path, key_field, on_delivery):
+        # JSON lines already are valid JSON messages; only re-encode when needed
+        passthrough = key_field is None and self.serializer in ("json", "orjson")
+        count = 0
+        with open(path, "rb") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if passthrough:
+                    self._send_bytes(topic, line, on_delivery=on_delivery)
+                else:
+                    transaction = json.loads(line)
+                    key = transaction.get(key_field) if key_field else None
+                    self.send_transaction(
+                        topic,
+                        transaction,
+                        key=None if key is None else str(key),
+                        on_delivery=on_delivery,
+                    )
+                count += 1
+        return count
+
+    def flush(self, timeout=None):
+        self.producer.flush(timeout=timeout)
+
+    def close(self, timeout=None):
+        self.producer.flush(timeout=timeout)
+        self.producer.close(timeout=timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 # Example usage:
-# producer = TransactionProducer()
-# producer.send_transaction('fraud-transactions', {'amount': 500, 'ip': '192.168.1.1'})
+# with TransactionProducer(serializer="msgpack", compression_type="gzip") as producer:
+#     producer.send_transaction('fraud-transactions', {'amount': 500, 'ip': '192.168.1.1'})
+#     producer.send_many('fraud-transactions', 'data/replay.jsonl')
@@ -1,25 +1,38 @@
-from data_loader import DataLoader
-from data_cleaner import DataCleaner
-from feature_engineer import FeatureEngineer
-from model_builder import ModelBuilder
-from mlflow_utils import setup_mlflow
-from explainability import Explainability
+# Each stage imports its own dependencies, so the heavy ones (scikit-learn,
+# MLflow, SHAP, LIME, matplotlib) load only when their stage runs
+import argparse
+import logging
+import os
 
+CATEGORICAL_COLUMNS = ["source", "browser", "sex", "country"]
+# Timestamps and others not needed for modeling
+COLUMNS_TO_DROP = [
+    "signup_time",
+    "purchase_time",
+    "device_id",
+    "ip_address",
+    "lower_bound_ip_address",
+    "upper_bound_ip_address",
+]
+MODEL_PATH = "models/fraud_detection_model.pkl"
+COMPILED_MODEL_PATH = "models/fraud_detection_model.npz"
+TRANSFORMER_PATH = "models/feature_transformer.pkl"
+EXPLAINER_PATH = "models/reason_explainer.pkl"
+THRESHOLD_PATH = "models/threshold.json"
+INSIGHTS_PATH = "data/fraud_insights.json"
 
-def main():
-    # Step 1: Initialize DataLoader
-    loader = DataLoader(
-        fraud_data_path="data/Fraud_Data.csv",
-        ip_country_path="data/IpAddress_to_Country.csv",
-        creditcard_path="data/creditcard.csv",
-    )
+
+def preprocess(loader):
+    from data_cleaner import DataCleaner
+    from feature_engineer import FeatureEngineer
+    from fraud_insights import FraudInsights
 
     # Step 2: Load datasets
     fraud_df = loader.load_fraud_data()
     # Compute correlation with the target variable
     correlation = fraud_df.corr(numeric_only=True)["class"].sort_values(ascending=False)
     print(correlation)
-    ip_country_df = loader.load_ip_country_data()
+    ip_country_index = loader.load_ip_country_index()
     creditcard_df = loader.load_creditcard_data()
 
     # Step 3: Clean Fraud Data
@@ -31,87 +44,272 @@ def main():
     # Step 4: Feature Engineering for Fraud Data
     engineer = FeatureEngineer()
     fraud_df = engineer.add_time_features(fraud_df)
-    fraud_df = engineer.merge_with_geolocation(fraud_df, ip_country_df)
-    # Drop unnecessary columns (timestamps and others not needed for modeling)
+    fraud_df = engineer.add_signup_to_purchase(fraud_df)
+    fraud_df = engineer.add_velocity_features(fraud_df)
+    fraud_df = engineer.merge_with_geolocation(fraud_df, ip_country_index)
+    # Seed the dashboard aggregates while device/country/browser are still raw.
+    # A rebuild: the serving workers' merged counts are replaced, under their lock
+    FraudInsights.from_frame(fraud_df).seed(INSIGHTS_PATH)
     fraud_df = FeatureEngineer.drop_unnecessary_columns(
-        fraud_df,
-        columns_to_drop=[
-            "signup_time",
-            "purchase_time",
-            "device_id",
-            "ip_address",
-            "lower_bound_ip_address",
-            "upper_bound_ip_address",
-        ],
-    )
-
-    fraud_df = engineer.encode_categorical_features(
-        fraud_df, ["source", "browser", "sex", "country"]
+        fraud_df, columns_to_drop=COLUMNS_TO_DROP
     )
+    fraud_df = engineer.encode_categorical_features(fraud_df, CATEGORICAL_COLUMNS)
 
     # Step 5: Save cleaned and processed data
     fraud_df.to_csv("data/processed_fraud_data.csv", index=False)
     creditcard_df.to_csv("data/processed_creditcard_data.csv", index=False)
+    return list(fraud_df.columns)
 
-    # Step 6: Set up MLflow for experiment tracking
-    setup_mlflow(experiment_name="Fraud_Detection_Experiment")
 
-    # Step 7: Build and evaluate models for Fraud Data
-    fraud_model_builder = ModelBuilder(
-        data_path="data/processed_fraud_data.csv", target_column="class"
+def preprocess_streaming(loader, chunk_size=None, max_memory_mb=256):
+    # Steps 2-5 over bounded-size chunks, appending to the processed files
+    from data_loader import FRAUD_DATA_DATE_COLUMNS, FRAUD_DATA_SCHEMA
+    from fraud_insights import FraudInsights
+    from streaming_pipeline import StreamingPipeline, copy_in_chunks
+
+    insights = FraudInsights()
+    pipeline = StreamingPipeline(
+        ip_country=loader.load_ip_country_index(),
+        categorical_columns=CATEGORICAL_COLUMNS,
+        columns_to_drop=COLUMNS_TO_DROP,
+        chunk_size=chunk_size,
+        max_memory_mb=max_memory_mb,
+        dtype=FRAUD_DATA_SCHEMA,
+        date_columns=FRAUD_DATA_DATE_COLUMNS,
+        insights=insights,
+        velocity=True,
+    )
+    rows = pipeline.run(loader.fraud_data_path, "data/processed_fraud_data.csv")
+    insights.seed(INSIGHTS_PATH)
+    print(f"Streamed {rows} fraud rows in chunks of {pipeline.chunk_size}.")
+    copy_in_chunks(
+        loader.creditcard_path,
+        "data/processed_creditcard_data.csv",
+        chunk_size=pipeline.chunk_size,
+    )
+    return pipeline.columns
+
+
+def main(
+    streaming=False,
+    chunk_size=None,
+    max_memory_mb=256,
+    n_jobs=1,
+    search=False,
+    time_budget_s=None,
+    target_alert_rate=None,
+    resampling="none",
+    resampling_ratio=5.0,
+    models=None,
+):
+    from data_loader import DataLoader
+    from feature_transformer import FeatureTransformer
+
+    # Step 1: Initialize DataLoader
+    loader = DataLoader(
+        fraud_data_path="data/Fraud_Data.csv",
+        ip_country_path="data/IpAddress_to_Country.csv",
+        creditcard_path="data/creditcard.csv",
+        typed=True,
+        cache_dir="data/cache",
     )
-    fraud_model_builder.split_data(test_size=0.2, random_state=42)
-    fraud_results = fraud_model_builder.train_and_evaluate()
 
-    # Step 8: Build and evaluate models for Credit Card Data
-    creditcard_model_builder = ModelBuilder(
-        data_path="data/processed_creditcard_data.csv", target_column="Class"
+    if streaming:
+        processed_columns = preprocess_streaming(
+            loader, chunk_size=chunk_size, max_memory_mb=max_memory_mb
+        )
+    else:
+        processed_columns = preprocess(loader)
+
+    # Persist the fitted feature transformer so serving builds identical features
+    os.makedirs(os.path.dirname(TRANSFORMER_PATH), exist_ok=True)
+    transformer = FeatureTransformer.fit(
+        processed_columns, CATEGORICAL_COLUMNS, loader.load_ip_country_index()
     )
-    creditcard_model_builder.split_data(test_size=0.2, random_state=42)
-    creditcard_results = creditcard_model_builder.train_and_evaluate()
+    transformer.save(TRANSFORMER_PATH)
+
+    # Steps 6-9: Track experiments in MLflow, train and compare the models
+    from mlflow_utils import setup_mlflow
 
-    # Step 9: Print results
-    print("Fraud Data Results:")
+    setup_mlflow(experiment_name="Fraud_Detection_Experiment")
+    fraud_model_builder, fraud_results = train(
+        "data/processed_fraud_data.csv",
+        "class",
+        n_jobs,
+        search,
+        time_budget_s,
+        target_alert_rate,
+        resampling,
+        resampling_ratio,
+        models,
+    )
+    creditcard_model_builder, creditcard_results = train(
+        "data/processed_creditcard_data.csv",
+        "Class",
+        n_jobs,
+        search,
+        time_budget_s,
+        target_alert_rate,
+        resampling,
+        resampling_ratio,
+        models,
+    )
+    print("Fraud Data Validation Results:")
     for model, metrics in fraud_results.items():
         print(f"{model}: {metrics}")
-    print("\nCredit Card Data Results:")
+    print("\nCredit Card Data Validation Results:")
     for model, metrics in creditcard_results.items():
         print(f"{model}: {metrics}")
 
-    # Step 10: Explain the best-performing model for Fraud Data
-    best_fraud_model_name = max(
-        fraud_results, key=lambda x: fraud_results[x]["f1_score"]
-    )
-    best_fraud_model = fraud_model_builder.models[best_fraud_model_name]
+    # Step 10: Save and explain the best-performing model for Fraud Data,
+    # selected on validation PR-AUC; the test split is scored for it alone
+    best_fraud_model_name = fraud_model_builder.best_model_name
     print(f"\nBest Fraud Model: {best_fraud_model_name}")
-
-    fraud_explainer = Explainability(
-        model=best_fraud_model,
-        X_train=fraud_model_builder.X_train,
-        X_test=fraud_model_builder.X_test,
-        feature_names=fraud_model_builder.X_train.columns,
-    )
-    fraud_explainer.explain_with_shap()
-    fraud_explainer.explain_with_lime()
+    print(f"Test metrics: {fraud_model_builder.test_metrics}")
+    export_artifacts(fraud_model_builder, best_fraud_model_name)
+    explain(fraud_model_builder, best_fraud_model_name)
     print("SHAP and LIME explanations generated for Fraud Data.")
 
     # Step 11: Explain the best-performing model for Credit Card Data
-    best_creditcard_model_name = max(
-        creditcard_results, key=lambda x: creditcard_results[x]["f1_score"]
-    )
-    best_creditcard_model = creditcard_model_builder.models[best_creditcard_model_name]
+    best_creditcard_model_name = creditcard_model_builder.best_model_name
     print(f"\nBest Credit Card Model: {best_creditcard_model_name}")
+    print(f"Test metrics: {creditcard_model_builder.test_metrics}")
+    explain(creditcard_model_builder, best_creditcard_model_name)
+    print("SHAP and LIME explanations generated for Credit Card Data.")
+
 
-    creditcard_explainer = Explainability(
-        model=best_creditcard_model,
-        X_train=creditcard_model_builder.X_train,
-        X_test=creditcard_model_builder.X_test,
-        feature_names=creditcard_model_builder.X_train.columns,
+def train(
+    data_path,
+    target_column,
+    n_jobs=1,
+    search=False,
+    time_budget_s=None,
+    target_alert_rate=None,
+    resampling="none",
+    resampling_ratio=5.0,
+    models=None,
+):
+    """
+    :param models: MODEL_REGISTRY names to train; the default models if None
+    :return: (fitted ModelBuilder, {model_name: metrics})
+    """
+    from model_builder import ModelBuilder
+
+    builder = ModelBuilder(
+        data_path=data_path,
+        target_column=target_column,
+        n_jobs=n_jobs,
+        time_budget_s=time_budget_s,
+        target_alert_rate=target_alert_rate,
+        resampling=resampling,
+        resampling_ratio=resampling_ratio,
+        models=models,
     )
-    creditcard_explainer.explain_with_shap()
-    creditcard_explainer.explain_with_lime()
-    print("SHAP and LIME explanations generated for Credit Card Data.")
+    builder.split_data(test_size=0.2, random_state=42)
+    return builder, builder.train_and_evaluate(search=search)
+
+
+def export_artifacts(builder, model_name):
+    # The model, its operating threshold and the explainer fitted alongside it,
+    # as served by the API
+    import joblib
+
+    from evaluation import save_threshold
+    from reason_codes import ReasonCodeExplainer
+
+    model = builder.models[model_name]
+    joblib.dump(model, MODEL_PATH)
+    # NumPy-only artifact for the serving hot path (MODEL_PATH=...npz)
+    try:
+        builder.export_compiled(model_name, COMPILED_MODEL_PATH)
+    except (TypeError, ValueError) as e:
+        # e.g. LightGBM/XGBoost boosters, which compile_model has no converter for.
+        # An older export would otherwise keep serving a previous model
+        logging.warning(f"Skipping compiled export of {model_name}: {e}")
+        if os.path.exists(COMPILED_MODEL_PATH):
+            os.remove(COMPILED_MODEL_PATH)
+    # Selected on validation, recorded with the test metrics measured at it
+    save_threshold(
+        THRESHOLD_PATH,
+        builder.test_metrics,
+        model_name=model_name,
+        target_alert_rate=builder.evaluation["target_alert_rate"],
+    )
+    # Reason-code explainer served by the /explain endpoint
+    ReasonCodeExplainer.build(model, builder.X_train).save(EXPLAINER_PATH)
+
+
+def explain(builder, model_name):
+    # SHAP and LIME plots for one trained model
+    from explainability import Explainability
+
+    explainer = Explainability(
+        model=builder.models[model_name],
+        X_train=builder.X_train,
+        X_test=builder.X_test,
+        feature_names=builder.X_train.columns,
+        y_test=builder.y_test,
+    )
+    explainer.explain_with_shap()
+    explainer.explain_with_lime()
 
 
 if __name__ == "__main__":
-    main()
+    from resampling import RESAMPLING_STRATEGIES
+
+    parser = argparse.ArgumentParser(description="Fraud detection pipeline")
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Preprocess the data in bounded-size chunks instead of in memory",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, help="Rows per chunk (derived from --max-memory-mb if unset)"
+    )
+    parser.add_argument(
+        "--max-memory-mb", type=int, default=256, help="Memory budget per chunk in streaming mode"
+    )
+    parser.add_argument(
+        "--n-jobs", type=int, default=-1, help="Cores used for training (-1 for all)"
+    )
+    parser.add_argument(
+        "--search", action="store_true", help="Search the default hyperparameter grids"
+    )
+    parser.add_argument(
+        "--time-budget-s", type=float, help="Wall-clock budget for each model search"
+    )
+    parser.add_argument(
+        "--target-alert-rate",
+        type=float,
+        help="Share of transactions the served threshold may alert on (default: best F1)",
+    )
+    parser.add_argument(
+        "--resample",
+        choices=RESAMPLING_STRATEGIES,
+        default="none",
+        help="Class-imbalance handling applied to the training split",
+    )
+    parser.add_argument(
+        "--resample-ratio",
+        type=float,
+        default=5.0,
+        help="Negatives per positive the resampling targets",
+    )
+    parser.add_argument(
+        "--models",
+        help="Comma-separated MODEL_REGISTRY names to train, e.g. SGD,LightGBM for "
+        "models the online updater can keep training (default: the default models)",
+    )
+    args = parser.parse_args()
+    main(
+        streaming=args.streaming,
+        chunk_size=args.chunk_size,
+        max_memory_mb=args.max_memory_mb,
+        n_jobs=args.n_jobs,
+        search=args.search,
+        time_budget_s=args.time_budget_s,
+        target_alert_rate=args.target_alert_rate,
+        resampling=args.resample,
+        resampling_ratio=args.resample_ratio,
+        models=args.models.split(",") if args.models else None,
+    )
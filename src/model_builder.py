@@ -1,33 +1,354 @@
+import os
+import threading
+import time
+import warnings
+
+import joblib
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid, train_test_split
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.neural_network import MLPClassifier
-from sklearn.metrics import (
-    accuracy_score,
-    precision_score,
-    recall_score,
-    f1_score,
-    roc_auc_score,
+from sklearn.ensemble import (
+    RandomForestClassifier,
+    GradientBoostingClassifier,
+    HistGradientBoostingClassifier,
 )
-import mlflow
-import mlflow.sklearn
+from sklearn.neural_network import MLPClassifier
+from sklearn.utils.validation import has_fit_parameter
+from threadpoolctl import threadpool_limits
+
+try:
+    from src.compiled_model import COMPILED_EXTENSION, CompiledModel, compile_model
+    from src.evaluation import evaluate
+    from src.resampling import resample
+except ImportError:
+    from compiled_model import COMPILED_EXTENSION, CompiledModel, compile_model
+    from evaluation import evaluate
+    from resampling import resample
+
+# Boosting rounds without validation improvement before a booster stops early
+EARLY_STOPPING_ROUNDS = 20
+# Share of the training split held out to select the operating threshold
+# (and for early stopping)
+VALIDATION_FRACTION = 0.1
+LATENCY_REPEATS = 50
+LATENCY_BATCH_ROWS = 10000
+# Seconds between RSS samples while a candidate is fitted
+RSS_SAMPLE_INTERVAL_S = 0.005
+
+
+def _lightgbm():
+    import lightgbm
+
+    return lightgbm.LGBMClassifier(n_estimators=1000, learning_rate=0.05, verbose=-1)
+
+
+def _lightgbm_fit_params(X_val, y_val):
+    import lightgbm
+
+    return {
+        "eval_set": [(X_val, y_val)],
+        "callbacks": [lightgbm.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)],
+    }
+
+
+def _xgboost():
+    import xgboost
+
+    return xgboost.XGBClassifier(
+        n_estimators=1000,
+        learning_rate=0.05,
+        tree_method="hist",
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        eval_metric="logloss",
+    )
+
+
+def _xgboost_fit_params(X_val, y_val):
+    return {"eval_set": [(X_val, y_val)], "verbose": False}
+
+
+# name -> {"factory": builds an unfitted estimator,
+#          "fit_params": optional fn(X_val, y_val) -> extra fit() kwargs for early stopping,
+#          "default": included when ModelBuilder is not given an explicit model list}
+MODEL_REGISTRY = {
+    "Logistic Regression": {"factory": LogisticRegression, "default": True},
+    # Logistic loss, so it has predict_proba; updated with partial_fit by
+    # online_learning.OnlineUpdater
+    "SGD": {
+        "factory": lambda: SGDClassifier(loss="log_loss", alpha=1e-4, random_state=42),
+        "default": False,
+    },
+    "Decision Tree": {"factory": DecisionTreeClassifier, "default": True},
+    "Random Forest": {"factory": RandomForestClassifier, "default": True},
+    # Exact (single-threaded) boosting; superseded by the histogram boosters below
+    "Gradient Boosting": {"factory": GradientBoostingClassifier, "default": False},
+    "Hist Gradient Boosting": {
+        "factory": lambda: HistGradientBoostingClassifier(
+            max_iter=1000,
+            early_stopping=True,
+            validation_fraction=VALIDATION_FRACTION,
+            n_iter_no_change=EARLY_STOPPING_ROUNDS,
+        ),
+        "default": True,
+    },
+    "LightGBM": {"factory": _lightgbm, "fit_params": _lightgbm_fit_params, "default": True},
+    "XGBoost": {"factory": _xgboost, "fit_params": _xgboost_fit_params, "default": True},
+    "MLP": {"factory": lambda: MLPClassifier(max_iter=500), "default": True},
+}
+
+# Hyperparameter grids searched when ModelBuilder.train_and_evaluate(search=True)
+DEFAULT_PARAM_GRIDS = {
+    "Logistic Regression": {"C": [0.1, 1.0, 10.0]},
+    "SGD": {"alpha": [1e-5, 1e-4, 1e-3]},
+    "Decision Tree": {"max_depth": [None, 8, 16], "min_samples_leaf": [1, 10]},
+    "Random Forest": {"n_estimators": [100, 300], "max_depth": [None, 16]},
+    "Gradient Boosting": {"learning_rate": [0.05, 0.1], "max_depth": [3, 5]},
+    "Hist Gradient Boosting": {"learning_rate": [0.05, 0.1], "max_leaf_nodes": [31, 63]},
+    "LightGBM": {"num_leaves": [31, 63], "min_child_samples": [20, 100]},
+    "XGBoost": {"max_depth": [6, 8], "min_child_weight": [1, 10]},
+    "MLP": {"hidden_layer_sizes": [(100,), (64, 32)], "alpha": [1e-4, 1e-3]},
+}
+
+
+def register_model(name, factory, fit_params=None, default=True):
+    """
+    Adds a model to MODEL_REGISTRY.
+    :param factory: Callable returning an unfitted sklearn-compatible classifier
+    :param fit_params: Optional fn(X_val, y_val) returning extra fit() kwargs
+    """
+    MODEL_REGISTRY[name] = {"factory": factory, "fit_params": fit_params, "default": default}
+
+
+def build_models(names=None):
+    """
+    Instantiates registry models, skipping those whose library is not installed.
+    :param names: Registry names; every default model if None
+    """
+    if names is None:
+        names = [name for name, spec in MODEL_REGISTRY.items() if spec.get("default")]
+    models = {}
+    for name in names:
+        try:
+            models[name] = MODEL_REGISTRY[name]["factory"]()
+        except ImportError as e:
+            print(f"Skipping {name}: {e}")
+    return models
+
+
+def load_model(model_path="models/fraud_detection_model.pkl"):
+    if model_path.endswith(COMPILED_EXTENSION):
+        return CompiledModel.load(model_path)
+    return joblib.load(model_path)
+
+
+def _current_rss_mb():
+    # Resident set size right now; /proc is Linux-only
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+class _FitMemory:
+    """
+    Samples the worker's RSS in a background thread while a fit runs. peak_mb
+    is the largest increase over the RSS at the start, i.e. the memory of this
+    fit alone; the process high-water mark (ru_maxrss) of a reused worker also
+    covers every earlier fit. Native allocations (OpenMP, boosters) count too,
+    unlike with tracemalloc, but spikes shorter than the sampling interval can
+    be missed. NaN where /proc is unavailable.
+    """
+
+    def __init__(self, interval_s=RSS_SAMPLE_INTERVAL_S):
+        self.interval_s = interval_s
+        self.peak_mb = float("nan")
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._baseline = _current_rss_mb()
+        if self._baseline is not None:
+            self._peak = self._baseline
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval_s):
+            self._peak = max(self._peak, _current_rss_mb())
+
+    def __exit__(self, *exc_info):
+        if self._baseline is not None:
+            self._stop.set()
+            self._thread.join()
+            self._peak = max(self._peak, _current_rss_mb())
+            self.peak_mb = self._peak - self._baseline
+        return False
+
+
+def _n_iterations(model):
+    # Boosting rounds actually used after early stopping
+    for attribute in ("best_iteration_", "best_iteration", "n_iter_"):
+        value = getattr(model, attribute, None)
+        if value is not None:
+            return int(np.max(value))
+    return None
+
+
+def _inference_latency(model, X):
+    """
+    :return: (median single-row predict_proba latency in ms, batch latency in ms)
+    """
+    with warnings.catch_warnings():
+        # Serving passes bare arrays; skip the feature-name warnings
+        warnings.simplefilter("ignore", UserWarning)
+        row = X[:1]
+        model.predict_proba(row)
+        timings = []
+        for _ in range(LATENCY_REPEATS):
+            started = time.perf_counter()
+            model.predict_proba(row)
+            timings.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        model.predict_proba(X[:LATENCY_BATCH_ROWS])
+        batch = time.perf_counter() - started
+    return float(np.median(timings)) * 1000.0, batch * 1000.0
+
+
+def _fit_candidate(
+    model_name,
+    estimator,
+    params,
+    feature_names,
+    X_train,
+    y_train,
+    X_val,
+    y_val,
+    X_test,
+    deadline,
+    threads=1,
+    fit_params=None,
+    evaluation=None,
+    sample_weight=None,
+):
+    """
+    Fits and scores one candidate in a worker process. The arrays arrive as
+    read-only memory maps shared by every worker. MLflow logging is left to the
+    parent so parallel workers never write to the same run.
+
+    The candidate is scored, and its operating threshold selected, on the
+    validation split only; the test split is left to the selected model.
+    :param X_train: Fit part of the training split, resampled if configured
+    :param X_val: Validation part, at the real class balance
+    :param X_test: Test features, used only to time inference
+    :param threads: Thread budget for the fit (OpenMP/BLAS pools included)
+    :param fit_params: Optional fn(X_val, y_val) -> fit() kwargs for early
+        stopping on the validation split
+    :param evaluation: Keyword arguments of evaluation.evaluate (target_alert_rate,
+        fp_cost, fn_cost)
+    :param sample_weight: Optional per-row training weights, ignored by estimators
+        whose fit() does not accept them
+    :return: Result dict, or None if the time budget ran out before it started
+    """
+    if deadline is not None and time.time() >= deadline:
+        return None
+
+    model = clone(estimator).set_params(**params)
+    # Frames over the shared arrays, so fitted models keep the column names
+    X_fit = pd.DataFrame(X_train, columns=feature_names, copy=False)
+    y_fit = y_train
+    X_val = pd.DataFrame(X_val, columns=feature_names, copy=False)
+    if sample_weight is not None and not has_fit_parameter(model, "sample_weight"):
+        sample_weight = None
+    fit_kwargs = fit_params(X_val, y_val) if fit_params is not None else {}
+    if sample_weight is not None:
+        fit_kwargs["sample_weight"] = sample_weight
+
+    started = time.perf_counter()
+    with threadpool_limits(limits=threads), _FitMemory() as memory:
+        model.fit(X_fit, y_fit, **fit_kwargs)
+    fit_time = time.perf_counter() - started
+    evaluation = evaluation or {}
+    # One predict_proba pass; every metric and the threshold sweep derive from it
+    metrics, curve = evaluate(y_val, model.predict_proba(X_val)[:, 1], **evaluation)
+    single_ms, batch_ms = _inference_latency(model, X_test)
+
+    performance = {
+        "fit_time_s": fit_time,
+        "fit_peak_rss_mb": memory.peak_mb,
+        "latency_single_ms": single_ms,
+        "latency_batch_ms": batch_ms,
+        "latency_batch_rows": min(len(X_test), LATENCY_BATCH_ROWS),
+        "train_rows": len(y_fit),
+    }
+    n_iterations = _n_iterations(model)
+    if n_iterations is not None:
+        performance["n_iterations"] = n_iterations
+
+    return {
+        "model_name": model_name,
+        "params": params,
+        "model": model,
+        "performance": performance,
+        "metrics": metrics,
+        "curve": curve,
+    }
 
 
 class ModelBuilder:
-    def __init__(self, data_path, target_column):
+    def __init__(
+        self,
+        data_path,
+        target_column,
+        n_jobs=1,
+        time_budget_s=None,
+        models=None,
+        target_alert_rate=None,
+        fp_cost=1.0,
+        fn_cost=1.0,
+        resampling="none",
+        resampling_ratio=5.0,
+    ):
+        """
+        :param models: MODEL_REGISTRY names to train; every default model if None
+        :param n_jobs: Core budget for training; candidates are fitted in parallel
+            processes (-1 uses every core)
+        :param time_budget_s: Optional wall-clock budget; candidates not started
+            before it runs out are skipped, except the first model's defaults
+        :param target_alert_rate: Share of transactions the operating threshold
+            may alert on; the F1-optimal threshold is used if None
+        :param fp_cost: Cost of a false alert in the reported cost metric
+        :param fn_cost: Cost of a missed fraud in the reported cost metric
+        :param resampling: resampling.RESAMPLING_STRATEGIES entry applied to the
+            fit part of the training split only; the validation and test splits
+            keep the real class balance
+        :param resampling_ratio: Negatives per positive the resampling targets
+        """
         self.data = pd.read_csv(data_path)
         self.target_column = target_column
         self.X = self.data.drop(columns=[target_column])
         self.y = self.data[target_column]
-        self.models = {
-            "Logistic Regression": LogisticRegression(),
-            "Decision Tree": DecisionTreeClassifier(),
-            "Random Forest": RandomForestClassifier(),
-            "Gradient Boosting": GradientBoostingClassifier(),
-            "MLP": MLPClassifier(max_iter=500),
+        self.n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else max(1, n_jobs)
+        self.time_budget_s = time_budget_s
+        self.models = build_models(models)
+        self.evaluation = {
+            "target_alert_rate": target_alert_rate,
+            "fp_cost": fp_cost,
+            "fn_cost": fn_cost,
         }
+        self.resampling = {"strategy": resampling, "ratio": resampling_ratio}
+        self.candidate_results = []
+        # Validation threshold_curve of the selected candidate of each model
+        self.curves = {}
+        # The model selected on validation, and its metrics and sweep on the test split
+        self.best_model_name = None
+        self.test_metrics = None
+        self.test_curve = None
 
     def split_data(self, test_size=0.2, random_state=42):
         self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
@@ -38,41 +359,169 @@ class ModelBuilder:
             stratify=self.y,
         )
 
-    def train_and_evaluate(self):
+    def candidates(self, param_grids=None):
+        """
+        Lists (model_name, params) pairs: every model's defaults first, then the
+        grid points round-robin across models, so a time budget cuts the search
+        evenly instead of starving the last models.
+        """
+        param_grids = param_grids or {}
+        grids = {
+            name: [params for params in ParameterGrid(param_grids.get(name, {})) if params]
+            for name in self.models
+        }
+        ordered = [(name, {}) for name in self.models]
+        for i in range(max((len(points) for points in grids.values()), default=0)):
+            ordered.extend(
+                (name, points[i]) for name, points in grids.items() if i < len(points)
+            )
+        return ordered
+
+    def train_and_evaluate(self, param_grids=None, search=False):
+        """
+        Fits every candidate across self.n_jobs cores and logs one MLflow run each.
+        :param param_grids: {model_name: {param: [values]}}; DEFAULT_PARAM_GRIDS if search
+        :return: {model_name: metrics} for the best (by validation PR-AUC)
+            candidate of each model, with its validation metrics at the operating
+            threshold selected on the validation split; self.models holds the
+            matching fitted estimators and self.curves their validation sweeps.
+            The test split is scored only for the model with the best validation
+            PR-AUC (self.best_model_name), in self.test_metrics and self.test_curve
+        """
+        if not self.models:
+            raise ValueError("No models to train; check --models and the installed boosters")
+        if search and param_grids is None:
+            param_grids = DEFAULT_PARAM_GRIDS
+        candidates = self.candidates(param_grids)
+        workers = min(self.n_jobs, len(candidates))
+        # Split the core budget between parallel fits and estimators' own n_jobs
+        inner_jobs = max(1, self.n_jobs // workers)
+        deadline = time.time() + self.time_budget_s if self.time_budget_s else None
+
+        X_test = np.ascontiguousarray(self.X_test.to_numpy(dtype=np.float64))
+        # The validation split the thresholds are selected on (and boosters stop
+        # early on) keeps the real class balance; only the fit part is resampled,
+        # once here, so the workers map the smaller arrays
+        X_train, X_val, y_train, y_val = train_test_split(
+            self.X_train.to_numpy(dtype=np.float64),
+            self.y_train.to_numpy(),
+            test_size=VALIDATION_FRACTION,
+            random_state=42,
+            stratify=self.y_train,
+        )
+        X_train, y_train, sample_weight = resample(X_train, y_train, **self.resampling)
+        X_train = np.ascontiguousarray(X_train)
+        X_val = np.ascontiguousarray(X_val)
+        feature_names = list(self.X_train.columns)
+
+        estimators = {}
+        for name, model in self.models.items():
+            if "n_jobs" in model.get_params():
+                model = clone(model).set_params(n_jobs=inner_jobs)
+            if sample_weight is not None and not has_fit_parameter(model, "sample_weight"):
+                warnings.warn(
+                    f"{name} does not accept sample_weight; it is fitted without "
+                    f"the {self.resampling['strategy']} resampling"
+                )
+            estimators[name] = model
+
+        # Arrays above max_nbytes are dumped once and memory-mapped by every worker
+        outputs = Parallel(n_jobs=workers, backend="loky", max_nbytes="1M", mmap_mode="r")(
+            delayed(_fit_candidate)(
+                name,
+                estimators[name],
+                params,
+                feature_names,
+                X_train,
+                y_train,
+                X_val,
+                y_val,
+                X_test,
+                # The first default candidate always runs, so there is a model to deploy
+                deadline if i else None,
+                inner_jobs,
+                MODEL_REGISTRY.get(name, {}).get("fit_params"),
+                self.evaluation,
+                sample_weight,
+            )
+            for i, (name, params) in enumerate(candidates)
+        )
+        self.candidate_results = [output for output in outputs if output is not None]
+
+        # Ranked by validation PR-AUC, which does not depend on a threshold and
+        # suits the rare fraud class better than ROC-AUC
+        best = {}
+        for result in self.candidate_results:
+            name = result["model_name"]
+            pr_auc = result["metrics"]["pr_auc"]
+            if name not in best or pr_auc > best[name]["metrics"]["pr_auc"]:
+                best[name] = result
+        # Models are compared on validation too; the test split is scored once,
+        # for the selected model, so its metrics are not biased by the search
+        self.best_model_name = max(best, key=lambda name: best[name]["metrics"]["pr_auc"])
+        selected = best[self.best_model_name]
+        self.test_metrics, self.test_curve = evaluate(
+            self.y_test.to_numpy(),
+            selected["model"].predict_proba(self.X_test)[:, 1],
+            fp_cost=self.evaluation["fp_cost"],
+            fn_cost=self.evaluation["fn_cost"],
+            threshold=selected["metrics"]["threshold"],
+        )
+
+        # Imported here so loading a model never pulls in MLflow
+        import mlflow
+        import mlflow.sklearn
+
         results = {}
-        for model_name, model in self.models.items():
-            with mlflow.start_run(run_name=model_name):
-                # Train the model
-                print("X_train columns:", self.X_train.columns)
-                print("X_train data types:\n", self.X_train.dtypes)
-                print("Columns with missing values:")
-                print(self.X_train.isnull().sum())
-                model.fit(self.X_train, self.y_train)
-                y_pred = model.predict(self.X_test)
-
-                # Evaluate metrics
-                accuracy = accuracy_score(self.y_test, y_pred)
-                precision = precision_score(self.y_test, y_pred)
-                recall = recall_score(self.y_test, y_pred)
-                f1 = f1_score(self.y_test, y_pred)
-                roc_auc = roc_auc_score(self.y_test, y_pred)
-
-                # Log metrics and parameters
-                mlflow.log_metric("accuracy", accuracy)
-                mlflow.log_metric("precision", precision)
-                mlflow.log_metric("recall", recall)
-                mlflow.log_metric("f1_score", f1)
-                mlflow.log_metric("roc_auc", roc_auc)
-
-                # Log the model
-                mlflow.sklearn.log_model(model, f"{model_name}_model")
-
-                # Store results
-                results[model_name] = {
-                    "accuracy": accuracy,
-                    "precision": precision,
-                    "recall": recall,
-                    "f1_score": f1,
-                    "roc_auc": roc_auc,
-                }
+        for result in self.candidate_results:
+            name = result["model_name"]
+            is_best = best[name] is result
+            with mlflow.start_run(run_name=name):
+                mlflow.log_params(result["params"])
+                mlflow.log_params(
+                    {f"resampling_{key}": value for key, value in self.resampling.items()}
+                )
+                mlflow.log_metrics(
+                    {f"val_{key}": value for key, value in result["metrics"].items()}
+                )
+                mlflow.log_metrics(result["performance"])
+                if result is selected:
+                    mlflow.log_metrics(
+                        {f"test_{key}": value for key, value in self.test_metrics.items()}
+                    )
+                # Log the model only for the best candidate of each model
+                if is_best:
+                    mlflow.sklearn.log_model(
+                        result["model"],
+                        f"{name}_model",
+                        serialization_format=mlflow.sklearn.SERIALIZATION_FORMAT_CLOUDPICKLE,
+                    )
+            if is_best:
+                self.models[name] = result["model"]
+                self.curves[name] = result["curve"]
+                results[name] = dict(
+                    result["metrics"], **result["performance"], params=result["params"]
+                )
         return results
+
+    def export_compiled(self, model_name, path, tolerance=1e-6):
+        """
+        Compiles a trained model into a NumPy-only artifact for serving.
+        :param model_name: Key of the fitted model in self.models
+        :param path: Output .npz file
+        :param tolerance: Largest allowed difference from the model's own
+            predict_proba on the test split
+        :return: The CompiledModel
+        """
+        model = self.models[model_name]
+        compiled = compile_model(model)
+        X_test = self.X_test.to_numpy(dtype=np.float64)
+        difference = np.max(
+            np.abs(compiled.predict_proba(X_test)[:, 1] - model.predict_proba(self.X_test)[:, 1])
+        )
+        if difference > tolerance:
+            raise ValueError(
+                f"Compiled {model_name} differs from the model by {difference:.3g}"
+            )
+        compiled.save(path)
+        return compiled
@@ -0,0 +1,190 @@
+import logging
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+
+try:
+    from src.compiled_model import COMPILED_EXTENSION, CompiledModel
+    from src.evaluation import load_threshold
+    from src.feature_transformer import FeatureTransformer
+    from src.prediction_cache import model_version
+    from src.reason_codes import ReasonCodeExplainer
+except ImportError:
+    from compiled_model import COMPILED_EXTENSION, CompiledModel
+    from evaluation import load_threshold
+    from feature_transformer import FeatureTransformer
+    from prediction_cache import model_version
+    from reason_codes import ReasonCodeExplainer
+
+logger = logging.getLogger(__name__)
+
+
+class ModelBundle:
+    """
+    A model with the artifacts fitted alongside it. Requests take one bundle and
+    use it throughout, so a reload never mixes a transformer with another model.
+    threshold is the model's tuned operating threshold, None if it has none.
+    """
+
+    def __init__(self, model, transformer=None, explainer=None, version="", threshold=None):
+        self.model = model
+        self.transformer = transformer
+        self.explainer = explainer
+        self.version = version
+        self.threshold = threshold
+        self.feature_names = (
+            transformer.feature_names
+            if transformer is not None
+            else list(getattr(model, "feature_names_in_", []))
+        )
+        self.n_features = (
+            transformer.n_features
+            if transformer is not None
+            else getattr(model, "n_features_in_", len(self.feature_names))
+        )
+
+    def warm_up(self):
+        """
+        Runs one prediction (and explanation) so lazily built model state exists
+        before the first request; in a preloading server it is then shared.
+        """
+        row = np.zeros((1, self.n_features))
+        self.model.predict_proba(row)
+        if self.explainer is not None:
+            self.explainer.contributions(row)
+
+
+class ModelStore:
+    """
+    Holds the current ModelBundle and swaps in a new one when the model,
+    transformer, explainer or threshold file changes.
+
+    A changed file is loaded only once its size and mtime have been stable for
+    one poll, so a file still being copied is not picked up. The new bundle is
+    loaded and warmed up before it replaces the old one; requests holding the
+    old bundle finish with it. If loading fails the old bundle stays in place.
+    """
+
+    def __init__(
+        self,
+        model_path,
+        transformer_path=None,
+        explainer_path=None,
+        version=None,
+        threshold_path=None,
+    ):
+        self.model_path = model_path
+        self.transformer_path = transformer_path
+        self.explainer_path = explainer_path
+        self.threshold_path = threshold_path
+        self.reloads = 0
+        self.last_error = None
+        self._listeners = []
+        self._watcher = None
+        self._pending_signature = None
+        self._signature = self.signature()
+        self.bundle = self.load(version)
+
+    def signature(self):
+        # (mtime, size) of every artifact, None for the ones that do not exist
+        signature = []
+        paths = (self.model_path, self.transformer_path, self.explainer_path, self.threshold_path)
+        for path in paths:
+            try:
+                stat = os.stat(path) if path else None
+            except FileNotFoundError:
+                stat = None
+            signature.append(None if stat is None else (stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def load(self, version=None):
+        """
+        :param version: Model version to report; the model file's hash if None
+        :return: Warmed-up ModelBundle read from the configured paths
+        """
+        transformer = explainer = threshold = None
+        if self.transformer_path and os.path.exists(self.transformer_path):
+            transformer = FeatureTransformer.load(self.transformer_path)
+        if self.explainer_path and os.path.exists(self.explainer_path):
+            explainer = ReasonCodeExplainer.load(self.explainer_path)
+        if self.threshold_path and os.path.exists(self.threshold_path):
+            threshold = load_threshold(self.threshold_path)
+        # Compiled artifacts are scored with NumPy alone
+        model = (
+            CompiledModel.load(self.model_path)
+            if self.model_path.endswith(COMPILED_EXTENSION)
+            else joblib.load(self.model_path)
+        )
+        bundle = ModelBundle(
+            model,
+            transformer,
+            explainer,
+            version or model_version(self.model_path),
+            threshold,
+        )
+        bundle.warm_up()
+        return bundle
+
+    def subscribe(self, listener):
+        """
+        :param listener: Called with the new bundle after every reload
+        """
+        self._listeners.append(listener)
+
+    def reload_if_changed(self):
+        """
+        :return: True if a new bundle was swapped in
+        """
+        signature = self.signature()
+        if signature == self._signature:
+            self._pending_signature = None
+            return False
+        if signature != self._pending_signature:
+            # Wait one more poll in case the file is still being written
+            self._pending_signature = signature
+            return False
+        try:
+            bundle = self.load()
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.error(f"Model reload failed: {self.last_error}", exc_info=True)
+            return False
+        self.bundle = bundle
+        self._signature = signature
+        self._pending_signature = None
+        self.reloads += 1
+        self.last_error = None
+        logger.info(f"Loaded model version {bundle.version}")
+        for listener in self._listeners:
+            listener(bundle)
+        return True
+
+    def watch(self, interval_s):
+        """
+        Polls for changed artifacts every interval_s seconds in a daemon thread.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return self._watcher
+
+        def run():
+            while True:
+                time.sleep(interval_s)
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    logger.error(f"Model watcher error: {str(e)}", exc_info=True)
+
+        self._watcher = threading.Thread(target=run, daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stats(self):
+        return {
+            "model_version": self.bundle.version,
+            "threshold": self.bundle.threshold,
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,519 @@
+# src/online_learning.py
+"""
+Incremental model updates from a stream of labeled transactions.
+
+Models with partial_fit (SGD, MLP) are updated in place; LightGBM and XGBoost
+boost a few more rounds on each mini-batch starting from their current
+booster. Every update is validated on a rolling holdout of recent labeled
+rows, which are never trained on, and published only if it scores at least
+as well there as the model being served. Publishing replaces the model file
+atomically, so a serving ModelStore watching it reloads the new version
+without a restart.
+"""
+
+import argparse
+import copy
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+
+try:
+    from src.compiled_model import compile_model
+    from src.evaluation import evaluate, save_threshold
+    from src.feature_transformer import FeatureTransformer
+    from src.kafka_consumer import create_consumer
+    from src.model_builder import load_model
+    from src.velocity import VelocityTracker, create_tracker, update_once
+except ImportError:
+    from compiled_model import compile_model
+    from evaluation import evaluate, save_threshold
+    from feature_transformer import FeatureTransformer
+    from kafka_consumer import create_consumer
+    from model_builder import load_model
+    from velocity import VelocityTracker, create_tracker, update_once
+
+logger = logging.getLogger(__name__)
+
+CLASSES = np.array([0, 1])
+# Trees added to a booster per mini-batch
+BOOSTING_ROUNDS = 10
+
+
+def supports_incremental(model):
+    return hasattr(model, "partial_fit") or type(model).__name__ in (
+        "LGBMClassifier",
+        "XGBClassifier",
+    )
+
+
+def update_model(model, X, y, boosting_rounds=BOOSTING_ROUNDS):
+    """
+    Trains a copy of model further on one mini-batch; model itself is left
+    unchanged, so a failed update leaves nothing half-applied.
+    :param X: Features, a DataFrame if the model was fitted with column names
+    :return: The updated model; for boosters it holds the old and the new trees
+    """
+    name = type(model).__name__
+    if hasattr(model, "partial_fit"):
+        updated = copy.deepcopy(model)
+        updated.partial_fit(X, y, classes=CLASSES)
+        return updated
+    if name == "LGBMClassifier":
+        updated = clone(model).set_params(n_estimators=boosting_rounds)
+        return updated.fit(X, y, init_model=model.booster_)
+    if name == "XGBClassifier":
+        updated = clone(model).set_params(n_estimators=boosting_rounds, early_stopping_rounds=None)
+        return updated.fit(X, y, xgb_model=model.get_booster(), verbose=False)
+    raise TypeError(f"{name} does not support incremental updates")
+
+
+def publish_model(model, path, compiled_path=None):
+    """
+    Writes the model to a temporary file and renames it over path, so readers
+    only ever see the previous or the new model.
+    :param compiled_path: Optional .npz path for a compiled copy as well; skipped
+        with a warning for models that cannot be compiled
+    """
+    import joblib
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+    if compiled_path:
+        try:
+            compiled = compile_model(model)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Not publishing a compiled {type(model).__name__}: {e}")
+            return
+        compiled.save(compiled_path)
+
+
+class RollingHoldout:
+    """
+    The most recent max_rows labeled rows kept aside for validation, in a
+    fixed-size ring buffer.
+    """
+
+    def __init__(self, n_features, max_rows=20000):
+        self.X = np.zeros((max_rows, n_features), dtype=np.float64)
+        self.y = np.zeros(max_rows, dtype=np.int64)
+        self.max_rows = max_rows
+        self.rows = 0
+        self._next = 0
+
+    def add(self, X, y):
+        # Only the newest max_rows of an oversized batch can be kept
+        X, y = X[-self.max_rows:], y[-self.max_rows:]
+        positions = (self._next + np.arange(len(y))) % self.max_rows
+        self.X[positions] = X
+        self.y[positions] = y
+        self._next = (self._next + len(y)) % self.max_rows
+        self.rows = min(self.max_rows, self.rows + len(y))
+
+    def arrays(self):
+        return self.X[: self.rows], self.y[: self.rows]
+
+    def has_both_classes(self):
+        labels = self.y[: self.rows]
+        return bool(labels.any()) and not bool(labels.all())
+
+
+class OnlineUpdater:
+    """
+    Consumes labeled transactions from Kafka in mini-batches and keeps the
+    served model up to date.
+
+    Each poll is one mini-batch. A holdout_fraction of its rows goes to the
+    rolling holdout, the rest update the model. At most once every
+    publish_interval_s, the updated model is scored on the holdout next to the
+    published one and replaces it if its PR-AUC is no more than tolerance
+    lower, so serving is not reloading on every batch.
+
+    Every event is applied at most once. The next offset of each partition is
+    recorded once its batch is applied, and messages below it are skipped
+    when a batch is consumed again, e.g. after a failed publish. An update
+    that fails is logged and its rows are not retried. Events without a valid
+    label are logged and skipped.
+
+    With a velocity tracker, events are encoded with the same velocity
+    features as in ScoringWorker.score. Counts an event already carries (the
+    ones it was scored with) are kept; the tracker fills in the others from
+    the labeled stream it sees. A batch that is rewound and consumed again
+    reuses the counts its events got, so each event is counted once.
+
+    Offsets are committed only once the applied events are on disk. With a
+    checkpoint_path, the model, holdout, applied offsets and (local) velocity
+    tracker are checkpointed after every validation (and publish), then committed; a
+    restarted updater resumes from the checkpoint. Without one, offsets are
+    committed only after a publish, so events the published model lacks are
+    consumed again.
+    """
+
+    def __init__(
+        self,
+        consumer,
+        model,
+        model_path,
+        transformer=None,
+        label_field="class",
+        compiled_path=None,
+        threshold_path=None,
+        target_alert_rate=None,
+        holdout_fraction=0.2,
+        holdout_rows=20000,
+        min_holdout_rows=200,
+        tolerance=0.0,
+        publish_interval_s=60.0,
+        checkpoint_path=None,
+        velocity=None,
+        max_records=1000,
+        poll_timeout_ms=1000,
+        random_state=42,
+    ):
+        if not supports_incremental(model):
+            raise TypeError(f"{type(model).__name__} does not support incremental updates")
+        if compiled_path:
+            try:
+                compile_model(model)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Publishing without a compiled copy: {e}")
+                compiled_path = None
+        self.consumer = consumer
+        self.model = model
+        # The version being served; self.model keeps learning past it
+        self.published = copy.deepcopy(model)
+        self.model_path = model_path
+        self.transformer = transformer
+        self.label_field = label_field
+        self.compiled_path = compiled_path
+        self.threshold_path = threshold_path
+        self.target_alert_rate = target_alert_rate
+        self.holdout_fraction = holdout_fraction
+        self.min_holdout_rows = min_holdout_rows
+        self.tolerance = tolerance
+        self.publish_interval_s = publish_interval_s
+        self.checkpoint_path = checkpoint_path
+        # Optional velocity tracker; shared (RedisVelocityTracker) when several
+        # updaters consume the label topic
+        self.velocity = velocity
+        self.max_records = max_records
+        self.poll_timeout_ms = poll_timeout_ms
+        self.feature_names = (
+            transformer.feature_names
+            if transformer is not None
+            else list(getattr(model, "feature_names_in_", []))
+        )
+        self.holdout = RollingHoldout(len(self.feature_names), holdout_rows)
+        self.rng = np.random.default_rng(random_state)
+        self.updates = 0
+        self.publishes = 0
+        self.last_validation = None
+        # Partition -> offset after the last applied message
+        self.applied = {}
+        self._last_check = None
+        self._uncommitted = False
+        # (partition, offset) -> velocity features of a batch not applied yet
+        self._velocity_applied = {}
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            self.restore_checkpoint()
+
+    def _features(self, X):
+        # Frames keep the column names models fitted on DataFrames expect
+        if hasattr(self.model, "feature_names_in_"):
+            return pd.DataFrame(X, columns=self.feature_names, copy=False)
+        return X
+
+    def _labeled(self, events, keys):
+        labeled = []
+        for event, key in zip(events, keys):
+            label = event.get(self.label_field) if isinstance(event, dict) else None
+            if label in (0, 1, "0", "1", True, False):
+                labeled.append((event, int(label), key))
+            else:
+                logger.warning(f"Skipping event without a 0/1 {self.label_field}: {event!r:.200}")
+        return labeled
+
+    def _encode(self, events, keys=None):
+        if self.velocity is not None:
+            applied = self._velocity_applied
+            events = [
+                {**update_once(self.velocity, event, key, applied), **event}
+                for event, key in zip(events, keys or [None] * len(events))
+            ]
+        if self.transformer is not None:
+            X = self.transformer.transform_records(events)
+        else:
+            # Missing or non-numeric fields become NaN rather than failing the batch
+            X = (
+                pd.DataFrame(events)
+                .reindex(columns=self.feature_names)
+                .apply(pd.to_numeric, errors="coerce")
+                .to_numpy(dtype=np.float64)
+            )
+        return X
+
+    def validate(self):
+        """
+        :return: {"pr_auc", "published_pr_auc", "holdout_rows", "metrics"} where
+            metrics are the updated model's evaluate() metrics; None while the
+            holdout is too small or holds a single class
+        """
+        if self.holdout.rows < self.min_holdout_rows or not self.holdout.has_both_classes():
+            return None
+        X, y = self.holdout.arrays()
+        X = self._features(X)
+        metrics, _ = evaluate(
+            y, self.model.predict_proba(X)[:, 1], target_alert_rate=self.target_alert_rate
+        )
+        published, _ = evaluate(y, self.published.predict_proba(X)[:, 1])
+        return {
+            "pr_auc": metrics["pr_auc"],
+            "published_pr_auc": published["pr_auc"],
+            "holdout_rows": self.holdout.rows,
+            "metrics": metrics,
+        }
+
+    def publish(self, validation):
+        publish_model(self.model, self.model_path, self.compiled_path)
+        if self.threshold_path:
+            # Re-tuned on the holdout the model was just validated on
+            save_threshold(
+                self.threshold_path,
+                validation["metrics"],
+                model_name=type(self.model).__name__,
+                target_alert_rate=self.target_alert_rate,
+                holdout_rows=validation["holdout_rows"],
+            )
+        self.published = copy.deepcopy(self.model)
+        self.publishes += 1
+        logger.info(
+            f"Published update {self.updates}: holdout PR-AUC {validation['pr_auc']:.4f}"
+        )
+
+    def apply(self, events, keys=None):
+        """
+        Updates the model with one mini-batch of labeled events and adds its
+        held-out rows to the holdout.
+        :param keys: Optional (partition, offset) per event; an event already
+            counted by the velocity tracker reuses its features
+        :return: Number of events applied
+        """
+        labeled = self._labeled(events, keys or [None] * len(events))
+        if not labeled:
+            return 0
+        X = self._encode([event for event, _, _ in labeled], [key for _, _, key in labeled])
+        y = np.array([label for _, label, _ in labeled])
+        held_out = self.rng.random(len(y)) < self.holdout_fraction
+        self.holdout.add(X[held_out], y[held_out])
+        if not held_out.all():
+            try:
+                self.model = update_model(self.model, self._features(X[~held_out]), y[~held_out])
+                self.updates += 1
+            except Exception as e:
+                logger.error(f"Skipping a failed update of {len(y)} rows: {e}", exc_info=True)
+        return len(y)
+
+    def maybe_publish(self):
+        """
+        Validates and, if it validates, publishes the model once the publish
+        interval has passed.
+        :return: True if a new model was published
+        """
+        if (
+            self._last_check is not None
+            and time.monotonic() - self._last_check < self.publish_interval_s
+        ):
+            return False
+        validation = self.validate()
+        if validation is None:
+            return False
+        self._last_check = time.monotonic()
+        self.last_validation = {
+            key: value for key, value in validation.items() if key != "metrics"
+        }
+        if validation["pr_auc"] < validation["published_pr_auc"] - self.tolerance:
+            return False
+        self.publish(validation)
+        return True
+
+    def save_checkpoint(self):
+        """
+        Writes the learning state the published model file does not hold.
+        """
+        import joblib
+
+        state = {
+            "model": self.model,
+            "holdout": self.holdout,
+            "applied": self.applied,
+            "rng": self.rng,
+            "updates": self.updates,
+            # Redis-backed counts are kept by Redis
+            "velocity": self.velocity if isinstance(self.velocity, VelocityTracker) else None,
+        }
+        tmp_path = f"{self.checkpoint_path}.tmp{os.getpid()}"
+        joblib.dump(state, tmp_path)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def restore_checkpoint(self):
+        import joblib
+
+        state = joblib.load(self.checkpoint_path)
+        self.model = state["model"]
+        self.holdout = state["holdout"]
+        self.applied = state["applied"]
+        self.rng = state["rng"]
+        self.updates = state["updates"]
+        if isinstance(self.velocity, VelocityTracker) and state["velocity"] is not None:
+            self.velocity = state["velocity"]
+        logger.info(f"Resumed from {self.checkpoint_path} after {self.updates} updates")
+
+    def run_once(self):
+        """
+        Polls and applies one mini-batch, then publishes if due.
+        :return: Number of new messages consumed
+        """
+        batches = self.consumer.poll(
+            timeout_ms=self.poll_timeout_ms, max_records=self.max_records
+        )
+        batches = {
+            partition: [
+                message for message in records
+                if message.offset >= self.applied.get(partition, 0)
+            ]
+            for partition, records in batches.items()
+        }
+        batches = {partition: records for partition, records in batches.items() if records}
+        messages = [message for records in batches.values() for message in records]
+        if messages:
+            try:
+                self.apply(
+                    [message.value for message in messages],
+                    [(message.partition, message.offset) for message in messages],
+                )
+            except Exception:
+                # Nothing was applied; rewind so the batch is consumed again
+                for partition, records in batches.items():
+                    self.consumer.seek(partition, records[0].offset)
+                raise
+            for partition, records in batches.items():
+                self.applied[partition] = records[-1].offset + 1
+            # Applied offsets are never consumed again
+            self._velocity_applied = {}
+            self._uncommitted = True
+        last_check = self._last_check
+        published = self.maybe_publish()
+        if self._uncommitted and (
+            published or (self.checkpoint_path and self._last_check != last_check)
+        ):
+            if self.checkpoint_path:
+                self.save_checkpoint()
+            self.consumer.commit()
+            self._uncommitted = False
+        return len(messages)
+
+    def run(self, stop_event=None, retry_backoff_s=1.0):
+        while stop_event is None or not stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Online update failed: {str(e)}", exc_info=True)
+                time.sleep(retry_backoff_s)
+
+    def stats(self):
+        return {
+            "updates": self.updates,
+            "publishes": self.publishes,
+            "holdout_rows": self.holdout.rows,
+            "last_validation": self.last_validation,
+        }
+
+
+def run_updater(args=None):
+    parser = argparse.ArgumentParser(description="Online model updates from labeled transactions")
+    parser.add_argument("--bootstrap-servers", default="localhost:9092")
+    parser.add_argument("--label-topic", default="fraud-labels")
+    parser.add_argument("--group-id", default="fraud-online-learner")
+    parser.add_argument("--label-field", default="class")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--model", default="models/fraud_detection_model.pkl")
+    parser.add_argument(
+        "--compiled-model", help="Also publish a compiled copy here (.npz) for serving"
+    )
+    parser.add_argument("--transformer", default="models/feature_transformer.pkl")
+    parser.add_argument("--threshold-path", default="models/threshold.json")
+    parser.add_argument("--target-alert-rate", type=float)
+    parser.add_argument("--holdout-fraction", type=float, default=0.2)
+    parser.add_argument("--holdout-rows", type=int, default=20000)
+    parser.add_argument("--tolerance", type=float, default=0.0)
+    parser.add_argument("--publish-interval-s", type=float, default=60.0)
+    parser.add_argument(
+        "--checkpoint",
+        default="models/online_checkpoint.pkl",
+        help="Updater state saved before offsets are committed ('' to commit only on publish)",
+    )
+    parser.add_argument(
+        "--serializer", default="json", choices=["json", "orjson", "msgpack"]
+    )
+    parser.add_argument(
+        "--velocity-store",
+        default="redis",
+        choices=["redis", "local"],
+        help="Where velocity counts are kept; 'local' only with a single updater",
+    )
+    parser.add_argument("--redis-host", default="localhost")
+    parser.add_argument("--redis-port", type=int, default=6379)
+    args = parser.parse_args(args)
+
+    transformer = None
+    if args.transformer and os.path.exists(args.transformer):
+        transformer = FeatureTransformer.load(args.transformer)
+    model = load_model(args.model)
+    feature_names = (
+        transformer.feature_names
+        if transformer is not None
+        else list(getattr(model, "feature_names_in_", []))
+    )
+    # Labeled events are counted apart from the scored ones, which they repeat
+    velocity = create_tracker(
+        feature_names,
+        args.velocity_store,
+        args.redis_host,
+        args.redis_port,
+        prefix="velocity-labels",
+    )
+    updater = OnlineUpdater(
+        consumer=create_consumer(
+            args.bootstrap_servers,
+            args.label_topic,
+            args.group_id,
+            args.batch_size,
+            serializer=args.serializer,
+        ),
+        model=model,
+        model_path=args.model,
+        transformer=transformer,
+        label_field=args.label_field,
+        compiled_path=args.compiled_model,
+        threshold_path=args.threshold_path,
+        target_alert_rate=args.target_alert_rate,
+        holdout_fraction=args.holdout_fraction,
+        holdout_rows=args.holdout_rows,
+        tolerance=args.tolerance,
+        publish_interval_s=args.publish_interval_s,
+        checkpoint_path=args.checkpoint or None,
+        velocity=velocity,
+        max_records=args.batch_size,
+    )
+    updater.run()
+
+
+if __name__ == "__main__":
+    run_updater()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def model_version(model_path):
+    """
+    Identifies a model file by the hash of its contents.
+    :return: First 12 hex characters of the SHA-1 digest
+    """
+    digest = hashlib.sha1()
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class TierStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.total_ms = 0.0
+
+    def record(self, hit, started):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.total_ms += (time.perf_counter() - started) * 1000.0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "mean_latency_ms": self.total_ms / lookups if lookups else 0.0,
+        }
+
+
+class LocalCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire after ttl seconds.
+    """
+
+    def __init__(self, max_size=10000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PredictionCache:
+    """
+    Two-tier prediction cache: an in-process LRU/TTL tier in front of Redis.
+
+    Keys are compact hashes of the normalized feature vector prefixed with the
+    model version, so changing the model invalidates every earlier entry. The
+    full result (label, probability, model version) is cached. When Redis
+    fails, the Redis tier is skipped for retry_interval seconds rather than
+    adding a connection timeout to every request.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        model_version="",
+        local_size=10000,
+        local_ttl=60,
+        redis_ttl=3600,
+        retry_interval=5.0,
+    ):
+        self.redis = redis_client
+        self.model_version = model_version
+        self.local = LocalCache(max_size=local_size, ttl=local_ttl)
+        self.redis_ttl = redis_ttl
+        self.retry_interval = retry_interval
+        self._redis_down_until = 0.0
+        self.local_stats = TierStats()
+        self.redis_stats = TierStats()
+
+    def set_model_version(self, version):
+        if version != self.model_version:
+            self.model_version = version
+            self.local.clear()
+
+    def key(self, row):
+        # Normalize -0.0 to 0.0 so equal feature vectors hash equally
+        row = np.ascontiguousarray(row, dtype=np.float64) + 0.0
+        digest = hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest()
+        return f"pred:{self.model_version}:{digest}"
+
+    def _redis_available(self):
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self):
+        self.redis_stats.errors += 1
+        self._redis_down_until = time.monotonic() + self.retry_interval
+
+    def get(self, key):
+        """
+        :return: Cached result dict, or None on a miss in both tiers
+        """
+        started = time.perf_counter()
+        result = self.local.get(key)
+        self.local_stats.record(result is not None, started)
+        if result is not None or not self._redis_available():
+            return result
+
+        started = time.perf_counter()
+        try:
+            cached = self.redis.get(key)
+        except Exception:
+            self._redis_failed()
+            return None
+        self.redis_stats.record(cached is not None, started)
+        if cached is None:
+            return None
+
+        result = json.loads(cached)
+        self.local.set(key, result)
+        return result
+
+    def set(self, key, result):
+        self.local.set(key, result)
+        if not self._redis_available():
+            return
+        try:
+            self.redis.setex(key, self.redis_ttl, json.dumps(result, separators=(",", ":")))
+        except Exception:
+            self._redis_failed()
+
+    def stats(self):
+        return {
+            "model_version": self.model_version,
+            "local": {**self.local_stats.as_dict(), "size": len(self.local)},
+            "redis": self.redis_stats.as_dict(),
+        }
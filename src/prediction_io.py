@@ -0,0 +1,72 @@
+"""
+Chunked file I/O shared by the bulk jobs (batch scoring, bulk LIME): reading
+JSONL/CSV/Parquet inputs in chunks and writing results with an atomic rename.
+"""
+
+import os
+
+import pandas as pd
+
+
+def iter_chunks(path, chunk_size):
+    """
+    Streams a JSONL/NDJSON, CSV or Parquet file as DataFrames of at most chunk_size rows.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson", ".json"):
+        yield from pd.read_json(
+            path, lines=True, chunksize=chunk_size, dtype=False, convert_dates=False
+        )
+    elif extension == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif extension == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported input format: {path}")
+
+
+class PredictionWriter:
+    """
+    Appends prediction chunks to a CSV, JSONL or Parquet file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.extension = os.path.splitext(path)[1].lower()
+        if self.extension not in (".csv", ".jsonl", ".ndjson", ".parquet"):
+            raise ValueError(f"Unsupported output format: {path}")
+        self._tmp_path = f"{path}.tmp{os.getpid()}"
+        self._parquet_writer = None
+        self._rows = 0
+
+    def write(self, predictions):
+        if self.extension == ".csv":
+            predictions.to_csv(
+                self._tmp_path,
+                mode="a" if self._rows else "w",
+                header=not self._rows,
+                index=False,
+            )
+        elif self.extension == ".parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(predictions, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self._tmp_path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            with open(self._tmp_path, "a" if self._rows else "w") as f:
+                predictions.to_json(f, orient="records", lines=True, double_precision=15)
+        self._rows += len(predictions)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if not self._rows:
+            open(self._tmp_path, "w").close()
+        os.replace(self._tmp_path, self.path)
+        return self._rows
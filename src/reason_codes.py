@@ -0,0 +1,161 @@
+import joblib
+import numpy as np
+
+# Model classes TreeExplainer computes exact SHAP values for
+TREE_MODEL_NAMES = (
+    "DecisionTreeClassifier",
+    "RandomForestClassifier",
+    "ExtraTreesClassifier",
+    "GradientBoostingClassifier",
+    "HistGradientBoostingClassifier",
+    "LGBMClassifier",
+    "XGBClassifier",
+)
+# Training rows the surrogate of a non-linear, non-tree model is fitted on
+SURROGATE_ROWS = 5000
+
+
+def explainer_kind(model):
+    """
+    Picks the fastest exact algorithm for the model type.
+    :return: "tree", "linear" or "permutation" (model-agnostic fallback)
+    """
+    if type(model).__name__ in TREE_MODEL_NAMES:
+        return "tree"
+    if hasattr(model, "coef_") and hasattr(model, "intercept_"):
+        return "linear"
+    return "permutation"
+
+
+def top_contributions(contributions, values, feature_names, top_k=5):
+    """
+    :return: The top_k features of one row by absolute contribution, largest first
+    """
+    top_k = min(top_k, len(contributions))
+    order = np.argpartition(-np.abs(contributions), top_k - 1)[:top_k]
+    order = order[np.argsort(-np.abs(contributions[order]))]
+    return [
+        {
+            "feature": feature_names[i],
+            "value": float(values[i]),
+            "contribution": float(contributions[i]),
+        }
+        for i in order
+    ]
+
+
+class ReasonCodeExplainer:
+    """
+    Per-prediction feature contributions (reason codes), built once at training
+    time and persisted next to the model.
+
+    Tree models use path-dependent tree SHAP. Linear models use the exact linear
+    SHAP values coef * (x - mean), in log-odds. Any other model is explained
+    through a linear surrogate fitted to its log-odds on training data, whose
+    fidelity (R^2) is kept in surrogate_r2. Nothing is sampled per request.
+    """
+
+    def __init__(self, model, feature_names, kind, coef=None, mean=None, base_value=None):
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.kind = kind
+        self.coef = coef
+        self.mean = mean
+        self.base_value = base_value
+        self.surrogate_r2 = None
+        self._tree_explainer = None
+
+    @classmethod
+    def build(cls, model, X_train, feature_names=None, random_state=42):
+        """
+        :param X_train: Training features (DataFrame or array)
+        :return: ReasonCodeExplainer ready to save
+        """
+        if feature_names is None:
+            feature_names = list(X_train.columns)
+        X = np.asarray(X_train, dtype=np.float64)
+        kind = explainer_kind(model)
+        if kind == "tree":
+            explainer = cls(model, feature_names, "tree")
+            explainer._tree_explainer_or_build()
+            return explainer
+
+        mean = X.mean(axis=0)
+        if kind == "linear":
+            coef = np.ravel(model.coef_[-1] if np.ndim(model.coef_) == 2 else model.coef_)
+            intercept = float(np.ravel(model.intercept_)[-1])
+            return cls(model, feature_names, "linear", coef, mean, intercept + coef @ mean)
+
+        from sklearn.linear_model import Ridge
+
+        rng = np.random.default_rng(random_state)
+        if len(X) > SURROGATE_ROWS:
+            X = X[rng.choice(len(X), SURROGATE_ROWS, replace=False)]
+        probabilities = np.clip(model.predict_proba(X)[:, 1], 1e-6, 1 - 1e-6)
+        log_odds = np.log(probabilities / (1 - probabilities))
+        surrogate = Ridge(alpha=1e-3).fit(X, log_odds)
+        explainer = cls(
+            model,
+            feature_names,
+            "surrogate",
+            surrogate.coef_,
+            mean,
+            float(surrogate.intercept_ + surrogate.coef_ @ mean),
+        )
+        explainer.surrogate_r2 = float(surrogate.score(X, log_odds))
+        return explainer
+
+    def _tree_explainer_or_build(self):
+        if self._tree_explainer is None:
+            import shap
+
+            self._tree_explainer = shap.TreeExplainer(self.model)
+            self.base_value = float(np.ravel(self._tree_explainer.expected_value)[-1])
+        return self._tree_explainer
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_tree_explainer"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Build the tree explainer when loading, not on the first request
+        if self.kind == "tree":
+            self._tree_explainer_or_build()
+
+    def contributions(self, X):
+        """
+        :param X: Feature matrix in the model's column order
+        :return: (n_rows, n_features) contributions to the positive class
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if self.kind != "tree":
+            return (X - self.mean) * self.coef
+        values = self._tree_explainer_or_build().shap_values(X)
+        # Some tree models return one set of values per class
+        if isinstance(values, list):
+            return np.asarray(values[-1])
+        values = np.asarray(values)
+        return values[..., -1] if values.ndim == 3 else values
+
+    def explain(self, X, top_k=5):
+        """
+        :return: One {"base_value", "top_features"} dict per row of X
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        contributions = self.contributions(X)
+        return [
+            {
+                "base_value": self.base_value,
+                "top_features": top_contributions(row, values, self.feature_names, top_k),
+            }
+            for row, values in zip(contributions, X)
+        ]
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
@@ -0,0 +1,138 @@
+"""
+Class-imbalance resampling of the training split.
+
+Every strategy works on NumPy arrays. Undersampling selects row indices and
+gathers only the kept rows, SMOTE appends synthetic minority rows, and
+"weights" leaves the rows alone and returns sample weights instead. Only
+the part of the training split that is fitted on is resampled; the
+validation split the threshold is selected on and the test split keep the
+real class balance, so thresholds and metrics stay comparable across
+strategies.
+"""
+
+import numpy as np
+
+RESAMPLING_STRATEGIES = ("none", "undersample", "cluster", "smote", "weights")
+
+
+def _scaled(X):
+    # Distances are taken on standardized float32 copies, so wide-range
+    # columns such as Amount do not dominate
+    X = np.asarray(X, dtype=np.float32)
+    std = X.std(axis=0)
+    return (X - X.mean(axis=0)) / np.where(std > 0, std, 1.0)
+
+
+def _n_negatives_kept(n_positive, n_negative, ratio):
+    return min(n_negative, int(np.ceil(n_positive * ratio)))
+
+
+def random_undersample(y, ratio, rng):
+    """
+    :param ratio: Negatives kept per positive
+    :return: Sorted indices of every positive and a random sample of negatives
+    """
+    positives = np.flatnonzero(y == 1)
+    negatives = np.flatnonzero(y != 1)
+    keep = _n_negatives_kept(len(positives), len(negatives), ratio)
+    kept = rng.choice(negatives, size=keep, replace=False)
+    return np.sort(np.concatenate([positives, kept]))
+
+
+def cluster_undersample(X, y, ratio, rng):
+    """
+    Clusters the negatives into (positives * ratio) groups with mini-batch
+    k-means and keeps the real negative closest to each centroid, so the kept
+    negatives cover the majority class instead of a random corner of it.
+    :return: Sorted indices of every positive and the kept negatives
+    """
+    from sklearn.cluster import MiniBatchKMeans
+
+    positives = np.flatnonzero(y == 1)
+    negatives = np.flatnonzero(y != 1)
+    keep = _n_negatives_kept(len(positives), len(negatives), ratio)
+    if keep == len(negatives):
+        return np.arange(len(y))
+    Z = _scaled(X[negatives])
+    kmeans = MiniBatchKMeans(
+        n_clusters=keep,
+        batch_size=max(1024, 3 * keep),
+        n_init=1,
+        random_state=int(rng.integers(2**31 - 1)),
+    ).fit(Z)
+    labels = kmeans.labels_
+    offsets = Z - kmeans.cluster_centers_[labels]
+    distances = np.einsum("ij,ij->i", offsets, offsets)
+    # First row of each cluster after sorting by (cluster, distance)
+    order = np.lexsort((distances, labels))
+    first = np.r_[True, labels[order][1:] != labels[order][:-1]]
+    return np.sort(np.concatenate([positives, negatives[order[first]]]))
+
+
+def smote(X, y, ratio, k_neighbors=5, rng=None):
+    """
+    SMOTE oversampling: each synthetic positive lies at a random point on the
+    segment between a positive and one of its k nearest positive neighbours.
+    :param ratio: Negatives per positive after oversampling
+    :return: Synthetic rows (float64), none if the ratio is already met
+    """
+    from sklearn.neighbors import NearestNeighbors
+
+    rng = rng or np.random.default_rng()
+    positives = np.asarray(X[y == 1], dtype=np.float64)
+    n_negative = int(np.sum(y != 1))
+    n_new = int(np.ceil(n_negative / ratio)) - len(positives)
+    if n_new <= 0 or len(positives) < 2:
+        return np.empty((0, X.shape[1]))
+    k = min(k_neighbors, len(positives) - 1)
+    # Queried without X, so each row is left out of its own neighbours
+    neighbours = (
+        NearestNeighbors(n_neighbors=k).fit(_scaled(positives)).kneighbors(return_distance=False)
+    )
+    base = rng.integers(len(positives), size=n_new)
+    partner = neighbours[base, rng.integers(k, size=n_new)]
+    gap = rng.random((n_new, 1))
+    return positives[base] + gap * (positives[partner] - positives[base])
+
+
+def class_weights(y, ratio):
+    """
+    :param ratio: Negatives per positive the weights emulate
+    :return: Per-row sample weights: 1 for negatives, and for positives the
+        factor that makes their total weight that of the emulated ratio
+    """
+    n_positive = int(np.sum(y == 1))
+    n_negative = len(y) - n_positive
+    positive_weight = max(1.0, n_negative / (ratio * n_positive)) if n_positive else 1.0
+    return np.where(y == 1, positive_weight, 1.0)
+
+
+def resample(X, y, strategy="undersample", ratio=5.0, k_neighbors=5, random_state=42):
+    """
+    :param X: Training features (2-D array)
+    :param y: 0/1 training labels
+    :param strategy: One of RESAMPLING_STRATEGIES
+    :param ratio: Negatives per positive to train on
+    :return: (X, y, sample_weight). X and y are the inputs themselves for "none"
+        and "weights"; sample_weight is None except for "weights"
+    """
+    if strategy not in RESAMPLING_STRATEGIES:
+        raise ValueError(f"Unknown resampling strategy: {strategy}")
+    y = np.asarray(y)
+    rng = np.random.default_rng(random_state)
+    if strategy == "none":
+        return X, y, None
+    if strategy == "weights":
+        return X, y, class_weights(y, ratio)
+    if strategy == "smote":
+        synthetic = smote(X, y, ratio, k_neighbors, rng)
+        return (
+            np.concatenate([X, synthetic]),
+            np.concatenate([y, np.ones(len(synthetic), dtype=y.dtype)]),
+            None,
+        )
+    if strategy == "cluster":
+        indices = cluster_undersample(X, y, ratio, rng)
+    else:
+        indices = random_undersample(y, ratio, rng)
+    return X[indices], y[indices], None
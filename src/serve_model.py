@@ -1,129 +1,675 @@
 import logging
 import os
-from flask import Flask, request, jsonify
-from flask_jwt_extended import JWTManager, jwt_required, create_access_token
+import threading
+import time
+from flask import Flask, current_app, g, request, jsonify
+from flask_jwt_extended import (
+    JWTManager,
+    jwt_required,
+    create_access_token,
+    get_jwt_identity,
+    verify_jwt_in_request,
+)
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from datetime import timedelta
-import joblib
-import pandas as pd
-import redis
+import numpy as np
 import json
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+try:
+    from src.audit_log import AuditLogger
+    from src.fraud_insights import FraudInsights
+    from src.inference_engine import MicroBatchEngine
+    from src.model_store import ModelStore
+    from src.prediction_cache import PredictionCache
+    from src.reason_codes import top_contributions
+    from src.velocity import (
+        MAX_KEYS,
+        RedisVelocityTracker,
+        VelocityTracker,
+        velocity_feature_names,
+    )
+except ImportError:
+    from audit_log import AuditLogger
+    from fraud_insights import FraudInsights
+    from inference_engine import MicroBatchEngine
+    from model_store import ModelStore
+    from prediction_cache import PredictionCache
+    from reason_codes import top_contributions
+    from velocity import (
+        MAX_KEYS,
+        RedisVelocityTracker,
+        VelocityTracker,
+        velocity_feature_names,
+    )
 
-# Configure logging
 logger = logging.getLogger(__name__)
-log_file = os.getenv("LOG_FILE", "audit.log")
-handler = logging.FileHandler(log_file)
-formatter = logging.Formatter("%(asctime)s - %(user)s - %(ip)s - %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
 
-# Initialize Flask app
-app = Flask(__name__)
+# Used when the model has no tuned threshold and none is configured
+DEFAULT_THRESHOLD = 0.5
+# Where /predict keeps its online velocity counts (VELOCITY_STORE)
+VELOCITY_STORES = ("redis", "local")
+
+# Setting name -> (type, default) for everything read from the environment;
+# the transformer, explainer and threshold paths default to files next to the
+# model. PREDICTION_THRESHOLD, when set, overrides the model's tuned threshold
+SETTINGS = {
+    "MODEL_PATH": (str, "models/fraud_detection_model.pkl"),
+    "TRANSFORMER_PATH": (str, None),
+    "EXPLAINER_PATH": (str, None),
+    "THRESHOLD_PATH": (str, None),
+    "MODEL_VERSION": (str, None),
+    "MODEL_RELOAD_INTERVAL_S": (float, 10),
+    "REDIS_HOST": (str, "localhost"),
+    "REDIS_PORT": (int, 6379),
+    "LOCAL_CACHE_SIZE": (int, 10000),
+    "LOCAL_CACHE_TTL": (float, 60),
+    "REDIS_CACHE_TTL": (int, 3600),
+    "PREDICTION_THRESHOLD": (float, None),
+    "MAX_BATCH_ROWS": (int, 10000),
+    "MAX_BATCH_SIZE": (int, 64),
+    "MAX_BATCH_WAIT_MS": (float, 2),
+    "PREDICTION_TIMEOUT_S": (float, 5),
+    "EXPLAIN_TOP_K": (int, 5),
+    "EXPLAIN_TIMEOUT_S": (float, 1),
+    "VELOCITY_MAX_KEYS": (int, MAX_KEYS),
+    # "redis" shares velocity counts between workers, "local" keeps them per process
+    "VELOCITY_STORE": (str, "redis"),
+    "INSIGHTS_PATH": (str, "data/fraud_insights.json"),
+    "INSIGHTS_FLUSH_INTERVAL_S": (float, 10),
+    "LOG_FILE": (str, "audit.log"),
+    "AUDIT_QUEUE_SIZE": (int, 10000),
+    "AUDIT_BATCH_SIZE": (int, 500),
+    "AUDIT_FLUSH_INTERVAL": (float, 0.5),
+    "AUDIT_BACKPRESSURE": (str, "block"),
+    "AUDIT_SAMPLE_RATE": (float, 0.1),
+    "AUDIT_BLOCK_TIMEOUT_S": (float, 1.0),
+    "AUDIT_MAX_BYTES": (int, 50 * 1024 * 1024),
+    "AUDIT_BACKUP_COUNT": (int, 5),
+    "JWT_SECRET_KEY": (str, "default-secret-key"),
+    "ADMIN_USER": (str, None),
+    "ADMIN_PASSWORD": (str, None),
+}
+
+
+def settings_from_env():
+    """
+    :return: SETTINGS read from the environment (and a .env file), typed
+    """
+    load_dotenv()
+    settings = {}
+    for name, (cast, default) in SETTINGS.items():
+        value = os.getenv(name)
+        settings[name] = default if value is None else cast(value)
+    return settings
+
+
+class ScoringService:
+    """
+    The serving resources of one app: the model store, the prediction cache,
+    the micro-batch engines, the audit log and the dashboard aggregates.
+
+    Built by create_app(), so importing this module loads no model, creates no
+    Redis client and opens no file.
+    """
+
+    def __init__(self, config):
+        import redis
+
+        self.config = config
+        # Errors go to the standard logger; audit records are queued and
+        # written in batches by a background thread
+        self.audit_log = AuditLogger(
+            config["LOG_FILE"],
+            max_queue=config["AUDIT_QUEUE_SIZE"],
+            batch_size=config["AUDIT_BATCH_SIZE"],
+            flush_interval=config["AUDIT_FLUSH_INTERVAL"],
+            policy=config["AUDIT_BACKPRESSURE"],
+            sample_rate=config["AUDIT_SAMPLE_RATE"],
+            block_timeout=config["AUDIT_BLOCK_TIMEOUT_S"],
+            max_bytes=config["AUDIT_MAX_BYTES"],
+            backup_count=config["AUDIT_BACKUP_COUNT"],
+        )
+
+        # The model with the transformer and explainer fitted alongside it; the
+        # store swaps in a new bundle when those files change
+        model_dir = os.path.dirname(config["MODEL_PATH"])
+        self.store = ModelStore(
+            config["MODEL_PATH"],
+            config["TRANSFORMER_PATH"] or os.path.join(model_dir, "feature_transformer.pkl"),
+            # Reason-code explainer built at training time; requests never build one
+            config["EXPLAINER_PATH"] or os.path.join(model_dir, "reason_explainer.pkl"),
+            version=config["MODEL_VERSION"],
+            # Operating threshold tuned at training time (evaluation.save_threshold)
+            threshold_path=config["THRESHOLD_PATH"] or os.path.join(model_dir, "threshold.json"),
+        )
+        self.reload_interval = config["MODEL_RELOAD_INTERVAL_S"]
+
+        self.threshold_override = config["PREDICTION_THRESHOLD"]
+        self.redis = redis.Redis(host=config["REDIS_HOST"], port=config["REDIS_PORT"])
+        # In-process LRU tier in front of Redis
+        self.cache = PredictionCache(
+            self.redis,
+            model_version=self.cache_version(self.store.bundle),
+            local_size=config["LOCAL_CACHE_SIZE"],
+            local_ttl=config["LOCAL_CACHE_TTL"],
+            redis_ttl=config["REDIS_CACHE_TTL"],
+        )
+
+        self.max_batch_rows = config["MAX_BATCH_ROWS"]
+        self.prediction_timeout = config["PREDICTION_TIMEOUT_S"]
+        self.explain_top_k = config["EXPLAIN_TOP_K"]
+        self.explain_timeout = config["EXPLAIN_TIMEOUT_S"]
+
+        # Online velocity counters, kept only while the model uses them
+        if config["VELOCITY_STORE"] not in VELOCITY_STORES:
+            raise ValueError(f"Unknown velocity store: {config['VELOCITY_STORE']}")
+        self.velocity = None
+        self.apply_bundle(self.store.bundle)
+        self.store.subscribe(self.apply_bundle)
+
+        # Dashboard aggregates: seeded from the training data, then updated per
+        # prediction. Every worker merges its new counts into INSIGHTS_PATH
+        self.insights_path = config["INSIGHTS_PATH"]
+        self.insights_flush_interval = config["INSIGHTS_FLUSH_INTERVAL_S"]
+        self.insights = (
+            FraudInsights.load(self.insights_path)
+            if os.path.exists(self.insights_path)
+            else FraudInsights()
+        )
+        # Counts recorded since the last flush
+        self._new_insights = FraudInsights()
+        self._insights_lock = threading.Lock()
+        self._insights_flusher = None
+        self._insights_pid = None
+
+        # Concurrent requests are scored in micro-batches with one predict_proba per batch
+        self.engine = MicroBatchEngine(
+            self.predict_batch,
+            max_batch_size=config["MAX_BATCH_SIZE"],
+            max_wait_ms=config["MAX_BATCH_WAIT_MS"],
+        )
+        self.explain_engine = MicroBatchEngine(
+            self.explain_batch,
+            max_batch_size=config["MAX_BATCH_SIZE"],
+            max_wait_ms=config["MAX_BATCH_WAIT_MS"],
+        )
+
+        # Process that completed a warm-up prediction through the serving path
+        self._ready_pid = None
+
+    def apply_bundle(self, bundle):
+        self.cache.set_model_version(self.cache_version(bundle))
+        if not set(velocity_feature_names()) & set(bundle.feature_names):
+            self.velocity = None
+        elif self.velocity is None:
+            max_keys = self.config["VELOCITY_MAX_KEYS"]
+            self.velocity = (
+                RedisVelocityTracker(self.redis, max_keys=max_keys)
+                if self.config["VELOCITY_STORE"] == "redis"
+                else VelocityTracker(max_keys=max_keys)
+            )
+
+    def threshold(self, bundle):
+        # Fraud probability at or above which a transaction is flagged
+        if self.threshold_override is not None:
+            return self.threshold_override
+        return DEFAULT_THRESHOLD if bundle.threshold is None else bundle.threshold
+
+    def cache_version(self, bundle):
+        # Cached labels depend on the threshold as well as on the model
+        return f"{bundle.version}@{self.threshold(bundle)}"
+
+    def record_insight(self, features, prediction, bundle):
+        keys = {}
+        if isinstance(features, dict):
+            country = features.get("country")
+            if country is None and bundle.transformer is not None and "ip_address" in features:
+                country = bundle.transformer.geo_index.lookup(features["ip_address"])
+            keys = {
+                "day": features.get("purchase_time"),
+                "device": features.get("device_id"),
+                "country": country,
+                "browser": features.get("browser"),
+            }
+        with self._insights_lock:
+            self.insights.update(prediction, **keys)
+            self._new_insights.update(prediction, **keys)
+
+    def flush_insights(self):
+        """
+        Merges the counts recorded since the last flush into INSIGHTS_PATH, then
+        serves the merged aggregates, which include every worker's flushed counts.
+        """
+        with self._insights_lock:
+            new, self._new_insights = self._new_insights, FraudInsights()
+        try:
+            merged = new.merge_into(self.insights_path)
+        except Exception:
+            # Kept for the next flush
+            with self._insights_lock:
+                self._new_insights.merge(new)
+            raise
+        with self._insights_lock:
+            # Counts recorded while the file was merged
+            merged.merge(self._new_insights)
+            self.insights = merged
+
+    def watch_insights(self):
+        """
+        Flushes the insights every INSIGHTS_FLUSH_INTERVAL_S in a daemon thread
+        of this process.
+        """
+        if self.insights_flush_interval <= 0:
+            return
+        if self._insights_pid == os.getpid() and self._insights_flusher.is_alive():
+            return
+
+        def run():
+            while True:
+                time.sleep(self.insights_flush_interval)
+                try:
+                    self.flush_insights()
+                except Exception as e:
+                    logger.error(f"Insights flush failed: {str(e)}", exc_info=True)
+
+        self._insights_flusher = threading.Thread(target=run, daemon=True)
+        self._insights_flusher.start()
+        self._insights_pid = os.getpid()
+
+    def predict_batch(self, items):
+        # One predict_proba call per bundle for all concurrent requests
+        results = [None] * len(items)
+        for bundle, positions in group_by_bundle(items):
+            X = np.vstack([items[i][1] for i in positions])
+            probabilities = bundle.model.predict_proba(X)[:, 1]
+            threshold = self.threshold(bundle)
+            for i, p in zip(positions, probabilities):
+                results[i] = (int(p >= threshold), float(p))
+        return results
+
+    def explain_batch(self, items):
+        # One predict_proba and one contribution pass for all concurrent requests
+        results = [None] * len(items)
+        for bundle, positions in group_by_bundle(items):
+            X = np.vstack([items[i][1] for i in positions])
+            probabilities = bundle.model.predict_proba(X)[:, 1]
+            contributions = bundle.explainer.contributions(X)
+            threshold = self.threshold(bundle)
+            for i, p, row_contributions in zip(positions, probabilities, contributions):
+                _, row, top_k = items[i]
+                results[i] = {
+                    "prediction": int(p >= threshold),
+                    "probability": float(p),
+                    "base_value": bundle.explainer.base_value,
+                    "top_features": top_contributions(
+                        row_contributions, row, bundle.explainer.feature_names, top_k
+                    ),
+                }
+        return results
+
+    def warm_up(self):
+        """
+        Scores one row through the micro-batch engines, starting their threads in
+        this process; /ready reports healthy only afterwards.
+        """
+        bundle = self.store.bundle
+        row = np.zeros(bundle.n_features)
+        self.engine((bundle, row), timeout=self.prediction_timeout)
+        if bundle.explainer is not None:
+            self.explain_engine((bundle, row, 1), timeout=self.explain_timeout)
+        self._ready_pid = os.getpid()
+
+    def is_ready(self):
+        return self._ready_pid == os.getpid()
+
+    def encode(self, records, bundle, add=True):
+        """
+        Validates raw transactions and joins their velocity counts to them.
+        Every record is checked before any is added to the velocity windows, so
+        a rejected request leaves no events behind.
+        :param records: Feature dicts or lists, one per transaction
+        :param add: If False, returns the counts without recording the transactions
+        :return: The records with their velocity counts
+        """
+        tracker = self.velocity
+        # The counts are not known yet; NaN stands in for them while checking
+        pending = dict.fromkeys(tracker.feature_names, np.nan) if tracker is not None else {}
+        for features in records:
+            to_feature_row(
+                {**features, **pending} if isinstance(features, dict) else features, bundle
+            )
+        if tracker is None:
+            return records
+        return [
+            {**features, **tracker.update(features, add=add)}
+            if isinstance(features, dict)
+            else features
+            for features in records
+        ]
+
+
+def group_by_bundle(items):
+    # Rows queued across a reload are scored by the bundle that encoded them
+    groups = {}
+    for position, item in enumerate(items):
+        groups.setdefault(id(item[0]), (item[0], []))[1].append(position)
+    return groups.values()
+
+
+class InvalidRequest(ValueError):
+    """A request payload that cannot be scored; answered with 400."""
+
+
+def to_feature_row(features, bundle):
+    # Raw transactions go through the training-time transformer
+    if bundle.transformer is not None:
+        if not isinstance(features, dict):
+            raise InvalidRequest("Features must be an object of transaction fields")
+        row = bundle.transformer.transform_record(features)
+    else:
+        if isinstance(features, dict):
+            missing = [name for name in bundle.model.feature_names_in_ if name not in features]
+            if missing:
+                raise InvalidRequest(f"Missing features: {', '.join(missing)}")
+            features = [features[name] for name in bundle.model.feature_names_in_]
+        try:
+            row = np.asarray(features, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise InvalidRequest("Features must be numbers")
+    # A malformed row would otherwise fail the whole micro-batch it joins
+    if row.shape != (bundle.n_features,):
+        raise InvalidRequest(f"Expected {bundle.n_features} features, got shape {row.shape}")
+    return row
+
+
+def to_feature_matrix(records, bundle):
+    if bundle.transformer is not None:
+        return bundle.transformer.transform_records(records)
+    return np.vstack([to_feature_row(features, bundle) for features in records])
 
-# Configure Redis
-redis_host = os.getenv("REDIS_HOST", "localhost")
-redis_port = int(os.getenv("REDIS_PORT", 6379))
-cache = redis.Redis(host=redis_host, port=redis_port)
 
-# Configure JWT
-app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "default-secret-key")
-app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
-jwt = JWTManager(app)
+def parse_batch_payload():
+    # NDJSON bodies carry one transaction per line, JSON bodies an array
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        lines = request.get_data(as_text=True).splitlines()
+        records = [json.loads(line) for line in lines if line.strip()]
+    else:
+        records = request.get_json()
+        if isinstance(records, dict):
+            records = records.get("transactions", [])
+    # Accept the same {"features": {...}} envelope as /predict
+    return [
+        record.get("features", record) if isinstance(record, dict) else record
+        for record in records
+    ]
 
-# Load model
-model_path = os.getenv("MODEL_PATH", "models/fraud_detection_model.pkl")
-model = joblib.load(model_path)
+
+def parse_payload():
+    # /predict and /explain take one JSON object with a "features" field
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise InvalidRequest("Expected a JSON object with a 'features' field")
+    return data
+
+
+def get_service():
+    return current_app.extensions["scoring"]
+
+
+def audit(message, **fields):
+    # Every audit record carries the user/ip/endpoint fields compliance relies on
+    get_service().audit_log.log(
+        message,
+        user=g.get("audit_user", "anonymous"),
+        ip=request.remote_addr,
+        endpoint=request.endpoint,
+        **fields,
+    )
 
 
-@app.before_request
 def log_request_info():
     try:
-        user = get_jwt().get("identity", "anonymous")
-    except:
+        verify_jwt_in_request(optional=True)
+        user = get_jwt_identity() or "anonymous"
+    except Exception:
         user = "anonymous"
+    g.audit_user = user
 
-    logger.info(
+    audit(
         "Request received",
-        extra={
-            "user": user,
-            "ip": request.remote_addr,
-            "endpoint": request.endpoint,
-            "method": request.method,
-            "content_length": request.content_length,
-        },
+        method=request.method,
+        content_length=request.content_length,
     )
 
 
-@app.route("/predict", methods=["POST"])
 @jwt_required()
 def predict():
+    service = get_service()
     try:
-        data = request.json
-        features = data.get("features")
-
-        # Enhanced logging
-        logger.info(f"Received prediction request with features: {features}")
-
-        df = pd.DataFrame([features])
-        data_str = json.dumps(df.to_dict(orient="records")[0])
+        data = parse_payload()
+        bundle = service.store.bundle
+        features = service.encode([data.get("features")], bundle)[0]
+        row = to_feature_row(features, bundle)
+        cache_key = service.cache.key(row)
 
         # Check cache
-        cached_result = cache.get(data_str)
+        cached_result = service.cache.get(cache_key)
         if cached_result:
-            logger.info("Cache hit")
-            return jsonify(
-                {"prediction": int(cached_result.decode()), "source": "cache"}
-            )
+            service.record_insight(features, cached_result["prediction"], bundle)
+            audit("Prediction", source="cache", prediction=cached_result["prediction"])
+            return jsonify({**cached_result, "source": "cache"})
 
         # Model prediction
-        prediction = model.predict(df)[0]
-        probability = model.predict_proba(df)[0][1]
+        prediction, probability = service.engine(
+            (bundle, row), timeout=service.prediction_timeout
+        )
+        service.record_insight(features, prediction, bundle)
 
         # Cache result
-        cache.setex(data_str, 3600, str(prediction))
+        service.cache.set(
+            cache_key,
+            {
+                "prediction": prediction,
+                "probability": probability,
+                "model_version": bundle.version,
+            },
+        )
 
-        logger.info(f"Prediction: {prediction}, Probability: {probability}")
+        audit("Prediction", source="model", prediction=prediction, probability=probability)
         return jsonify(
             {
                 "prediction": int(prediction),
                 "probability": float(probability),
+                "model_version": bundle.version,
                 "source": "model",
             }
         )
 
+    except InvalidRequest as e:
+        audit("Prediction rejected", error=str(e))
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}", exc_info=True)
+        audit("Prediction failed", error=type(e).__name__)
         return jsonify({"error": "Prediction failed"}), 500
 
 
-@app.route("/login", methods=["POST"])
+@jwt_required()
+def predict_batch():
+    service = get_service()
+    try:
+        records = parse_batch_payload()
+        if len(records) > service.max_batch_rows:
+            return (
+                jsonify({"error": f"Batch exceeds {service.max_batch_rows} transactions"}),
+                413,
+            )
+        if not records:
+            return jsonify({"predictions": []})
+        bundle = service.store.bundle
+        records = service.encode(records, bundle)
+
+        # One vectorized model call for the whole batch
+        probabilities = bundle.model.predict_proba(to_feature_matrix(records, bundle))[:, 1]
+        threshold = service.threshold(bundle)
+        predictions = [
+            {"prediction": int(p >= threshold), "probability": float(p)}
+            for p in probabilities
+        ]
+        for features, result in zip(records, predictions):
+            service.record_insight(features, result["prediction"], bundle)
+        audit("Batch prediction", transactions=len(records))
+        return jsonify({"predictions": predictions})
+
+    except InvalidRequest as e:
+        audit("Batch prediction rejected", error=str(e))
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}", exc_info=True)
+        audit("Batch prediction failed", error=type(e).__name__)
+        return jsonify({"error": "Batch prediction failed"}), 500
+
+
+@jwt_required()
+def explain():
+    service = get_service()
+    bundle = service.store.bundle
+    if bundle.explainer is None:
+        return jsonify({"error": "No explainer is deployed with this model"}), 503
+    try:
+        data = parse_payload()
+        # The configured default is capped at the model's width
+        top_k = data.get("top_k", min(service.explain_top_k, bundle.n_features))
+        if isinstance(top_k, bool) or not isinstance(top_k, int):
+            raise InvalidRequest("top_k must be an integer")
+        if not 1 <= top_k <= bundle.n_features:
+            raise InvalidRequest(f"top_k must be between 1 and {bundle.n_features}")
+        features = service.encode([data.get("features")], bundle, add=False)[0]
+        row = to_feature_row(features, bundle)
+        result = service.explain_engine((bundle, row, top_k), timeout=service.explain_timeout)
+        audit("Explanation", prediction=result["prediction"], probability=result["probability"])
+        return jsonify({**result, "model_version": bundle.version})
+
+    except InvalidRequest as e:
+        audit("Explanation rejected", error=str(e))
+        return jsonify({"error": str(e)}), 400
+    except FuturesTimeoutError:
+        audit("Explanation timed out")
+        return jsonify({"error": "Explanation timed out"}), 504
+    except Exception as e:
+        logger.error(f"Explanation error: {str(e)}", exc_info=True)
+        audit("Explanation failed", error=type(e).__name__)
+        return jsonify({"error": "Explanation failed"}), 500
+
+
+def inference_stats():
+    service = get_service()
+    stats = service.engine.stats()
+    if service.store.bundle.explainer is not None:
+        stats["explain"] = service.explain_engine.stats()
+    return jsonify(stats)
+
+
+def health():
+    # Liveness: the process is up and serving requests
+    return jsonify({"status": "ok"})
+
+
+def ready():
+    # Readiness: healthy only once this process has served a warm-up prediction
+    service = get_service()
+    if not service.is_ready():
+        try:
+            service.warm_up()
+        except Exception as e:
+            logger.error(f"Warm-up failed: {str(e)}", exc_info=True)
+            return jsonify({"status": "warming up", **service.store.stats()}), 503
+    return jsonify({"status": "ready", "pid": os.getpid(), **service.store.stats()})
+
+
+def fraud_insights():
+    # Precomputed aggregates: the cost does not grow with the transaction count
+    insights = get_service().insights
+    return jsonify(insights.snapshot(top_n=request.args.get("top_n", type=int)))
+
+
+def cache_stats():
+    return jsonify(get_service().cache.stats())
+
+
+def audit_stats():
+    return jsonify(get_service().audit_log.stats())
+
+
 def login():
     try:
         auth = request.authorization
         if not auth:
             return jsonify({"error": "Missing credentials"}), 401
 
-        if auth.username == os.getenv("ADMIN_USER") and auth.password == os.getenv(
-            "ADMIN_PASSWORD"
-        ):
+        config = get_service().config
+        if auth.username == config["ADMIN_USER"] and auth.password == config["ADMIN_PASSWORD"]:
             access_token = create_access_token(identity=auth.username)
-            logger.info(f"Successful login for user: {auth.username}")
+            audit("Successful login", login_user=auth.username)
             return jsonify(access_token=access_token)
 
-        logger.warning(f"Failed login attempt from IP: {request.remote_addr}")
+        audit("Failed login attempt", login_user=auth.username)
         return jsonify({"error": "Invalid credentials"}), 401
 
     except Exception as e:
         logger.error(f"Login error: {str(e)}", exc_info=True)
+        audit("Login error", error=type(e).__name__)
         return jsonify({"error": "Authentication failed"}), 500
 
 
+# (rule, view, methods); the view's name is the endpoint recorded in the audit log
+ROUTES = [
+    ("/predict", predict, ["POST"]),
+    ("/predict/batch", predict_batch, ["POST"]),
+    ("/explain", explain, ["POST"]),
+    ("/inference-stats", inference_stats, ["GET"]),
+    ("/health", health, ["GET"]),
+    ("/ready", ready, ["GET"]),
+    ("/fraud-insights", fraud_insights, ["GET"]),
+    ("/cache-stats", cache_stats, ["GET"]),
+    ("/audit-stats", audit_stats, ["GET"]),
+    ("/login", login, ["POST"]),
+]
+
+
+def create_app(config=None):
+    """
+    Builds the API with its own ScoringService (app.extensions["scoring"]).
+    :param config: Settings overriding the environment (keys as in SETTINGS)
+    :return: Flask app
+    """
+    app = Flask(__name__)
+    app.config.update(settings_from_env())
+    app.config.update(config or {})
+    app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
+    JWTManager(app)
+
+    app.extensions["scoring"] = ScoringService(app.config)
+    app.before_request(log_request_info)
+    for rule, view, methods in ROUTES:
+        app.add_url_rule(rule, view_func=view, methods=methods)
+    return app
+
+
 if __name__ == "__main__":
-    app.run(
-        host=os.getenv("APP_HOST", "0.0.0.0"),
-        port=int(os.getenv("APP_PORT", 5000)),
-        debug=os.getenv("DEBUG_MODE", "False").lower() == "true",
-    )
+    # Development server; production runs gunicorn with gunicorn.conf.py
+    app = create_app()
+    service = app.extensions["scoring"]
+    service.warm_up()
+    if service.reload_interval > 0:
+        service.store.watch(service.reload_interval)
+    service.watch_insights()
+    try:
+        app.run(
+            host=os.getenv("APP_HOST", "0.0.0.0"),
+            port=int(os.getenv("APP_PORT", 5000)),
+            debug=os.getenv("DEBUG_MODE", "False").lower() == "true",
+        )
+    finally:
+        service.flush_insights()
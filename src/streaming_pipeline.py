@@ -0,0 +1,206 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from src.data_cleaner import DataCleaner
+    from src.feature_engineer import FeatureEngineer
+    from src.geo_index import GeoIndex
+    from src.velocity import ChunkedVelocityCounts
+except ImportError:
+    from data_cleaner import DataCleaner
+    from feature_engineer import FeatureEngineer
+    from geo_index import GeoIndex
+    from velocity import ChunkedVelocityCounts
+
+# Rough ratio between a raw chunk's memory footprint and the peak while it is
+# cleaned, enriched and one-hot encoded (intermediate copies plus dummy columns)
+WORKING_SET_FACTOR = 6
+SAMPLE_ROWS = 1000
+
+
+class StreamingPipeline:
+    """
+    Runs the clean -> time features -> geolocation -> encode -> drop stages over
+    bounded-size chunks and appends each processed chunk to the output file.
+
+    Category vocabularies are collected in a first pass so every chunk is
+    encoded into the same columns. Duplicate rows are detected across chunks
+    from 64-bit row hashes (8 bytes per unique row).
+
+    Velocity counts depend on every row of a key, wherever it sits in the file,
+    so with velocity=True the first pass also keeps each row's timestamp and
+    hashed keys and computes the counts with the batch path's window_counts.
+    The output then matches the in-memory pipeline for files in any row order,
+    at 8 bytes per row per velocity feature.
+    """
+
+    def __init__(
+        self,
+        ip_country,
+        categorical_columns,
+        columns_to_drop,
+        chunk_size=None,
+        max_memory_mb=256,
+        dtype=None,
+        date_columns=None,
+        insights=None,
+        velocity=False,
+    ):
+        # Built once here rather than by merge_with_geolocation for every chunk
+        self.ip_country = (
+            ip_country if isinstance(ip_country, GeoIndex) else GeoIndex.from_frame(ip_country)
+        )
+        self.categorical_columns = categorical_columns
+        self.columns_to_drop = columns_to_drop
+        self.chunk_size = chunk_size
+        self.max_memory_mb = max_memory_mb
+        self.dtype = dtype
+        self.date_columns = date_columns
+        # Optional FraudInsights updated with each chunk before encoding
+        self.insights = insights
+        # Add the velocity features of FeatureEngineer.add_velocity_features
+        self.velocity = velocity
+        self.velocity_counts = None
+        self._velocity_offset = 0
+        self.vocabularies = None
+        self.columns = None
+        self._seen_hashes = np.empty(0, dtype=np.uint64)
+
+    def estimate_chunk_size(self, input_path):
+        """
+        Derives the number of rows per chunk from the memory budget.
+        :param input_path: CSV file to sample
+        :return: Rows per chunk
+        """
+        sample = self._read_csv(input_path, nrows=SAMPLE_ROWS)
+        if sample.empty:
+            return SAMPLE_ROWS
+        bytes_per_row = sample.memory_usage(deep=True).sum() / len(sample)
+        budget = self.max_memory_mb * 1024 * 1024
+        return max(1, int(budget / (bytes_per_row * WORKING_SET_FACTOR)))
+
+    def collect_vocabularies(self, input_path):
+        """
+        First pass: collects the sorted category vocabulary of every encoded
+        column and, if velocity is enabled, the velocity counts of every row.
+        :param input_path: CSV file to scan
+        :return: Mapping of column name to sorted list of categories
+        """
+        values = {column: set() for column in self.categorical_columns}
+        velocity = ChunkedVelocityCounts() if self.velocity else None
+        self._seen_hashes = np.empty(0, dtype=np.uint64)
+        for chunk in self._iter_chunks(input_path):
+            chunk = DataCleaner.handle_missing_values(chunk)
+            if self.velocity:
+                # The rows process_chunk keeps, in the same order
+                chunk = DataCleaner.correct_data_types(self.drop_seen_duplicates(chunk))
+                velocity.add(chunk)
+            if "country" in values:
+                chunk = FeatureEngineer.merge_with_geolocation(chunk, self.ip_country)
+            for column in self.categorical_columns:
+                values[column].update(chunk[column].astype(str).unique())
+        self.vocabularies = {column: sorted(vals) for column, vals in values.items()}
+        if velocity is not None:
+            self.velocity_counts = velocity.counts()
+        return self.vocabularies
+
+    def drop_seen_duplicates(self, chunk):
+        """
+        Removes rows that are duplicated within the chunk or were seen in earlier chunks.
+        """
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        first_in_chunk = ~pd.Series(hashes).duplicated().to_numpy()
+
+        seen = np.zeros(len(hashes), dtype=bool)
+        if len(self._seen_hashes):
+            pos = np.searchsorted(self._seen_hashes, hashes)
+            pos = np.minimum(pos, len(self._seen_hashes) - 1)
+            seen = self._seen_hashes[pos] == hashes
+        keep = first_in_chunk & ~seen
+
+        # Ordered insert: one linear merge instead of re-sorting every hash seen
+        new = np.sort(hashes[keep])
+        self._seen_hashes = np.insert(
+            self._seen_hashes, np.searchsorted(self._seen_hashes, new), new
+        )
+        return chunk[keep]
+
+    def process_chunk(self, chunk):
+        cleaner = DataCleaner()
+        chunk = cleaner.handle_missing_values(chunk)
+        chunk = self.drop_seen_duplicates(chunk)
+        chunk = cleaner.correct_data_types(chunk)
+
+        engineer = FeatureEngineer()
+        chunk = engineer.add_time_features(chunk)
+        chunk = engineer.add_signup_to_purchase(chunk)
+        if self.velocity_counts is not None:
+            end = self._velocity_offset + len(chunk)
+            for name, values in self.velocity_counts.items():
+                chunk[name] = values[self._velocity_offset:end]
+            self._velocity_offset = end
+        chunk = engineer.merge_with_geolocation(chunk, self.ip_country)
+        if self.insights is not None:
+            self.insights.update_frame(chunk)
+        chunk = engineer.drop_unnecessary_columns(chunk, self.columns_to_drop)
+        return engineer.encode_categorical_features(
+            chunk, self.categorical_columns, categories=self.vocabularies
+        )
+
+    def run(self, input_path, output_path):
+        """
+        Processes input_path chunk by chunk and writes the result to output_path.
+        :return: Number of rows written
+        """
+        if self.chunk_size is None:
+            self.chunk_size = self.estimate_chunk_size(input_path)
+        if self.vocabularies is None or (self.velocity and self.velocity_counts is None):
+            self.collect_vocabularies(input_path)
+        self._seen_hashes = np.empty(0, dtype=np.uint64)
+        self._velocity_offset = 0
+
+        # Write to a temporary file so readers never see a partial output
+        tmp_path = f"{output_path}.tmp{os.getpid()}"
+        columns = None
+        rows_written = 0
+        for chunk in self._iter_chunks(input_path):
+            processed = self.process_chunk(chunk)
+            if columns is None:
+                columns = list(processed.columns)
+                processed.to_csv(tmp_path, index=False)
+            else:
+                processed.reindex(columns=columns).to_csv(
+                    tmp_path, mode="a", header=False, index=False
+                )
+            rows_written += len(processed)
+        if columns is None:
+            open(tmp_path, "w").close()
+        os.replace(tmp_path, output_path)
+        self.columns = columns
+        # The counts belong to this input file
+        self.velocity_counts = None
+        return rows_written
+
+    def _iter_chunks(self, input_path):
+        return self._read_csv(input_path, chunksize=self.chunk_size or SAMPLE_ROWS)
+
+    def _read_csv(self, input_path, **kwargs):
+        return pd.read_csv(
+            input_path,
+            dtype=self.dtype,
+            parse_dates=self.date_columns,
+            date_format="ISO8601" if self.date_columns else None,
+            **kwargs,
+        )
+
+
+def copy_in_chunks(input_path, output_path, chunk_size):
+    """
+    Copies a CSV file through pandas without holding more than one chunk in memory.
+    """
+    tmp_path = f"{output_path}.tmp{os.getpid()}"
+    for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunk_size)):
+        chunk.to_csv(tmp_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    os.replace(tmp_path, output_path)
@@ -0,0 +1,388 @@
+import bisect
+import collections
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+# Entities whose recent transaction counts are tracked
+VELOCITY_KEYS = ["device_id", "ip_address", "user_id"]
+# Window label -> length in seconds
+VELOCITY_WINDOWS = {"1h": 3600, "24h": 24 * 3600}
+# Keys held by the online tracker before the least recently seen is evicted
+MAX_KEYS = 1_000_000
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def velocity_feature_names(keys=VELOCITY_KEYS, windows=VELOCITY_WINDOWS):
+    return [f"{key}_txn_{label}" for key in keys for label in windows]
+
+
+def _epoch_seconds(value):
+    # Whole seconds since the epoch, matching datetime64[s] truncation in the batch path
+    if value is None or pd.isna(value):
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // timedelta(seconds=1)
+
+
+def epoch_seconds_array(times):
+    """
+    :param times: Series of timestamps (or strings)
+    :return: (valid mask, int64 whole seconds since the epoch, 0 where invalid)
+    """
+    times = pd.to_datetime(times, errors="coerce")
+    if getattr(times.dt, "tz", None) is not None:
+        times = times.dt.tz_convert(None)
+    valid = times.notna().to_numpy()
+    seconds = np.zeros(len(times), dtype=np.int64)
+    seconds[valid] = times[valid].to_numpy().astype("datetime64[s]").astype(np.int64)
+    return valid, seconds
+
+
+def window_counts(values, valid, seconds, windows=VELOCITY_WINDOWS):
+    """
+    Counts for one key column. Rows are sorted once by (key, time); a single
+    searchsorted per window then finds where each row's window starts. Rows with
+    equal timestamps count in their original order, as an online stream in that
+    order would.
+    :param values: Key values of the valid rows, anything pd.factorize groups
+    :param valid: Mask of the rows with both a key and a timestamp
+    :param seconds: int64 timestamps of every row
+    :return: Dict of window label -> float64 counts for every row (NaN where invalid)
+    """
+    codes, _ = pd.factorize(values)
+    ts = seconds[valid]
+    order = np.lexsort((ts, codes))
+    sorted_codes = codes[order].astype(np.int64)
+    sorted_ts = ts[order]
+    if len(sorted_ts):
+        sorted_ts = sorted_ts - sorted_ts.min()
+    positions = np.arange(len(order))
+    counts = {}
+    for label, window in windows.items():
+        values = np.full(len(valid), np.nan)
+        if len(order):
+            # One sorted key: code * span + t keeps each key's times in its own range
+            span = int(sorted_ts.max()) + window + 1
+            if (int(sorted_codes[-1]) + 1) * span >= 2**63:
+                raise OverflowError("Time span too large for the velocity window index")
+            composite = sorted_codes * span + sorted_ts
+            start = np.searchsorted(composite, composite - window, side="right")
+            row_counts = np.empty(len(order), dtype=np.float64)
+            row_counts[order] = positions - start + 1
+            values[valid] = row_counts
+        counts[label] = values
+    return counts
+
+
+def velocity_counts(df, keys=VELOCITY_KEYS, windows=VELOCITY_WINDOWS, time_column="purchase_time"):
+    """
+    Batch path: for every row, the number of transactions with the same key in
+    the window ending at (and including) that row, i.e. timestamps in (t - w, t].
+    The result does not depend on the row order of df.
+    :param df: DataFrame with time_column and any of the key columns
+    :return: Dict of feature name -> float64 array aligned with df (NaN where
+        the key or timestamp is missing)
+    """
+    valid_time, seconds = epoch_seconds_array(df[time_column])
+    counts = {}
+    for key in keys:
+        if key not in df.columns:
+            continue
+        valid = valid_time & df[key].notna().to_numpy()
+        for label, values in window_counts(
+            df[key][valid].astype(str), valid, seconds, windows
+        ).items():
+            counts[f"{key}_txn_{label}"] = values
+    return counts
+
+
+class ChunkedVelocityCounts:
+    """
+    velocity_counts over a file read in chunks: add() keeps each row's
+    timestamp and 64-bit key hashes, counts() then computes every row's counts
+    at once, so rows count the rows of other chunks too.
+    """
+
+    def __init__(self, keys=VELOCITY_KEYS, windows=VELOCITY_WINDOWS, time_column="purchase_time"):
+        self.keys = list(keys)
+        self.windows = dict(windows)
+        self.time_column = time_column
+        self._seconds = []
+        self._valid_time = []
+        self._hashes = {key: [] for key in self.keys}
+        self._present = {key: [] for key in self.keys}
+
+    def add(self, df):
+        valid_time, seconds = epoch_seconds_array(df[self.time_column])
+        self._seconds.append(seconds)
+        self._valid_time.append(valid_time)
+        for key in self.keys:
+            if key in df.columns:
+                present = df[key].notna().to_numpy()
+                values = df[key][present].astype(str).to_numpy(dtype=object)
+                self._hashes[key].append(pd.util.hash_array(values))
+                self._present[key].append(present)
+
+    def counts(self):
+        """
+        :return: Dict of feature name -> float64 array over every added row
+        """
+        seconds = np.concatenate(self._seconds) if self._seconds else np.empty(0, np.int64)
+        valid_time = np.concatenate(self._valid_time) if self._valid_time else np.empty(0, bool)
+        counts = {}
+        for key in self.keys:
+            if not self._present[key]:
+                continue
+            present = np.concatenate(self._present[key])
+            if len(present) != len(seconds):
+                raise ValueError(f"Column {key} is missing from some chunks")
+            # Hashes of the rows with a key, narrowed to those with a timestamp too
+            hashes = np.concatenate(self._hashes[key])[valid_time[present]]
+            for label, values in window_counts(
+                hashes, present & valid_time, seconds, self.windows
+            ).items():
+                counts[f"{key}_txn_{label}"] = values
+        return counts
+
+
+class VelocityTracker:
+    """
+    Online path: sliding-window transaction counts per key for streaming scoring
+    (the Kafka consumer and /predict), in bounded memory.
+
+    Each (key column, key value) holds one sorted deque of timestamps per
+    window; an event appends its own timestamp and pops those that left the
+    window, so the amortized cost per in-order event is O(1). Keys idle for
+    longer than the largest window are dropped as they age out, and at most
+    max_keys keys are kept per column (least recently seen evicted first).
+    Trackers pickle without their lock, so they can be checkpointed.
+
+    An event counts the events seen so far in (t - w, t]. A late event is
+    inserted in time order, so it neither counts nor evicts events after it;
+    timestamps are only dropped once they have left the window of the newest
+    event. For events arriving in timestamp order the counts equal
+    velocity_counts on the same events. A late event cannot count events that
+    arrive after it, which velocity_counts does, so training data is built with
+    velocity_counts (StreamingPipeline included) rather than with a tracker.
+    Evicting a key that is still inside its window resets its counts, so
+    max_keys should exceed the number of keys active per window.
+    """
+
+    def __init__(self, keys=VELOCITY_KEYS, windows=VELOCITY_WINDOWS, max_keys=MAX_KEYS):
+        self.keys = list(keys)
+        self.windows = dict(windows)
+        self.max_keys = max_keys
+        self.feature_names = velocity_feature_names(self.keys, self.windows)
+        self._max_window = max(self.windows.values())
+        self._state = {key: collections.OrderedDict() for key in self.keys}
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def update(self, record, time_column="purchase_time", add=True):
+        """
+        Adds one transaction and returns its velocity features.
+        :param record: Dict of raw transaction fields
+        :param add: If False, returns the counts the transaction would get without
+            recording it (e.g. to explain a transaction that was already scored)
+        :return: Dict of feature name -> count (NaN where the key or time is missing)
+        """
+        now = _epoch_seconds(record.get(time_column))
+        features = {}
+        with self._lock:
+            for key in self.keys:
+                value = record.get(key)
+                if now is None or value is None or pd.isna(value):
+                    for label in self.windows:
+                        features[f"{key}_txn_{label}"] = np.nan
+                    continue
+                if add:
+                    deques = self._touch(key, str(value), now)
+                else:
+                    deques = self._state[key].get(str(value)) or [
+                        collections.deque() for _ in self.windows
+                    ]
+                for (label, window), events in zip(self.windows.items(), deques):
+                    # Position of the event after its ties: events up to and at now
+                    position = (
+                        bisect.bisect_right(events, now)
+                        if events and events[-1] > now
+                        else len(events)
+                    )
+                    count = position - bisect.bisect_right(events, now - window) + 1
+                    if add:
+                        events.insert(position, now)
+                        # Only what has left the newest event's window can go
+                        while events[0] <= events[-1] - window:
+                            events.popleft()
+                    features[f"{key}_txn_{label}"] = float(count)
+        return features
+
+    def _touch(self, key, value, now):
+        state = self._state[key]
+        deques = state.get(value)
+        if deques is None:
+            deques = state[value] = [collections.deque() for _ in self.windows]
+        else:
+            state.move_to_end(value)
+        # The least recently seen keys are at the front; drop those out of every window
+        while len(state) > 1 and next(iter(state.values()))[0][-1] <= now - self._max_window:
+            state.popitem(last=False)
+        while len(state) > self.max_keys:
+            state.popitem(last=False)
+            self.evicted += 1
+        return deques
+
+    def update_frame(self, df, time_column="purchase_time"):
+        """
+        Adds the rows of df in order.
+        :return: DataFrame of velocity features aligned with df
+        """
+        columns = [column for column in [time_column, *self.keys] if column in df.columns]
+        rows = [
+            self.update(dict(zip(columns, values)), time_column)
+            for values in df[columns].itertuples(index=False, name=None)
+        ]
+        return pd.DataFrame(rows, index=df.index, columns=self.feature_names, dtype=np.float64)
+
+    def __getstate__(self):
+        # Picklable for checkpoints; the lock is recreated on load
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(state) for state in self._state.values())
+
+
+class RedisVelocityTracker:
+    """
+    VelocityTracker whose timestamps live in Redis, so every worker process
+    (and host) scoring the same keys counts the same events.
+
+    Each (key column, key value) is one sorted set of event timestamps. An event
+    is added and counted in one MULTI/EXEC transaction, so concurrent workers
+    never count the same state twice. Timestamps that left the largest window
+    of the event are trimmed, and idle keys expire after the largest window.
+    When Redis fails, counts come from a local VelocityTracker for
+    retry_interval seconds instead of adding a connection timeout to every
+    request.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        keys=VELOCITY_KEYS,
+        windows=VELOCITY_WINDOWS,
+        max_keys=MAX_KEYS,
+        prefix="velocity",
+        retry_interval=5.0,
+    ):
+        self.redis = redis_client
+        self.keys = list(keys)
+        self.windows = dict(windows)
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self.feature_names = velocity_feature_names(self.keys, self.windows)
+        self._max_window = max(self.windows.values())
+        self.fallback = VelocityTracker(self.keys, self.windows, max_keys)
+        self.errors = 0
+        self._redis_down_until = 0.0
+
+    def update(self, record, time_column="purchase_time", add=True):
+        """
+        Same contract as VelocityTracker.update.
+        """
+        if time.monotonic() < self._redis_down_until:
+            return self.fallback.update(record, time_column, add)
+        now = _epoch_seconds(record.get(time_column))
+        features = {name: np.nan for name in self.feature_names}
+        present = [
+            (key, str(record[key]))
+            for key in self.keys
+            if now is not None and record.get(key) is not None and not pd.isna(record[key])
+        ]
+        if not present:
+            return features
+
+        try:
+            pipe = self.redis.pipeline()
+            for key, value in present:
+                name = f"{self.prefix}:{key}:{value}"
+                if add:
+                    pipe.zadd(name, {f"{now}:{uuid.uuid4().hex}": now})
+                    pipe.zremrangebyscore(name, "-inf", now - self._max_window)
+                    pipe.expire(name, self._max_window)
+                for window in self.windows.values():
+                    # (t - w, t]; without add the event itself is not in the set yet
+                    pipe.zcount(name, f"({now - window}", now)
+            results = pipe.execute()
+        except Exception:
+            self.errors += 1
+            self._redis_down_until = time.monotonic() + self.retry_interval
+            return self.fallback.update(record, time_column, add)
+
+        results = iter(results)
+        for key, _ in present:
+            if add:
+                for _ in range(3):
+                    next(results)
+            for label in self.windows:
+                features[f"{key}_txn_{label}"] = float(next(results) + (0 if add else 1))
+        return features
+
+
+def create_tracker(
+    feature_names, store="redis", redis_host="localhost", redis_port=6379, prefix="velocity"
+):
+    """
+    Tracker for a streaming scorer or updater. Several processes each see only
+    part of a key's events (one topic partitioning cannot keep a user's,
+    device's and IP's events together), so only "redis" gives them the same
+    counts; "local" is for a single process.
+    :param feature_names: The model's features
+    :param store: "redis" or "local"
+    :return: RedisVelocityTracker or VelocityTracker, None if the model uses no
+        velocity features
+    """
+    if not set(velocity_feature_names()) & set(feature_names):
+        return None
+    if store == "local":
+        return VelocityTracker()
+    import redis
+
+    return RedisVelocityTracker(redis.Redis(host=redis_host, port=redis_port), prefix=prefix)
+
+
+def update_once(tracker, record, key, applied):
+    """
+    tracker.update for a message that may be consumed again, e.g. when its
+    batch is rewound after a failure. The first call with a key counts the
+    event and keeps its features in applied; later calls return those features
+    without counting the event again, so a retried message gets the same counts.
+    :param key: Identifies the message, e.g. (topic, partition, offset); None
+        always counts the event
+    :param applied: Dict of key -> features, cleared by the caller once the
+        messages are committed
+    """
+    if key is None:
+        return tracker.update(record)
+    features = applied.get(key)
+    if features is None:
+        features = applied[key] = tracker.update(record)
+    return features
@@ -0,0 +1,147 @@
+import glob
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from src.audit_log import AuditLogger
+
+
+def log_from_process(path, worker, n):
+    audit_log = AuditLogger(path, batch_size=5, flush_interval=0.01, max_bytes=2000,
+                            backup_count=1000)
+    for i in range(n):
+        audit_log.log("Request received", worker=worker, request_number=i)
+        if i % 5 == 0:
+            time.sleep(0.001)
+    audit_log.close()
+
+
+class TestAuditLogger(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "audit.log")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_records_are_flushed_on_close(self):
+        audit_log = AuditLogger(self.path, batch_size=10)
+        for i in range(25):
+            audit_log.log("Request received", user="alice", ip="10.0.0.1",
+                          endpoint="predict", request_number=i)
+        audit_log.close()
+
+        with open(self.path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 25)
+        self.assertEqual(records[0]['user'], "alice")
+        self.assertEqual(records[0]['ip'], "10.0.0.1")
+        self.assertEqual(records[0]['endpoint'], "predict")
+        self.assertEqual(records[-1]['request_number'], 24)
+
+    def test_drop_policy_bounds_the_queue(self):
+        audit_log = AuditLogger(self.path, max_queue=5, policy="drop")
+        # Hold the writer back so the queue fills up
+        audit_log._ensure_started()
+        blocker = threading.Event()
+        original_write = audit_log._write
+        audit_log._write = lambda stream, records: (blocker.wait(), original_write(stream, records))[1]
+
+        results = [audit_log.log("event") for _ in range(50)]
+        self.assertIn(False, results)
+        self.assertGreater(audit_log.stats()['dropped'], 0)
+        blocker.set()
+        audit_log.close()
+        self.assertEqual(audit_log.written, results.count(True))
+
+    def test_rotation(self):
+        audit_log = AuditLogger(self.path, batch_size=1, max_bytes=200, backup_count=2)
+        for i in range(30):
+            audit_log.log("Request received", user="bob", request_number=i)
+        audit_log.close()
+        self.assertTrue(os.path.exists(self.path + ".1"))
+        self.assertFalse(os.path.exists(self.path + ".3"))
+
+
+    def test_processes_share_one_rotating_file(self):
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=log_from_process, args=(self.path, worker, 300))
+                     for worker in range(2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=30)
+            self.assertEqual(process.exitcode, 0)
+
+        records = []
+        for path in glob.glob(self.path + "*"):
+            if not path.endswith(".lock"):
+                with open(path) as f:
+                    records.extend(json.loads(line) for line in f)
+        self.assertGreater(len(glob.glob(self.path + ".*")), 10)
+        # Every record of both processes survives the concurrent rotations
+        self.assertEqual(sorted((r['worker'], r['request_number']) for r in records),
+                         [(worker, i) for worker in range(2) for i in range(300)])
+
+    def test_write_errors_do_not_stop_the_writer(self):
+        audit_log = AuditLogger(self.path, batch_size=5, flush_interval=0.01)
+        original_write = audit_log._write
+        failures = [OSError("No space left on device")]
+
+        def write(stream, records):
+            if failures:
+                raise failures.pop()
+            return original_write(stream, records)
+
+        audit_log._write = write
+        audit_log.log("lost")
+        while audit_log.stats()['failed'] == 0:
+            time.sleep(0.01)
+        audit_log.log("kept")
+        audit_log.close()
+        self.assertEqual(audit_log.stats()['failed'], 1)
+        with open(self.path) as f:
+            self.assertEqual([json.loads(line)['message'] for line in f], ["kept"])
+
+    def test_dead_writer_is_restarted(self):
+        audit_log = AuditLogger(self.path, max_queue=2, flush_interval=0.01, block_timeout=0.05)
+        audit_log._ensure_started()
+        crashed = threading.Event()
+        original_next_batch = audit_log._next_batch
+
+        def next_batch():
+            if not crashed.is_set():
+                crashed.set()
+                raise RuntimeError("writer bug")
+            return original_next_batch()
+
+        # The crash is expected; keep it out of the test output
+        with mock.patch.object(threading, "excepthook"):
+            audit_log._next_batch = next_batch
+            audit_log._worker.join(timeout=5)
+        self.assertFalse(audit_log._worker.is_alive())
+        with self.assertLogs("src.audit_log", level="ERROR"):
+            results = [audit_log.log("event", request_number=i) for i in range(10)]
+        audit_log.close()
+        self.assertEqual(results, [True] * 10)
+        self.assertEqual(audit_log.written, 10)
+
+    def test_block_policy_waits_a_bounded_time(self):
+        audit_log = AuditLogger(self.path, max_queue=1, block_timeout=0.05)
+        audit_log._ensure_started()
+        blocker = threading.Event()
+        original_write = audit_log._write
+        audit_log._write = lambda stream, records: (blocker.wait(), original_write(stream, records))[1]
+        results = [audit_log.log("event") for _ in range(5)]
+        blocker.set()
+        audit_log.close()
+        self.assertIn(False, results)
+        self.assertEqual(audit_log.written, results.count(True))
+
+
+if __name__ == "__main__":
+    unittest.main()
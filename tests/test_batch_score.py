@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+import unittest
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from src.batch_score import score_file, score_frame
+from src.compiled_model import compile_model
+from src.evaluation import save_threshold
+from src.fraud_insights import FraudInsights
+from src.velocity import velocity_counts
+
+
+class TestBatchScore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        X = pd.DataFrame({
+            'purchase_value': [10.0, 200.0, 15.0, 180.0, 12.0, 220.0],
+            'age': [30.0, 55.0, 25.0, 60.0, 33.0, 48.0]
+        })
+        self.model = LogisticRegression().fit(X, [0, 1, 0, 1, 0, 1])
+        self.model_path = os.path.join(self.tmp_dir.name, "model.pkl")
+        joblib.dump(self.model, self.model_path)
+
+        self.transactions = pd.DataFrame({
+            'transaction_id': range(25),
+            'purchase_value': np.linspace(5, 250, 25),
+            'age': np.linspace(20, 70, 25)
+        })
+        self.input_path = os.path.join(self.tmp_dir.name, "transactions.jsonl")
+        with open(self.input_path, "w") as f:
+            for record in self.transactions.to_dict(orient='records'):
+                f.write(json.dumps({'features': record}) + "\n")
+        self.expected = self.model.predict_proba(
+            self.transactions[['purchase_value', 'age']]
+        )[:, 1]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _score(self, output_name, workers):
+        output_path = os.path.join(self.tmp_dir.name, output_name)
+        rows = score_file(self.input_path, output_path, self.model_path,
+                          chunk_size=4, workers=workers, id_column='transaction_id')
+        self.assertEqual(rows, 25)
+        return output_path
+
+    def test_score_file_single_process(self):
+        predictions = pd.read_csv(self._score("predictions.csv", workers=1))
+        np.testing.assert_allclose(predictions['probability'], self.expected)
+        self.assertEqual(list(predictions['transaction_id']), list(range(25)))
+        np.testing.assert_array_equal(predictions['prediction'], self.expected >= 0.5)
+
+    def test_score_file_process_pool(self):
+        predictions = pd.read_json(self._score("predictions.jsonl", workers=2), lines=True)
+        np.testing.assert_allclose(predictions['probability'], self.expected)
+
+    def test_score_file_compiled_model(self):
+        self.model_path = os.path.join(self.tmp_dir.name, "model.npz")
+        compile_model(self.model).save(self.model_path)
+        for workers in (1, 2):
+            predictions = pd.read_csv(self._score(f"predictions_{workers}.csv", workers=workers))
+            np.testing.assert_allclose(predictions['probability'], self.expected)
+
+    def test_score_file_applies_the_saved_threshold(self):
+        save_threshold(os.path.join(self.tmp_dir.name, "threshold.json"),
+                       {"threshold": 0.9, "alert_rate": 0.1, "precision": 1.0,
+                        "recall": 0.5, "f1_score": 0.6})
+        for threshold, expected in ((None, 0.9), (0.2, 0.2)):
+            output_path = os.path.join(self.tmp_dir.name, "predictions.csv")
+            score_file(self.input_path, output_path, self.model_path, threshold=threshold)
+            predictions = pd.read_csv(output_path)
+            np.testing.assert_array_equal(predictions['prediction'], self.expected >= expected)
+
+    def test_score_file_updates_insights(self):
+        output_path = os.path.join(self.tmp_dir.name, "predictions.csv")
+        insights_path = os.path.join(self.tmp_dir.name, "insights.json")
+        score_file(self.input_path, output_path, self.model_path,
+                   chunk_size=4, workers=2, insights_path=insights_path)
+        snapshot = FraudInsights.load(insights_path).snapshot()
+        self.assertEqual(snapshot['total_transactions'], 25)
+        self.assertEqual(snapshot['fraud_cases'], int((self.expected >= 0.5).sum()))
+
+    def test_velocity_features_are_counted_over_the_whole_file(self):
+        rng = np.random.default_rng(0)
+        transactions = pd.DataFrame({
+            'purchase_time': (pd.Timestamp('2015-01-01')
+                              + pd.to_timedelta(rng.integers(0, 7200, 40), unit='s')).astype(str),
+            'device_id': rng.choice(['a', 'b', 'c'], 40),
+            'purchase_value': rng.uniform(5, 250, 40),
+        })
+        counts = velocity_counts(transactions)
+        X = pd.DataFrame({'purchase_value': transactions['purchase_value'],
+                          'device_id_txn_1h': counts['device_id_txn_1h']})
+        model = LogisticRegression().fit(X, (X['device_id_txn_1h'] > 5).astype(int))
+        model_path = os.path.join(self.tmp_dir.name, "velocity_model.pkl")
+        joblib.dump(model, model_path)
+        input_path = os.path.join(self.tmp_dir.name, "unsorted.csv")
+        transactions.to_csv(input_path, index=False)
+
+        for workers in (1, 2):
+            output_path = os.path.join(self.tmp_dir.name, f"velocity_{workers}.csv")
+            score_file(input_path, output_path, model_path, chunk_size=7, workers=workers)
+            np.testing.assert_allclose(pd.read_csv(output_path)['probability'],
+                                       model.predict_proba(X)[:, 1])
+        # A single frame counts over its own rows
+        _, probabilities = score_frame(transactions, model)
+        np.testing.assert_allclose(probabilities, model.predict_proba(X)[:, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
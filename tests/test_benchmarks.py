@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from benchmarks.import_time import measure_import
+from benchmarks.resampling import compare_strategies
+from benchmarks.run_benchmarks import compare, measure
+from benchmarks.synthetic import creditcard_data, fraud_data, generate_dataset, ip_country
+from src.data_loader import DataLoader
+
+
+class TestSyntheticData(unittest.TestCase):
+    def test_columns_match_the_real_files(self):
+        self.assertEqual(
+            list(fraud_data(10).columns),
+            ['user_id', 'signup_time', 'purchase_time', 'purchase_value', 'device_id',
+             'source', 'browser', 'sex', 'age', 'ip_address', 'class'],
+        )
+        self.assertEqual(
+            list(ip_country(10).columns),
+            ['lower_bound_ip_address', 'upper_bound_ip_address', 'country'],
+        )
+        columns = list(creditcard_data(10).columns)
+        self.assertEqual(columns[0], 'Time')
+        self.assertEqual(columns[-2:], ['Amount', 'Class'])
+
+    def test_ip_ranges_cover_ipv4_without_overlap(self):
+        table = ip_country(100)
+        self.assertEqual(table['lower_bound_ip_address'].iloc[0], 0)
+        self.assertEqual(table['upper_bound_ip_address'].iloc[-1], 2**32 - 1)
+        gaps = table['lower_bound_ip_address'].iloc[1:].to_numpy() \
+            - table['upper_bound_ip_address'].iloc[:-1].to_numpy()
+        self.assertTrue((gaps == 1).all())
+
+    def test_chunked_files_are_deterministic_and_typed_loadable(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = generate_dataset(tmp, fraud_rows=250, ip_ranges=50)
+            first = pd.read_csv(paths['fraud_data'])
+            paths = generate_dataset(os.path.join(tmp, 'again'), fraud_rows=250, ip_ranges=50)
+            pd.testing.assert_frame_equal(first, pd.read_csv(paths['fraud_data']))
+            self.assertEqual(first['user_id'].nunique(), 250)
+
+            loader = DataLoader(paths['fraud_data'], paths['ip_country'],
+                                paths['creditcard'], typed=True)
+            self.assertEqual(len(loader.load_fraud_data()), 250)
+            self.assertEqual(len(loader.load_creditcard_data()), 250)
+
+
+class TestBenchmarkComparison(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {'results': {
+            'load.fraud_csv': {'seconds': 1.0, 'peak_mb': 100.0, 'rows_per_s': 1000.0},
+            'serve.predict_sequential': {'p95_ms': 10.0, 'requests': 500},
+            'clean.tiny': {'seconds': 0.001},
+        }}
+
+    def test_within_tolerance(self):
+        current = {'results': {
+            'load.fraud_csv': {'seconds': 1.1, 'peak_mb': 90.0, 'rows_per_s': 950.0},
+            'serve.predict_sequential': {'p95_ms': 11.0, 'requests': 100},
+            'clean.tiny': {'seconds': 0.004},
+            'features.new_stage': {'seconds': 9.0},
+        }}
+        self.assertEqual(compare(current, self.baseline, tolerance=0.2), [])
+
+    def test_regressions_in_both_directions(self):
+        current = {'results': {
+            'load.fraud_csv': {'seconds': 1.5, 'peak_mb': 100.0, 'rows_per_s': 600.0},
+            'serve.predict_sequential': {'p95_ms': 20.0},
+        }}
+        regressions = compare(current, self.baseline, tolerance=0.2)
+        self.assertEqual(
+            {(r['benchmark'], r['metric']) for r in regressions},
+            {('load.fraud_csv', 'seconds'), ('load.fraud_csv', 'rows_per_s'),
+             ('serve.predict_sequential', 'p95_ms')},
+        )
+        self.assertAlmostEqual(regressions[0]['change'], 0.5)
+
+    def test_measure_copies_inputs_with_setup(self):
+        calls = []
+        result, metrics = measure(lambda items: calls.append(items) or len(items),
+                                  setup=lambda: ([1, 2, 3],), repeat=2)
+        self.assertEqual(result, 3)
+        self.assertEqual(len(calls), 3)
+        self.assertIsNot(calls[0], calls[1])
+        self.assertIn('peak_mb', metrics)
+
+
+class TestImportTime(unittest.TestCase):
+    def test_entry_points_defer_heavy_dependencies(self):
+        for module in ('main', 'kafka_consumer', 'serve_model'):
+            with self.subTest(module=module):
+                loaded = measure_import(module, repeat=1)['loaded']
+                for heavy in ('sklearn', 'mlflow', 'shap', 'lime', 'matplotlib', 'kafka'):
+                    self.assertNotIn(heavy, loaded)
+
+
+class TestResamplingBenchmark(unittest.TestCase):
+    def test_strategies_share_the_test_split(self):
+        data = creditcard_data(20000)
+        results = compare_strategies(
+            data.drop(columns=['Class']).to_numpy(), data['Class'].to_numpy(),
+            'Logistic Regression', strategies=('none', 'undersample'), ratio=2)
+        self.assertEqual(results['none']['train_rows'], 16000)
+        self.assertLess(results['undersample']['train_rows'], 16000)
+        for metrics in results.values():
+            # Well above the 0.2% fraud base rate
+            self.assertGreater(metrics['pr_auc'], 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
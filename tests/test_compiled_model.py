@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from sklearn.ensemble import (
+    GradientBoostingClassifier,
+    HistGradientBoostingClassifier,
+    RandomForestClassifier,
+)
+from sklearn.linear_model import LogisticRegression
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.neural_network import MLPClassifier
+from sklearn.tree import DecisionTreeClassifier
+from src.compiled_model import CompiledModel, compile_model
+from src.model_store import ModelStore
+
+
+class TestCompiledModel(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(300, 4))
+        self.y = (self.X[:, 0] + 0.5 * self.X[:, 1] ** 2 > 0.5).astype(int)
+        self.X_new = rng.normal(size=(50, 4))
+
+    def assert_same_proba(self, model, X):
+        compiled = compile_model(model)
+        np.testing.assert_allclose(
+            compiled.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-9
+        )
+        np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+
+    def test_matches_sklearn(self):
+        models = [
+            LogisticRegression(),
+            DecisionTreeClassifier(max_depth=5, random_state=0),
+            RandomForestClassifier(n_estimators=20, random_state=0),
+            GradientBoostingClassifier(n_estimators=20, random_state=0),
+            HistGradientBoostingClassifier(max_iter=20, random_state=0),
+            MLPClassifier(hidden_layer_sizes=(8, 4), max_iter=300, random_state=0),
+        ]
+        for model in models:
+            with self.subTest(model=type(model).__name__):
+                model.fit(self.X, self.y)
+                self.assert_same_proba(model, self.X_new)
+
+    def test_missing_values_follow_training(self):
+        X = self.X.copy()
+        X[::7, 1] = np.nan
+        model = HistGradientBoostingClassifier(max_iter=20, random_state=0).fit(X, self.y)
+        X_new = self.X_new.copy()
+        X_new[::3, 1] = np.nan
+        self.assert_same_proba(model, X_new)
+
+    def test_save_load_roundtrip(self):
+        model = RandomForestClassifier(n_estimators=5, random_state=0).fit(self.X, self.y)
+        compiled = compile_model(model)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "model.npz")
+            compiled.save(path)
+            self.assertEqual(os.listdir(tmp_dir), ["model.npz"])
+            loaded = CompiledModel.load(path)
+            np.testing.assert_array_equal(
+                loaded.predict_proba(self.X_new), compiled.predict_proba(self.X_new)
+            )
+            # The serving store picks the loader by extension
+            self.assertIsInstance(ModelStore(path).bundle.model, CompiledModel)
+
+    def test_rejects_wrong_width(self):
+        compiled = compile_model(LogisticRegression().fit(self.X, self.y))
+        with self.assertRaises(ValueError):
+            compiled.predict_proba(self.X_new[:, :3])
+
+    def test_unsupported_model(self):
+        with self.assertRaises(TypeError):
+            compile_model(KNeighborsClassifier().fit(self.X, self.y))
+
+
+if __name__ == "__main__":
+    unittest.main()
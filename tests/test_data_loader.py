@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 from src.data_loader import DataLoader
 import pandas as pd
@@ -25,5 +27,47 @@ class TestDataLoader(unittest.TestCase):
         self.assertIsInstance(df, pd.DataFrame)
         self.assertIn('Time', df.columns)
 
+class TestTypedDataLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fraud_path = os.path.join(self.tmp_dir.name, "Fraud_Data.csv")
+        pd.DataFrame({
+            'user_id': [22058, 333320],
+            'signup_time': ['2015-02-24 22:55:49', '2015-06-07 20:39:50'],
+            'purchase_time': ['2015-04-18 02:47:11', '2015-06-08 01:38:54'],
+            'purchase_value': [34, 16],
+            'device_id': ['QVPSPJUOCKZAR', 'EOGFQPIZPYXFZ'],
+            'source': ['SEO', 'Ads'],
+            'browser': ['Chrome', 'Chrome'],
+            'sex': ['M', 'F'],
+            'age': [39, 53],
+            'ip_address': [732758368.79972, 350311387.865908],
+            'class': [0, 0]
+        }).to_csv(self.fraud_path, index=False)
+        self.cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        self.loader = DataLoader(
+            fraud_data_path=self.fraud_path,
+            ip_country_path=os.path.join(self.tmp_dir.name, "IpAddress_to_Country.csv"),
+            creditcard_path=os.path.join(self.tmp_dir.name, "creditcard.csv"),
+            typed=True,
+            cache_dir=self.cache_dir
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_load_fraud_data_typed(self):
+        df = self.loader.load_fraud_data()
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df['purchase_time']))
+        self.assertEqual(df['age'].dtype, 'int8')
+        self.assertIsInstance(df['source'].dtype, pd.CategoricalDtype)
+        self.assertEqual(df['ip_address'].iloc[0], 732758368.79972)
+
+    def test_load_fraud_data_from_cache(self):
+        df = self.loader.load_fraud_data()
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        cached_df = self.loader.load_fraud_data()
+        pd.testing.assert_frame_equal(df, cached_df)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
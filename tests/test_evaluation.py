@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from sklearn.metrics import (
+    accuracy_score,
+    average_precision_score,
+    f1_score,
+    precision_recall_curve,
+    roc_auc_score,
+)
+from src.evaluation import evaluate, load_threshold, save_threshold, threshold_curve
+
+
+class TestEvaluation(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.y = (rng.random(2000) < 0.05).astype(int)
+        # Rounded so many scores are tied
+        self.scores = np.round(rng.random(2000) * 0.6 + self.y * 0.3, 2)
+
+    def test_matches_sklearn(self):
+        metrics, curve = evaluate(self.y, self.scores)
+        self.assertAlmostEqual(metrics["pr_auc"], average_precision_score(self.y, self.scores))
+        self.assertAlmostEqual(metrics["roc_auc"], roc_auc_score(self.y, self.scores))
+
+        precision, recall, thresholds = precision_recall_curve(self.y, self.scores)
+        # scikit-learn lists thresholds in increasing order
+        np.testing.assert_allclose(curve["threshold"][::-1], thresholds)
+        np.testing.assert_allclose(curve["precision"][::-1], precision[:-1])
+        np.testing.assert_allclose(curve["recall"][::-1], recall[:-1])
+
+        y_pred = (self.scores >= metrics["threshold"]).astype(int)
+        self.assertAlmostEqual(metrics["f1_score"], f1_score(self.y, y_pred))
+        self.assertAlmostEqual(metrics["f1_score"], curve["f1"].max())
+        self.assertAlmostEqual(metrics["accuracy"], accuracy_score(self.y, y_pred))
+
+    def test_target_alert_rate(self):
+        metrics, curve = evaluate(self.y, self.scores, target_alert_rate=0.02)
+        alerted = np.mean(self.scores >= metrics["threshold"])
+        self.assertLessEqual(alerted, 0.02)
+        self.assertEqual(alerted, metrics["alert_rate"])
+        # The next lower threshold would exceed the budget
+        i = int(np.flatnonzero(curve["threshold"] == metrics["threshold"])[0])
+        self.assertGreater(curve["alert_rate"][i + 1], 0.02)
+
+    def test_fixed_threshold(self):
+        selected, _ = evaluate(self.y[:1000], self.scores[:1000], target_alert_rate=0.05)
+        metrics, _ = evaluate(self.y[1000:], self.scores[1000:], fp_cost=1.0, fn_cost=10.0,
+                              threshold=selected["threshold"])
+        y, scores = self.y[1000:], self.scores[1000:]
+        y_pred = (scores >= selected["threshold"]).astype(int)
+        self.assertEqual(metrics["threshold"], selected["threshold"])
+        self.assertEqual(metrics["alert_rate"], y_pred.mean())
+        self.assertAlmostEqual(metrics["f1_score"], f1_score(y, y_pred))
+        self.assertAlmostEqual(metrics["accuracy"], accuracy_score(y, y_pred))
+        fp = np.sum(y_pred & (y == 0))
+        fn = np.sum((1 - y_pred) & y)
+        self.assertEqual(metrics["cost"], fp + 10.0 * fn)
+        # A threshold above every score alerts nothing
+        metrics, _ = evaluate(y, scores, threshold=2.0)
+        self.assertEqual((metrics["alert_rate"], metrics["recall"], metrics["precision"]),
+                         (0.0, 0.0, 0.0))
+
+    def test_cost_curve(self):
+        curve = threshold_curve(self.y, self.scores, fp_cost=1.0, fn_cost=10.0)
+        for i in (0, len(curve["threshold"]) // 2, -1):
+            y_pred = self.scores >= curve["threshold"][i]
+            fp = np.sum(y_pred & (self.y == 0))
+            fn = np.sum(~y_pred & (self.y == 1))
+            self.assertEqual(curve["cost"][i], fp + 10.0 * fn)
+
+    def test_single_class(self):
+        metrics, _ = evaluate(np.zeros(10), np.linspace(0, 1, 10))
+        self.assertTrue(np.isnan(metrics["roc_auc"]))
+        self.assertEqual(metrics["pr_auc"], 0.0)
+
+    def test_save_and_load_threshold(self):
+        metrics, _ = evaluate(self.y, self.scores, target_alert_rate=0.05)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "models", "threshold.json")
+            save_threshold(path, metrics, model_name="Random Forest")
+            self.assertEqual(load_threshold(path), metrics["threshold"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,17 @@
+import os
+import tempfile
 import unittest
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
-from src.explainability import Explainability
+from sklearn.linear_model import LogisticRegression
+from sklearn.neural_network import MLPClassifier
+from src.explainability import (
+    Explainability,
+    background_data,
+    explainer_kind,
+    stratified_sample,
+)
 
 
 class TestExplainability(unittest.TestCase):
@@ -40,5 +50,116 @@ class TestExplainability(unittest.TestCase):
             self.fail(f"explain_with_lime raised an exception: {e}")
 
 
+class TestFastShap(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(rng.normal(size=(600, 3)), columns=["a", "b", "c"])
+        y = (X["a"] + 0.5 * X["b"] > 1.2).astype(int)
+        self.X_train, self.X_test = X.iloc[:400], X.iloc[400:]
+        self.y_train, self.y_test = y.iloc[:400], y.iloc[400:]
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def explainability(self, model):
+        return Explainability(model, self.X_train, self.X_test,
+                              feature_names=self.X_train.columns, y_test=self.y_test)
+
+    def test_explainer_kind(self):
+        self.assertEqual(explainer_kind(RandomForestClassifier()), "tree")
+        self.assertEqual(explainer_kind(LogisticRegression().fit(self.X_train, self.y_train)),
+                         "linear")
+        self.assertEqual(explainer_kind(MLPClassifier()), "permutation")
+
+    def test_stratified_sample_keeps_rare_class(self):
+        labels = np.array([1] * 10 + [0] * 990)
+        positions = stratified_sample(labels, 100, min_per_class=5)
+        self.assertEqual(len(np.unique(positions)), len(positions))
+        self.assertGreaterEqual(labels[positions].sum(), 5)
+        self.assertLessEqual(len(positions), 105)
+
+    def test_tree_values_add_up_to_probabilities(self):
+        model = RandomForestClassifier(n_estimators=20, random_state=0)
+        model.fit(self.X_train, self.y_train)
+        values = self.explainability(model).compute_shap_values(
+            sample_size=50, n_jobs=1, cache_dir=None)
+        rows = pd.DataFrame(values.data, columns=self.X_train.columns)
+        np.testing.assert_allclose(values.values.sum(axis=1) + values.base_values,
+                                   model.predict_proba(rows)[:, 1], atol=1e-6)
+
+    def test_kmeans_background_keeps_cluster_weights(self):
+        # A small, distant cluster the unweighted centroids would over-represent
+        X = np.r_[self.X_train.to_numpy(), np.full((40, 3), 6.0)]
+        rows, weights = background_data(X, size=10)
+        self.assertEqual(len(rows), 10)
+        self.assertAlmostEqual(weights.sum(), 1.0)
+        # shap.kmeans snaps centroids to data values, so the means agree approximately
+        weighted_mean = np.average(rows, axis=0, weights=weights)
+        np.testing.assert_allclose(weighted_mean, X.mean(axis=0), atol=0.01)
+        self.assertGreater(np.abs(rows.mean(axis=0) - X.mean(axis=0)).max(), 0.05)
+
+        model = LogisticRegression().fit(self.X_train, self.y_train)
+        explainability = Explainability(model, pd.DataFrame(X, columns=self.X_train.columns),
+                                        self.X_test, feature_names=self.X_train.columns,
+                                        y_test=self.y_test)
+        values = explainability.compute_shap_values(
+            sample_size=50, background_size=10, n_jobs=1, cache_dir=None)
+        # Linear SHAP's base value is the margin at the weighted background mean
+        mean = pd.DataFrame([weighted_mean], columns=self.X_train.columns)
+        self.assertAlmostEqual(values.base_values[0], model.decision_function(mean)[0], places=6)
+
+    def test_parallel_chunks_and_cache(self):
+        model = LogisticRegression().fit(self.X_train, self.y_train)
+        explainability = self.explainability(model)
+        serial = explainability.compute_shap_values(
+            sample_size=120, background_size=20, n_jobs=1, cache_dir=None)
+        parallel = explainability.compute_shap_values(
+            sample_size=120, background_size=20, n_jobs=2, chunk_size=40,
+            cache_dir=self.tmp.name)
+        np.testing.assert_allclose(serial.values, parallel.values)
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+
+        cached = explainability.compute_shap_values(
+            sample_size=120, background_size=20, cache_dir=self.tmp.name)
+        np.testing.assert_allclose(cached.values, parallel.values)
+        np.testing.assert_allclose(cached.data, parallel.data)
+
+
+class TestBulkLime(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(rng.normal(size=(200, 3)), columns=["a", "b", "c"])
+        y = (X["a"] > 0.3).astype(int)
+        self.model = LogisticRegression().fit(X.iloc[:150], y.iloc[:150])
+        self.explainability = Explainability(
+            self.model, X.iloc[:150], X.iloc[150:], feature_names=X.columns
+        )
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_explains_selected_instances_in_parallel(self):
+        path = os.path.join(self.tmp.name, "lime.jsonl")
+        count = self.explainability.explain_many_with_lime(
+            path, indices=range(6), num_features=2, num_samples=200, workers=2, chunk_size=2
+        )
+        self.assertEqual(count, 6)
+        weights = pd.read_json(path, lines=True)
+        self.assertEqual(list(weights["instance"].unique()), list(range(150, 156)))
+        self.assertEqual(len(weights), 12)
+        # The label only depends on "a", so every explanation includes it
+        features = weights.groupby("instance")["feature"].apply(set)
+        self.assertTrue(all("a" in explained for explained in features))
+
+    def test_parquet_output(self):
+        path = os.path.join(self.tmp.name, "lime.parquet")
+        self.explainability.explain_many_with_lime(path, indices=[0, 1], num_samples=100)
+        weights = pd.read_parquet(path)
+        self.assertEqual(set(weights["instance"]), {150, 151})
+        self.assertIn("condition", weights.columns)
+
+
 if __name__ == "__main__":
     unittest.main()
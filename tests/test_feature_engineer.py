@@ -26,5 +26,26 @@ class TestFeatureEngineer(unittest.TestCase):
         self.assertIn('country', merged_df.columns)
         self.assertEqual(merged_df.iloc[0]['country'], 'US')
 
+    def test_merge_with_geolocation_matches_ranges(self):
+        df = pd.DataFrame({
+            'ip_address': ['10.0.0.5', 167772170.9, '167772160', 'not-an-ip', '10.0.300.1', None]
+        })
+        ip_country_df = pd.DataFrame({
+            'lower_bound_ip_address': [167772170, 167772160],
+            'upper_bound_ip_address': [167772200, 167772165],
+            'country': ['FR', 'DE']
+        })
+        merged_df = FeatureEngineer().merge_with_geolocation(df, ip_country_df)
+        self.assertEqual(
+            list(merged_df['country']),
+            ['DE', 'FR', 'DE', 'Unknown', 'Unknown', 'Unknown']
+        )
+
+    def test_ip_to_int(self):
+        ip_int = FeatureEngineer.ip_to_int(pd.Series(['192.168.1.1', '1.2.3', 3.5]))
+        self.assertEqual(ip_int[0], 3232235777)
+        self.assertTrue(pd.isna(ip_int[1]))
+        self.assertEqual(ip_int[2], 3)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
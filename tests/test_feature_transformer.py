@@ -0,0 +1,76 @@
+import pickle
+import unittest
+import numpy as np
+import pandas as pd
+from src.data_cleaner import DataCleaner
+from src.feature_engineer import FeatureEngineer
+from src.feature_transformer import FeatureTransformer
+from src.geo_index import GeoIndex
+
+
+class TestFeatureTransformer(unittest.TestCase):
+    def setUp(self):
+        self.raw_df = pd.DataFrame({
+            'user_id': [1, 2, 3],
+            'purchase_time': ['2015-04-18 02:47:11', '2015-06-08 13:38:54', '2015-01-01 23:00:00'],
+            'purchase_value': [34, 16, 20],
+            'source': ['SEO', 'Ads', 'Direct'],
+            'ip_address': ['10.0.0.5', 167772180.5, 'bad-ip'],
+            'class': [0, 1, 0]
+        })
+        self.geo_index = GeoIndex.from_frame(pd.DataFrame({
+            'lower_bound_ip_address': [167772160, 167772170],
+            'upper_bound_ip_address': [167772165, 167772200],
+            'country': ['DE', 'FR']
+        }))
+        df = DataCleaner.correct_data_types(self.raw_df.copy())
+        df = FeatureEngineer.add_time_features(df)
+        df = FeatureEngineer.merge_with_geolocation(df, self.geo_index)
+        df = FeatureEngineer.drop_unnecessary_columns(
+            df, ['purchase_time', 'ip_address', 'lower_bound_ip_address', 'upper_bound_ip_address']
+        )
+        self.processed_df = FeatureEngineer.encode_categorical_features(df, ['source', 'country'])
+        self.transformer = FeatureTransformer.fit(
+            self.processed_df, ['source', 'country'], self.geo_index
+        )
+
+    def test_matches_training_features(self):
+        matrix = self.transformer.transform_records(self.raw_df.to_dict(orient='records'))
+        expected = self.processed_df.drop(columns=['class']).astype('float64').to_numpy()
+        np.testing.assert_array_equal(matrix, expected)
+
+    def test_transform_frame_matches_records(self):
+        np.testing.assert_array_equal(
+            self.transformer.transform_frame(self.raw_df),
+            self.transformer.transform_records(self.raw_df.to_dict(orient='records'))
+        )
+
+    def test_signup_to_purchase_matches_training(self):
+        raw_df = self.raw_df.assign(signup_time=['2015-04-18 02:46:11', '2015-06-01 13:38:54',
+                                                 '2015-01-01 22:00:00'])
+        df = DataCleaner.correct_data_types(raw_df.copy())
+        df['signup_time'] = pd.to_datetime(df['signup_time'])
+        df = FeatureEngineer.add_signup_to_purchase(df)
+        transformer = FeatureTransformer(['signup_to_purchase_s'], [], self.geo_index)
+        expected = df[['signup_to_purchase_s']].to_numpy()
+        np.testing.assert_array_equal(
+            transformer.transform_records(raw_df.to_dict(orient='records')), expected
+        )
+        np.testing.assert_array_equal(transformer.transform_frame(raw_df), expected)
+
+    def test_unseen_category_encodes_as_zeros(self):
+        row = self.transformer.transform_record({'source': 'Email', 'ip_address': '1.1.1.1'})
+        dummy_columns = [i for i, name in enumerate(self.transformer.feature_names)
+                         if name.startswith('source_')]
+        self.assertFalse(row[dummy_columns].any())
+
+    def test_pickle_roundtrip(self):
+        restored = pickle.loads(pickle.dumps(self.transformer))
+        record = self.raw_df.to_dict(orient='records')[1]
+        np.testing.assert_array_equal(
+            restored.transform_record(record), self.transformer.transform_record(record)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from src.fraud_insights import FraudInsights
+
+
+class TestFraudInsights(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'purchase_time': pd.to_datetime(['2015-01-01 10:00:00', '2015-01-01 11:00:00',
+                                             '2015-01-02 12:00:00', '2015-01-02 13:00:00']),
+            'device_id': ['A', 'A', 'B', 'C'],
+            'country': ['US', 'US', 'FR', 'FR'],
+            'browser': ['Chrome', 'IE', 'Chrome', 'Chrome'],
+            'class': [1, 0, 1, 1]
+        })
+
+    def test_from_frame_matches_full_aggregation(self):
+        snapshot = FraudInsights.from_frame(self.df).snapshot()
+
+        self.assertEqual(snapshot['total_transactions'], 4)
+        self.assertEqual(snapshot['fraud_cases'], 3)
+        self.assertEqual(snapshot['fraud_percentage'], 75.0)
+        self.assertEqual(snapshot['fraud_trends'], {'2015-01-01': 1, '2015-01-02': 2})
+        self.assertEqual(snapshot['top_countries'][0],
+                         {'key': 'FR', 'transactions': 2, 'fraud_cases': 2})
+        self.assertEqual(snapshot['top_browsers'][0]['key'], 'Chrome')
+
+    def test_incremental_updates_equal_single_batch(self):
+        insights = FraudInsights.from_frame(self.df.iloc[:2])
+        insights.update_frame(self.df.iloc[2:3])
+        row = self.df.iloc[3]
+        insights.update(row['class'], day=row['purchase_time'], device=row['device_id'],
+                        country=row['country'], browser=row['browser'])
+
+        expected = FraudInsights.from_frame(self.df).snapshot()
+        snapshot = insights.snapshot()
+        for key in ['total_transactions', 'fraud_cases', 'fraud_trends',
+                    'top_devices', 'top_countries', 'top_browsers']:
+            self.assertEqual(snapshot[key], expected[key])
+
+    def test_snapshot_cached_until_update(self):
+        insights = FraudInsights.from_frame(self.df)
+        self.assertIs(insights.snapshot(), insights.snapshot())
+        insights.update(0, device='D')
+        self.assertEqual(insights.snapshot()['total_transactions'], 5)
+
+    def test_evicts_least_fraudulent_keys(self):
+        insights = FraudInsights(max_keys=2)
+        insights.update_frame(self.df)
+        insights.update_frame(self.df.assign(device_id=['D', 'E', 'F', 'G'], **{'class': 0}))
+        self.assertEqual(len(insights.dimensions['device']), 2)
+        self.assertEqual([row['key'] for row in insights.snapshot()['top_devices']], ['A', 'B'])
+
+    def test_update_evicts(self):
+        insights = FraudInsights(max_keys=10)
+        for i in range(1000):
+            insights.update(i % 2, device=f'device-{i}')
+        self.assertLessEqual(len(insights.dimensions['device']), 12)
+        self.assertEqual(insights.snapshot()['total_transactions'], 1000)
+
+    def test_load_applies_max_keys(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'insights.json')
+            FraudInsights.from_frame(self.df, top_n=1).save(path)
+            loaded = FraudInsights.load(path)
+            self.assertEqual(len(loaded.snapshot()['top_devices']), 1)
+            loaded = FraudInsights.load(path, top_n=5, max_keys=2)
+        self.assertEqual([row['key'] for row in loaded.snapshot()['top_devices']], ['A', 'B'])
+
+    def test_merge_into_adds_every_writer(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'insights.json')
+            FraudInsights.from_frame(self.df.iloc[:2]).merge_into(path)
+            FraudInsights.from_frame(self.df.iloc[2:3]).merge_into(path)
+            merged = FraudInsights.from_frame(self.df.iloc[3:]).merge_into(path)
+            self.assertEqual(FraudInsights.load(path).snapshot()['top_devices'],
+                             merged.snapshot()['top_devices'])
+        expected = FraudInsights.from_frame(self.df).snapshot()
+        for key in ['total_transactions', 'fraud_cases', 'fraud_trends', 'top_devices']:
+            self.assertEqual(merged.snapshot()[key], expected[key])
+
+    def test_seed_replaces_merged_counts(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'insights.json')
+            FraudInsights.from_frame(self.df).seed(path)
+            FraudInsights.from_frame(self.df.iloc[:2]).merge_into(path)
+            FraudInsights.from_frame(self.df).seed(path)
+            loaded = FraudInsights.load(path)
+        self.assertEqual(loaded.snapshot()['total_transactions'], len(self.df))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'insights.json')
+            insights = FraudInsights.from_frame(self.df)
+            insights.save(path)
+            loaded = FraudInsights.load(path)
+        self.assertEqual(loaded.snapshot()['top_devices'], insights.snapshot()['top_devices'])
+        self.assertEqual(loaded.snapshot()['fraud_trends'], insights.snapshot()['fraud_trends'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.geo_index import GeoIndex, parse_ip
+
+
+class TestGeoIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmp_dir.name, "ip_country.csv")
+        self.index_path = os.path.join(self.tmp_dir.name, "ip_country.idx")
+        pd.DataFrame({
+            'lower_bound_ip_address': [3232235776.0, 167772160.0, 167772170.0],
+            'upper_bound_ip_address': [3232236031.0, 167772165.0, 167772200.0],
+            'country': ['US', 'DE', 'FR']
+        }).to_csv(self.csv_path, index=False)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_build_and_lookup(self):
+        index = GeoIndex.build(self.csv_path, self.index_path)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.lookup('192.168.1.10'), 'US')
+        self.assertEqual(index.lookup(167772171.5), 'FR')
+        self.assertEqual(index.lookup('10.0.0.7'), 'Unknown')
+        self.assertEqual(index.lookup('garbage'), 'Unknown')
+        index.close()
+
+    def test_lookup_many(self):
+        index = GeoIndex.build(self.csv_path, self.index_path)
+        countries = index.lookup_many(np.array([167772160, np.nan, 3232235900, 5]))
+        self.assertEqual(list(countries), ['DE', 'Unknown', 'US', 'Unknown'])
+        index.close()
+
+    def test_parse_ip(self):
+        self.assertEqual(parse_ip('192.168.1.1'), 3232235777)
+        self.assertEqual(parse_ip('732758368.79972'), 732758368)
+        self.assertIsNone(parse_ip('1.2.3.256'))
+        self.assertIsNone(parse_ip(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from src.inference_engine import MicroBatchEngine
+
+
+class TestMicroBatchEngine(unittest.TestCase):
+    def test_batches_concurrent_requests(self):
+        batch_sizes = []
+
+        def batch_fn(items):
+            batch_sizes.append(len(items))
+            return [item * 2 for item in items]
+
+        engine = MicroBatchEngine(batch_fn, max_batch_size=8, max_wait_ms=50)
+        futures = [engine.submit(i) for i in range(20)]
+        self.assertEqual([f.result(timeout=5) for f in futures], [i * 2 for i in range(20)])
+        self.assertTrue(all(size <= 8 for size in batch_sizes))
+        self.assertLess(len(batch_sizes), 20)
+
+        stats = engine.stats()
+        self.assertEqual(stats['requests'], 20)
+        self.assertEqual(sum(stats['latency_histogram'].values()), 20)
+
+    def test_errors_propagate_to_every_request(self):
+        def batch_fn(items):
+            raise ValueError("bad batch")
+
+        engine = MicroBatchEngine(batch_fn, max_batch_size=4, max_wait_ms=1)
+        with self.assertRaises(ValueError):
+            engine(1, timeout=5)
+
+    def test_short_results_fail_every_request(self):
+        engine = MicroBatchEngine(lambda items: [0] * (len(items) - 1),
+                                  max_batch_size=4, max_wait_ms=50)
+        futures = [engine.submit(i) for i in range(4)]
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=5)
+        self.assertGreater(engine.stats()['errors'], 0)
+        # The worker thread keeps serving later batches
+        engine.batch_fn = lambda items: items
+        self.assertEqual(engine(7, timeout=5), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
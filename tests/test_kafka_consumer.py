@@ -0,0 +1,147 @@
+import unittest
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from src.kafka_consumer import ScoringWorker, process_transaction
+from src.velocity import VelocityTracker
+
+Message = namedtuple('Message', ['topic', 'partition', 'offset', 'key', 'value'])
+
+
+class FakeBroker:
+    """In-process stand-in for a Kafka topic with one consumer group."""
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.positions = {p: 0 for p in partitions}
+        self.committed = {p: 0 for p in partitions}
+        self.sent = []
+        self.fail_sends = False
+
+    # Consumer API
+    def poll(self, timeout_ms=0, max_records=500):
+        batches = {}
+        for partition, messages in self.partitions.items():
+            available = messages[self.positions[partition]:][:max_records]
+            if available:
+                batches[partition] = available
+                self.positions[partition] += len(available)
+        return batches
+
+    def commit(self):
+        self.committed = dict(self.positions)
+
+    def seek(self, partition, offset):
+        self.positions[partition] = offset
+
+    # Producer API
+    def send(self, topic, key=None, value=None):
+        if self.fail_sends:
+            raise RuntimeError("broker unavailable")
+        self.sent.append((topic, key, value))
+
+    def flush(self):
+        pass
+
+
+class TestScoringWorker(unittest.TestCase):
+    def setUp(self):
+        X = pd.DataFrame({'purchase_value': [10.0, 200.0, 15.0, 180.0],
+                          'age': [30.0, 55.0, 25.0, 60.0]})
+        self.model = LogisticRegression().fit(X, [0, 1, 0, 1])
+        self.partitions = {
+            p: [Message('fraud-transactions', p, offset, None,
+                        {'purchase_value': 10.0 + 40 * offset + p, 'age': 30.0})
+                for offset in range(5)]
+            for p in (0, 1)
+        }
+        self.broker = FakeBroker(self.partitions)
+        self.worker = ScoringWorker(self.broker, self.broker, self.model, max_records=10)
+
+    def test_scores_batch_and_commits(self):
+        self.assertEqual(self.worker.run_once(), 10)
+        self.assertEqual(len(self.broker.sent), 10)
+        self.assertEqual(self.broker.committed, {0: 5, 1: 5})
+
+        topic, _, value = self.broker.sent[0]
+        self.assertEqual(topic, 'fraud-scores')
+        expected = self.model.predict_proba(
+            pd.DataFrame([self.partitions[0][0].value]))[0, 1]
+        self.assertAlmostEqual(value['probability'], expected)
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_failed_batch_is_not_committed(self):
+        self.broker.fail_sends = True
+        with self.assertRaises(RuntimeError):
+            self.worker.run_once()
+        self.assertEqual(self.broker.committed, {0: 0, 1: 0})
+
+        self.broker.fail_sends = False
+        self.assertEqual(self.worker.run_once(), 10)
+        self.assertEqual(self.broker.committed, {0: 5, 1: 5})
+
+    def test_poison_message_is_dead_lettered_after_retries(self):
+        self.partitions[1][2] = self.partitions[1][2]._replace(value={'purchase_value': 'n/a'})
+        worker = ScoringWorker(self.broker, self.broker, self.model, max_records=10,
+                               max_retries=2, dead_letter_topic='fraud-dead-letters')
+        for _ in range(2):
+            with self.assertRaises(KeyError):
+                worker.run_once()
+            self.assertEqual(self.broker.committed, {0: 0, 1: 0})
+
+        self.assertEqual(worker.run_once(), 9)
+        self.assertEqual(self.broker.committed, {0: 5, 1: 5})
+        dead = [value for topic, _, value in self.broker.sent if topic == 'fraud-dead-letters']
+        self.assertEqual([(v['partition'], v['offset']) for v in dead], [(1, 2)])
+        self.assertIn('age', dead[0]['error'])
+        self.assertEqual(worker.dead_lettered, 1)
+        self.assertEqual(worker.run_once(), 0)
+
+    def test_delivery_failures_are_never_dead_lettered(self):
+        self.broker.fail_sends = True
+        for _ in range(self.worker.max_retries + 2):
+            with self.assertRaises(RuntimeError):
+                self.worker.run_once()
+        self.assertEqual(self.broker.committed, {0: 0, 1: 0})
+        self.assertEqual(self.worker.dead_lettered, 0)
+
+    def test_retried_batch_counts_velocity_once(self):
+        X = pd.DataFrame({'device_id_txn_1h': [1.0, 5.0, 1.0, 6.0],
+                          'age': [30.0, 55.0, 25.0, 60.0]})
+        model = LogisticRegression().fit(X, [0, 1, 0, 1])
+        broker = FakeBroker({0: [
+            Message('fraud-transactions', 0, offset, None,
+                    {'purchase_time': f'2015-01-01 10:0{offset}:00', 'device_id': 'A', 'age': 30.0})
+            for offset in range(3)
+        ]})
+        tracker = VelocityTracker(keys=['device_id'], windows={'1h': 3600})
+        worker = ScoringWorker(broker, broker, model, velocity=tracker, max_retries=2)
+        broker.fail_sends = True
+        # Two failed batches, then a failed pass scoring one message at a time
+        for _ in range(3):
+            with self.assertRaises(RuntimeError):
+                worker.run_once()
+        broker.fail_sends = False
+        self.assertEqual(worker.run_once(), 3)
+
+        peek = tracker.update({'purchase_time': '2015-01-01 10:05:00', 'device_id': 'A'},
+                              add=False)
+        self.assertEqual(peek['device_id_txn_1h'], 4)
+        expected = model.predict_proba(
+            pd.DataFrame({'device_id_txn_1h': [1.0, 2.0, 3.0], 'age': [30.0] * 3}))[:, 1]
+        np.testing.assert_allclose([value['probability'] for _, _, value in broker.sent], expected)
+
+    def test_local_velocity_needs_a_single_worker(self):
+        with self.assertRaises(SystemExit):
+            process_transaction(['--velocity-store', 'local', '--workers', '2'])
+
+    def test_scores_are_vectorized(self):
+        probabilities = self.worker.score([m.value for m in self.partitions[1]])
+        expected = self.model.predict_proba(
+            np.array([[m.value['purchase_value'], m.value['age']] for m in self.partitions[1]]))[:, 1]
+        np.testing.assert_allclose(probabilities, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+import unittest
+from src.kafka_producer import TransactionProducer, get_serializer
+
+
+class FakeFuture:
+    def __init__(self):
+        self.callbacks = []
+        self.errbacks = []
+
+    def add_callback(self, fn, *args, **kwargs):
+        self.callbacks.append((fn, args, kwargs))
+        return self
+
+    def add_errback(self, fn, *args, **kwargs):
+        self.errbacks.append((fn, args, kwargs))
+        return self
+
+    def succeed(self, metadata):
+        for fn, args, kwargs in self.callbacks:
+            fn(metadata, *args, **kwargs)
+
+    def fail(self, error):
+        for fn, args, kwargs in self.errbacks:
+            fn(error, *args, **kwargs)
+
+
+class FakeKafkaProducer:
+    """Records sends and resolves their futures on flush, like a lingering batch."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.pending = []
+        self.sent = []
+        self.flushes = 0
+        self.closed = False
+
+    def send(self, topic, key=None, value=None):
+        future = FakeFuture()
+        self.pending.append((future, (topic, key, value)))
+        return future
+
+    def flush(self, timeout=None):
+        self.flushes += 1
+        for future, message in self.pending:
+            if self.fail:
+                future.fail(RuntimeError("broker unavailable"))
+            else:
+                self.sent.append(message)
+                future.succeed({"topic": message[0], "offset": len(self.sent) - 1})
+        self.pending = []
+
+    def close(self, timeout=None):
+        self.closed = True
+
+
+class TestTransactionProducer(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeKafkaProducer()
+        self.producer = TransactionProducer(serializer="json", producer=self.fake)
+
+    def test_send_does_not_flush(self):
+        for i in range(10):
+            self.producer.send_transaction('fraud-transactions', {'amount': i})
+        self.assertEqual(self.fake.flushes, 0)
+        self.assertEqual(len(self.fake.pending), 10)
+
+        self.producer.flush()
+        self.assertEqual(self.fake.flushes, 1)
+        self.assertEqual([json.loads(v) for _, _, v in self.fake.sent],
+                         [{'amount': i} for i in range(10)])
+        self.assertEqual(self.producer.delivered, 10)
+
+    def test_delivery_callbacks(self):
+        results = []
+        self.producer.send_transaction('t', {'amount': 1},
+                                       on_delivery=lambda e, md: results.append((e, md)))
+        self.producer.flush()
+        self.assertIsNone(results[0][0])
+        self.assertEqual(results[0][1]['offset'], 0)
+
+        failing = TransactionProducer(serializer="json", producer=FakeKafkaProducer(fail=True))
+        errors = []
+        failing.send_transaction('t', {'amount': 1}, on_delivery=lambda e, md: errors.append(e))
+        failing.flush()
+        self.assertIsInstance(errors[0], RuntimeError)
+        self.assertEqual(failing.failed, 1)
+
+    def test_send_many_iterable_with_keys(self):
+        count = self.producer.send_many(
+            't', ({'user_id': i, 'amount': i} for i in range(5)), key_field='user_id'
+        )
+        self.producer.close()
+        self.assertEqual(count, 5)
+        self.assertEqual([k for _, k, _ in self.fake.sent], [str(i).encode() for i in range(5)])
+        self.assertTrue(self.fake.closed)
+
+    def test_send_many_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'replay.jsonl')
+            with open(path, 'w') as f:
+                f.write('{"amount": 1}\n\n{"amount": 2}\n')
+            count = self.producer.send_many('t', path)
+        self.producer.flush()
+        self.assertEqual(count, 2)
+        _, deserialize = get_serializer("json")
+        self.assertEqual([deserialize(v) for _, _, v in self.fake.sent],
+                         [{'amount': 1}, {'amount': 2}])
+
+    def test_unknown_serializer(self):
+        with self.assertRaises(ValueError):
+            TransactionProducer(serializer="xml", producer=self.fake)
+
+
+if __name__ == '__main__':
+    unittest.main()
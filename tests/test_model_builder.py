@@ -1,6 +1,20 @@
+import math
+import os
+import tempfile
+import time
 import unittest
+import mlflow
+import numpy as np
 import pandas as pd
-from src.model_builder import ModelBuilder
+from sklearn.neighbors import KNeighborsClassifier
+from src.model_builder import (
+    MODEL_REGISTRY,
+    VALIDATION_FRACTION,
+    ModelBuilder,
+    _FitMemory,
+    build_models,
+    register_model,
+)
 
 
 class TestModelBuilder(unittest.TestCase):
@@ -29,5 +43,160 @@ class TestModelBuilder(unittest.TestCase):
         self.assertGreater(results["Logistic Regression"]["accuracy"], 0.0)
 
 
+class TestParallelModelBuilder(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        mlflow.set_tracking_uri(f"sqlite:///{os.path.join(self.tmp.name, 'mlflow.db')}")
+        mlflow.set_experiment(experiment_id=mlflow.create_experiment(
+            "test", artifact_location=os.path.join(self.tmp.name, "artifacts")))
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(400, 3))
+        data = pd.DataFrame(X, columns=["feature1", "feature2", "feature3"])
+        data["target"] = (X[:, 0] + 0.5 * X[:, 1] > 0.8).astype(int)
+        self.path = os.path.join(self.tmp.name, "data.csv")
+        data.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        mlflow.set_tracking_uri(None)
+        self.tmp.cleanup()
+
+    def test_candidates_interleave_grids(self):
+        builder = ModelBuilder(data_path=self.path, target_column="target")
+        candidates = builder.candidates(
+            {"Decision Tree": {"max_depth": [2, 4]}, "MLP": {"alpha": [1e-3]}}
+        )
+        n_models = len(builder.models)
+        self.assertEqual([params for _, params in candidates[:n_models]], [{}] * n_models)
+        self.assertEqual(
+            candidates[n_models:],
+            [
+                ("Decision Tree", {"max_depth": 2}),
+                ("MLP", {"alpha": 1e-3}),
+                ("Decision Tree", {"max_depth": 4}),
+            ],
+        )
+
+    def test_parallel_search_keeps_best_fitted_models(self):
+        builder = ModelBuilder(
+            data_path=self.path,
+            target_column="target",
+            n_jobs=2,
+            models=["Logistic Regression", "Decision Tree", "Hist Gradient Boosting"],
+        )
+        builder.split_data(test_size=0.25, random_state=0)
+        results = builder.train_and_evaluate(
+            param_grids={"Decision Tree": {"max_depth": [1, 3]}}
+        )
+        self.assertEqual(set(results), set(builder.models))
+        self.assertEqual(len(builder.candidate_results), 5)
+        for metrics in results.values():
+            self.assertGreater(metrics["fit_time_s"], 0.0)
+            self.assertGreater(metrics["latency_single_ms"], 0.0)
+            self.assertGreaterEqual(metrics["fit_peak_rss_mb"], 0.0)
+            self.assertGreater(metrics["pr_auc"], 0.0)
+        # Candidates and models are ranked on validation only
+        n_val = math.ceil(len(builder.y_train) * VALIDATION_FRACTION)
+        for name, curve in builder.curves.items():
+            self.assertLessEqual(results[name]["f1_score"], curve["f1"].max())
+            self.assertEqual(curve["alerts"][-1], n_val)
+        self.assertEqual(
+            builder.best_model_name, max(results, key=lambda name: results[name]["pr_auc"])
+        )
+        # The test split is scored for the selected model, at its validation threshold
+        selected = results[builder.best_model_name]
+        scores = builder.models[builder.best_model_name].predict_proba(builder.X_test)[:, 1]
+        self.assertEqual(builder.test_metrics["threshold"], selected["threshold"])
+        self.assertEqual(
+            np.mean(scores >= selected["threshold"]), builder.test_metrics["alert_rate"]
+        )
+        self.assertEqual(builder.test_curve["alerts"][-1], len(builder.y_test))
+        # Early stopping keeps the booster well below its max_iter
+        self.assertLess(results["Hist Gradient Boosting"]["n_iterations"], 1000)
+        tree = builder.models["Decision Tree"]
+        self.assertEqual(list(tree.feature_names_in_), ["feature1", "feature2", "feature3"])
+        self.assertEqual(len(tree.predict(builder.X_test.to_numpy())), len(builder.X_test))
+
+    def test_fit_memory_is_measured_per_fit(self):
+        with _FitMemory() as first:
+            block = np.ones(64 * 2**20 // 8)
+            time.sleep(0.05)
+        del block
+        with _FitMemory() as second:
+            time.sleep(0.05)
+        # The second fit does not inherit the first one's high-water mark
+        self.assertGreater(first.peak_mb, 48.0)
+        self.assertLess(second.peak_mb, 16.0)
+
+    def test_registry_skips_missing_libraries(self):
+        register_model("Broken", lambda: __import__("not_a_real_booster"), default=False)
+        try:
+            models = build_models(["Logistic Regression", "Broken"])
+        finally:
+            del MODEL_REGISTRY["Broken"]
+        self.assertEqual(list(models), ["Logistic Regression"])
+
+    def test_target_alert_rate_sets_threshold(self):
+        builder = ModelBuilder(
+            data_path=self.path,
+            target_column="target",
+            models=["Logistic Regression"],
+            target_alert_rate=0.05,
+        )
+        builder.split_data(test_size=0.25, random_state=0)
+        metrics = builder.train_and_evaluate()["Logistic Regression"]
+        scores = builder.models["Logistic Regression"].predict_proba(builder.X_test)[:, 1]
+        # Selected within the budget on the validation split, then applied unchanged
+        self.assertLessEqual(metrics["alert_rate"], 0.05)
+        self.assertAlmostEqual(builder.test_metrics["alert_rate"], 0.05, delta=0.03)
+        self.assertEqual(np.mean(scores >= metrics["threshold"]),
+                         builder.test_metrics["alert_rate"])
+
+    def test_resampling_applies_to_training_split_only(self):
+        for strategy in ("undersample", "weights"):
+            builder = ModelBuilder(
+                data_path=self.path,
+                target_column="target",
+                models=["Logistic Regression", "Hist Gradient Boosting"],
+                resampling=strategy,
+                resampling_ratio=1.0,
+            )
+            builder.split_data(test_size=0.25, random_state=0)
+            results = builder.train_and_evaluate()
+            # Only the fit part is resampled, after the validation split is held out
+            n_val = math.ceil(len(builder.y_train) * VALIDATION_FRACTION)
+            positives = int(builder.y_train.sum()) - round(builder.y_train.mean() * n_val)
+            n_fit = len(builder.y_train) - n_val
+            expected = 2 * positives if strategy == "undersample" else n_fit
+            self.assertEqual(results["Logistic Regression"]["train_rows"], expected)
+            self.assertGreater(results["Hist Gradient Boosting"]["pr_auc"], 0.5)
+            # Scored on the whole, unresampled validation and test splits
+            self.assertEqual(builder.curves["Logistic Regression"]["alerts"][-1], n_val)
+            self.assertEqual(builder.test_curve["alerts"][-1], len(builder.y_test))
+
+    def test_warns_when_sample_weight_is_dropped(self):
+        register_model("KNN", KNeighborsClassifier, default=False)
+        try:
+            builder = ModelBuilder(
+                data_path=self.path,
+                target_column="target",
+                models=["KNN"],
+                resampling="weights",
+            )
+            builder.split_data(test_size=0.25, random_state=0)
+            with self.assertWarnsRegex(UserWarning, "KNN does not accept sample_weight"):
+                results = builder.train_and_evaluate()
+        finally:
+            del MODEL_REGISTRY["KNN"]
+        self.assertIn("KNN", results)
+
+    def test_time_budget_skips_remaining_candidates(self):
+        builder = ModelBuilder(data_path=self.path, target_column="target", time_budget_s=1e-9)
+        builder.split_data(test_size=0.25, random_state=0)
+        # Only the first model's defaults run once the budget is spent
+        results = builder.train_and_evaluate(search=True)
+        self.assertEqual(list(results), [next(iter(builder.models))])
+        self.assertEqual(len(builder.candidate_results), 1)
+
+
 if __name__ == "__main__":
     unittest.main()
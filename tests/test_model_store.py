@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+import joblib
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+from src.evaluation import save_threshold
+from src.model_store import ModelStore
+
+
+class TestModelStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmp_dir.name, "model.pkl")
+        self.X = np.array([[0.0, 1.0], [1.0, 1.0], [2.0, 3.0], [3.0, 5.0]])
+        self.y = [0, 0, 1, 1]
+        joblib.dump(LogisticRegression().fit(self.X, self.y), self.model_path)
+        self.store = ModelStore(self.model_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _replace_model(self, content=None):
+        stat = os.stat(self.model_path)
+        if content is None:
+            joblib.dump(DecisionTreeClassifier().fit(self.X, self.y), self.model_path)
+        else:
+            with open(self.model_path, "wb") as f:
+                f.write(content)
+        # Make the change visible on filesystems with coarse timestamps
+        os.utime(self.model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_loads_bundle(self):
+        bundle = self.store.bundle
+        self.assertIsInstance(bundle.model, LogisticRegression)
+        self.assertEqual(bundle.n_features, 2)
+        self.assertIsNone(bundle.transformer)
+        self.assertEqual(len(bundle.version), 12)
+        self.assertFalse(self.store.reload_if_changed())
+
+    def test_reloads_once_file_is_stable(self):
+        reloaded = []
+        self.store.subscribe(reloaded.append)
+        old_bundle = self.store.bundle
+        self._replace_model()
+
+        # The first poll only notices the change
+        self.assertFalse(self.store.reload_if_changed())
+        self.assertTrue(self.store.reload_if_changed())
+        self.assertIsInstance(self.store.bundle.model, DecisionTreeClassifier)
+        self.assertNotEqual(self.store.bundle.version, old_bundle.version)
+        self.assertEqual(reloaded, [self.store.bundle])
+        self.assertEqual(self.store.reloads, 1)
+
+    def test_failed_reload_keeps_current_bundle(self):
+        bundle = self.store.bundle
+        self._replace_model(b"not a pickle")
+        self.store.reload_if_changed()
+        self.assertFalse(self.store.reload_if_changed())
+        self.assertIs(self.store.bundle, bundle)
+        self.assertIsNotNone(self.store.last_error)
+
+
+    def test_threshold_file_is_loaded_and_watched(self):
+        self.assertIsNone(self.store.bundle.threshold)
+        threshold_path = os.path.join(self.tmp_dir.name, "threshold.json")
+        store = ModelStore(self.model_path, threshold_path=threshold_path)
+        metrics = {"threshold": 0.8, "alert_rate": 0.01, "precision": 0.5,
+                   "recall": 0.4, "f1_score": 0.44}
+        save_threshold(threshold_path, metrics, model_name="Logistic Regression")
+        store.reload_if_changed()
+        self.assertTrue(store.reload_if_changed())
+        self.assertEqual(store.bundle.threshold, 0.8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,244 @@
+import os
+import tempfile
+import unittest
+from collections import namedtuple
+from unittest import mock
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+from src.compiled_model import CompiledModel
+from src.evaluation import load_threshold
+from src.model_store import ModelStore
+from src.online_learning import OnlineUpdater, RollingHoldout, publish_model, update_model
+from src.velocity import VelocityTracker
+
+Message = namedtuple('Message', ['topic', 'partition', 'offset', 'key', 'value'])
+FEATURES = ['purchase_value', 'age']
+
+
+def labeled_events(n, seed):
+    rng = np.random.default_rng(seed)
+    fraud = rng.random(n) < 0.2
+    values = rng.normal(size=n) + np.where(fraud, 2.0, 0.0)
+    return [{'purchase_value': float(v), 'age': float(a), 'class': int(f)}
+            for v, a, f in zip(values, rng.normal(size=n), fraud)]
+
+
+class FakeConsumer:
+    def __init__(self, events):
+        self.messages = [Message('fraud-labels', 0, i, None, e) for i, e in enumerate(events)]
+        self.position = 0
+        self.committed = 0
+
+    def poll(self, timeout_ms=0, max_records=500):
+        available = self.messages[self.position:][:max_records]
+        self.position += len(available)
+        return {0: available} if available else {}
+
+    def commit(self):
+        self.committed = self.position
+
+    def seek(self, partition, offset):
+        self.position = offset
+
+
+class TestRollingHoldout(unittest.TestCase):
+    def test_keeps_most_recent_rows(self):
+        holdout = RollingHoldout(n_features=1, max_rows=4)
+        holdout.add(np.arange(3.0)[:, None], np.array([0, 0, 1]))
+        holdout.add(np.arange(3.0, 6.0)[:, None], np.array([0, 1, 0]))
+        X, y = holdout.arrays()
+        self.assertEqual(sorted(X[:, 0]), [2.0, 3.0, 4.0, 5.0])
+        self.assertTrue(holdout.has_both_classes())
+        holdout.add(np.zeros((10, 1)), np.zeros(10, dtype=int))
+        self.assertEqual(holdout.rows, 4)
+        self.assertFalse(holdout.has_both_classes())
+
+
+class TestOnlineUpdater(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmp.name, 'model.pkl')
+        initial = pd.DataFrame(labeled_events(200, seed=0))
+        self.model = SGDClassifier(loss='log_loss', random_state=0).fit(
+            initial[FEATURES], initial['class'])
+        joblib.dump(self.model, self.model_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def updater(self, events, **kwargs):
+        return OnlineUpdater(FakeConsumer(events), self.model, self.model_path,
+                             min_holdout_rows=50, publish_interval_s=0, **kwargs)
+
+    def test_partial_fit_updates_and_publishes(self):
+        threshold_path = os.path.join(self.tmp.name, 'threshold.json')
+        compiled_path = os.path.join(self.tmp.name, 'model.npz')
+        updater = self.updater(labeled_events(2000, seed=1), threshold_path=threshold_path,
+                               compiled_path=compiled_path, max_records=500,
+                               checkpoint_path=os.path.join(self.tmp.name, 'checkpoint.pkl'))
+        store = ModelStore(self.model_path)
+        before = store.bundle.version
+        while updater.run_once():
+            pass
+        self.assertEqual(updater.consumer.committed, 2000)
+        self.assertEqual(updater.updates, 4)
+        self.assertGreater(updater.publishes, 0)
+        self.assertGreater(updater.holdout.rows, 300)
+
+        # The served store sees the new version once the file is stable
+        store.reload_if_changed()
+        self.assertTrue(store.reload_if_changed())
+        self.assertNotEqual(store.bundle.version, before)
+        X = pd.DataFrame(updater.holdout.arrays()[0], columns=FEATURES)
+        np.testing.assert_allclose(store.bundle.model.predict_proba(X),
+                                   updater.published.predict_proba(X))
+        np.testing.assert_allclose(CompiledModel.load(compiled_path).predict_proba(X.to_numpy()),
+                                   updater.published.predict_proba(X))
+        self.assertGreater(load_threshold(threshold_path), 0.0)
+        self.assertEqual(
+            [name for name in os.listdir(self.tmp.name) if '.tmp' in name], [])
+
+    def test_worse_update_is_not_published(self):
+        updater = self.updater(labeled_events(400, seed=2), tolerance=0.0)
+        updater.holdout.add(np.array([[3.0, 0.0]] * 40 + [[0.0, 0.0]] * 40),
+                            np.array([1] * 40 + [0] * 40))
+        # Labels that contradict the holdout drag the updated model away from it
+        flipped = [dict(e, **{'class': 1 - e['class']}) for e in labeled_events(400, seed=3)]
+        for _ in range(5):
+            updater.model = update_model(updater.model, pd.DataFrame(flipped)[FEATURES],
+                                         np.array([e['class'] for e in flipped]))
+        self.assertFalse(updater.maybe_publish())
+        self.assertEqual(updater.publishes, 0)
+        self.assertLess(updater.last_validation['pr_auc'],
+                        updater.last_validation['published_pr_auc'])
+
+    def test_update_leaves_the_original_model_unchanged(self):
+        coef = self.model.coef_.copy()
+        events = pd.DataFrame(labeled_events(100, seed=6))
+        updated = update_model(self.model, events[FEATURES], events['class'])
+        np.testing.assert_array_equal(self.model.coef_, coef)
+        self.assertFalse(np.array_equal(updated.coef_, coef))
+
+    def test_events_without_labels_are_skipped(self):
+        events = labeled_events(100, seed=5)
+        del events[10]['class']
+        events[11]['class'] = 'unknown'
+        updater = self.updater(events)
+        self.assertEqual(updater.run_once(), 100)
+        self.assertEqual(updater.applied, {0: 100})
+        self.assertEqual(updater.updates, 1)
+
+    def test_failed_publish_does_not_reapply_the_batch(self):
+        updater = self.updater(labeled_events(300, seed=7), max_records=300, tolerance=1.0)
+        with mock.patch('src.online_learning.publish_model', side_effect=OSError('disk full')):
+            for _ in range(3):
+                with self.assertRaises(OSError):
+                    updater.run_once()
+                # The failed batch is polled again, but not trained on or held out again
+                updater.consumer.seek(0, 0)
+        self.assertEqual(updater.updates, 1)
+        holdout_rows = updater.holdout.rows
+        self.assertEqual(updater.run_once(), 0)
+        self.assertEqual(updater.holdout.rows, holdout_rows)
+        self.assertEqual(updater.publishes, 1)
+        self.assertEqual(updater.consumer.committed, 300)
+
+    def test_restart_resumes_from_checkpoint(self):
+        events = labeled_events(1200, seed=9)
+        checkpoint_path = os.path.join(self.tmp.name, 'checkpoint.pkl')
+        updater = self.updater(events, max_records=400, checkpoint_path=checkpoint_path)
+        updater.run_once()
+        updater.run_once()
+        self.assertEqual(updater.consumer.committed, 800)
+
+        # The updater restarts and the broker redelivers from the start
+        restarted = self.updater(events, max_records=400, checkpoint_path=checkpoint_path)
+        self.assertEqual(restarted.applied, {0: 800})
+        self.assertEqual(restarted.holdout.rows, updater.holdout.rows)
+        np.testing.assert_array_equal(restarted.model.coef_, updater.model.coef_)
+        # Messages below the checkpointed offsets are skipped when delivered again
+        self.assertEqual([restarted.run_once() for _ in range(3)], [0, 0, 400])
+        self.assertEqual(restarted.updates, 3)
+
+    def test_without_checkpoint_offsets_wait_for_a_publish(self):
+        updater = self.updater(labeled_events(600, seed=10), max_records=600)
+        with mock.patch.object(updater, 'maybe_publish', return_value=False):
+            updater.run_once()
+        self.assertEqual(updater.consumer.committed, 0)
+        updater.tolerance = 1.0
+        updater.run_once()
+        self.assertEqual(updater.publishes, 1)
+        self.assertEqual(updater.consumer.committed, 600)
+
+    def test_velocity_features_are_added_and_checkpointed(self):
+        features = FEATURES + ['device_id_txn_1h']
+        events = labeled_events(100, seed=11)
+        for i, event in enumerate(events):
+            event['purchase_time'] = f'2015-01-01 10:{i % 60:02d}:00'
+            event['device_id'] = 'A' if i < 50 else 'B'
+        initial = pd.DataFrame(events).assign(device_id_txn_1h=1.0)
+        model = SGDClassifier(loss='log_loss', random_state=0).fit(
+            initial[features], initial['class'])
+        checkpoint_path = os.path.join(self.tmp.name, 'checkpoint.pkl')
+        updater = OnlineUpdater(FakeConsumer(events), model, self.model_path,
+                                checkpoint_path=checkpoint_path, velocity=VelocityTracker(),
+                                min_holdout_rows=10, publish_interval_s=0)
+        X = updater._encode(events[:3] + [{**events[3], 'device_id_txn_1h': 7.0}])
+        # Counts the event was scored with take precedence over the tracker's
+        np.testing.assert_array_equal(np.asarray(X)[:, 2], [1.0, 2.0, 3.0, 7.0])
+        updater.run_once()
+
+        restarted = OnlineUpdater(FakeConsumer(events), model, self.model_path,
+                                  checkpoint_path=checkpoint_path, velocity=VelocityTracker(),
+                                  min_holdout_rows=10, publish_interval_s=0)
+        self.assertEqual(len(restarted.velocity), 2)
+        peek = restarted.velocity.update(events[-1], add=False)
+        self.assertEqual(peek, updater.velocity.update(events[-1], add=False))
+
+    def test_rewound_batch_counts_velocity_once(self):
+        features = FEATURES + ['device_id_txn_1h']
+        events = labeled_events(20, seed=12)
+        for i, event in enumerate(events):
+            event['purchase_time'] = f'2015-01-01 10:{i:02d}:00'
+            event['device_id'] = 'A'
+        initial = pd.DataFrame(events).assign(device_id_txn_1h=1.0)
+        model = SGDClassifier(loss='log_loss', random_state=0).fit(
+            initial[features], initial['class'])
+        updater = OnlineUpdater(FakeConsumer(events), model, self.model_path,
+                                velocity=VelocityTracker(), min_holdout_rows=1000)
+        with mock.patch.object(updater.holdout, 'add', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                updater.run_once()
+        self.assertEqual(updater.run_once(), 20)
+        peek = updater.velocity.update({'purchase_time': '2015-01-01 10:30:00',
+                                        'device_id': 'A'}, add=False)
+        self.assertEqual(peek['device_id_txn_1h'], 21)
+
+    def test_models_that_cannot_compile_publish_without_compiled_copy(self):
+        compiled_path = os.path.join(self.tmp.name, 'model.npz')
+        with mock.patch('src.online_learning.compile_model',
+                        side_effect=TypeError('LGBMClassifier cannot be compiled')):
+            updater = self.updater(labeled_events(600, seed=8), compiled_path=compiled_path,
+                                   max_records=600, tolerance=1.0)
+            self.assertEqual(updater.run_once(), 600)
+            # publish_model skips the compiled copy on its own as well
+            publish_model(updater.model, self.model_path, compiled_path)
+        self.assertEqual(updater.publishes, 1)
+        self.assertFalse(os.path.exists(compiled_path))
+
+    def test_rejects_models_without_incremental_updates(self):
+        model = RandomForestClassifier(n_estimators=2).fit([[0.0], [1.0]], [0, 1])
+        with self.assertRaises(TypeError):
+            OnlineUpdater(FakeConsumer([]), model, self.model_path)
+
+    def test_publish_is_atomic_rename(self):
+        path = os.path.join(self.tmp.name, 'nested', 'published.pkl')
+        publish_model(self.model, path)
+        self.assertEqual(joblib.load(path).coef_.tolist(), self.model.coef_.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
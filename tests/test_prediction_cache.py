@@ -0,0 +1,73 @@
+import time
+import unittest
+import numpy as np
+from src.prediction_cache import LocalCache, PredictionCache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value.encode()
+
+
+class BrokenRedis:
+    def get(self, key):
+        raise ConnectionError("redis is down")
+
+    def setex(self, key, ttl, value):
+        raise ConnectionError("redis is down")
+
+
+class TestPredictionCache(unittest.TestCase):
+    def setUp(self):
+        self.result = {'prediction': 1, 'probability': 0.9, 'model_version': 'v1'}
+
+    def test_key_is_canonical(self):
+        cache = PredictionCache(model_version='v1')
+        self.assertEqual(cache.key(np.array([0.0, 1.5])), cache.key([-0.0, 1.5]))
+        self.assertNotEqual(cache.key([0.0, 1.5]), cache.key([1.5, 0.0]))
+
+    def test_redis_hit_populates_local_tier(self):
+        redis_client = FakeRedis()
+        PredictionCache(redis_client, model_version='v1').set('k', self.result)
+
+        cache = PredictionCache(redis_client, model_version='v1')
+        self.assertEqual(cache.get('k'), self.result)
+        self.assertEqual(cache.get('k'), self.result)
+        stats = cache.stats()
+        self.assertEqual(stats['redis']['hits'], 1)
+        self.assertEqual(stats['local']['hits'], 1)
+
+    def test_model_version_change_invalidates(self):
+        cache = PredictionCache(FakeRedis(), model_version='v1')
+        row = [1.0, 2.0]
+        cache.set(cache.key(row), self.result)
+        cache.set_model_version('v2')
+        self.assertIsNone(cache.get(cache.key(row)))
+
+    def test_redis_failure_falls_back_to_local_tier(self):
+        cache = PredictionCache(BrokenRedis(), model_version='v1', retry_interval=60)
+        cache.set('k', self.result)
+        self.assertEqual(cache.get('k'), self.result)
+        self.assertIsNone(cache.get('other'))
+        self.assertEqual(cache.stats()['redis']['errors'], 1)
+
+    def test_local_cache_evicts_and_expires(self):
+        local = LocalCache(max_size=2, ttl=0.05)
+        local.set('a', 1)
+        local.set('b', 2)
+        local.get('a')
+        local.set('c', 3)
+        self.assertIsNone(local.get('b'))
+        self.assertEqual(local.get('a'), 1)
+        time.sleep(0.06)
+        self.assertIsNone(local.get('a'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.neural_network import MLPClassifier
+from src.reason_codes import ReasonCodeExplainer, top_contributions
+
+
+class TestReasonCodeExplainer(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = pd.DataFrame(rng.normal(size=(300, 4)), columns=['a', 'b', 'c', 'd'])
+        self.y = (2 * self.X['a'] - self.X['c'] > 0.5).astype(int)
+
+    def test_linear_contributions_add_up_to_log_odds(self):
+        model = LogisticRegression().fit(self.X, self.y)
+        explainer = ReasonCodeExplainer.build(model, self.X)
+        self.assertEqual(explainer.kind, 'linear')
+        contributions = explainer.contributions(self.X.iloc[:10])
+        np.testing.assert_allclose(contributions.sum(axis=1) + explainer.base_value,
+                                   model.decision_function(self.X.iloc[:10]))
+
+    def test_tree_contributions_add_up_to_probabilities(self):
+        model = RandomForestClassifier(n_estimators=20, random_state=0).fit(self.X, self.y)
+        explainer = ReasonCodeExplainer.build(model, self.X)
+        self.assertEqual(explainer.kind, 'tree')
+        contributions = explainer.contributions(self.X.to_numpy()[:10])
+        np.testing.assert_allclose(contributions.sum(axis=1) + explainer.base_value,
+                                   model.predict_proba(self.X.iloc[:10])[:, 1], atol=1e-6)
+
+    def test_surrogate_for_other_models(self):
+        model = MLPClassifier(hidden_layer_sizes=(8,), max_iter=500, random_state=0)
+        model.fit(self.X, self.y)
+        explainer = ReasonCodeExplainer.build(model, self.X)
+        self.assertEqual(explainer.kind, 'surrogate')
+        self.assertGreater(explainer.surrogate_r2, 0.5)
+        top = explainer.explain(self.X.iloc[:1], top_k=2)[0]['top_features']
+        self.assertEqual({feature['feature'] for feature in top}, {'a', 'c'})
+
+    def test_explain_top_k_is_sorted(self):
+        top = top_contributions(np.array([0.1, -0.5, 0.3]), np.array([1.0, 2.0, 3.0]),
+                                ['a', 'b', 'c'], top_k=2)
+        self.assertEqual([feature['feature'] for feature in top], ['b', 'c'])
+        self.assertEqual(top[0], {'feature': 'b', 'value': 2.0, 'contribution': -0.5})
+
+    def test_save_and_load_rebuilds_tree_explainer(self):
+        model = RandomForestClassifier(n_estimators=5, random_state=0).fit(self.X, self.y)
+        explainer = ReasonCodeExplainer.build(model, self.X)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'reason_explainer.pkl')
+            explainer.save(path)
+            loaded = ReasonCodeExplainer.load(path)
+        self.assertIsNotNone(loaded._tree_explainer)
+        np.testing.assert_allclose(loaded.contributions(self.X.iloc[:3]),
+                                   explainer.contributions(self.X.iloc[:3]))
+
+
+if __name__ == '__main__':
+    unittest.main()
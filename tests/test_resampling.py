@@ -0,0 +1,62 @@
+import unittest
+import numpy as np
+from src.resampling import class_weights, resample
+
+
+class TestResampling(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(3000, 4))
+        self.y = (rng.random(3000) < 0.02).astype(int)
+        self.X[self.y == 1] += 2.0
+        self.n_positive = int(self.y.sum())
+
+    def test_undersampling_keeps_every_positive(self):
+        for strategy in ("undersample", "cluster"):
+            X, y, weights = resample(self.X, self.y, strategy, ratio=4)
+            self.assertIsNone(weights)
+            self.assertEqual(int(y.sum()), self.n_positive)
+            self.assertEqual(len(y), self.n_positive * 5)
+            # Kept rows are original rows, not copies of other rows
+            np.testing.assert_array_equal(self.X[self.y == 1], X[y == 1])
+            self.assertEqual(len(np.unique(X, axis=0)), len(X))
+
+    def test_undersampling_is_deterministic(self):
+        first = resample(self.X, self.y, "undersample", random_state=1)[0]
+        np.testing.assert_array_equal(first, resample(self.X, self.y, "undersample", random_state=1)[0])
+
+    def test_smote_reaches_ratio_inside_the_minority_hull(self):
+        X, y, _ = resample(self.X, self.y, "smote", ratio=10)
+        n_negative = len(self.y) - self.n_positive
+        self.assertEqual(int(y.sum()), int(np.ceil(n_negative / 10)))
+        np.testing.assert_array_equal(X[: len(self.X)], self.X)
+        positives = self.X[self.y == 1]
+        synthetic = X[len(self.X):]
+        self.assertTrue((synthetic >= positives.min(axis=0)).all())
+        self.assertTrue((synthetic <= positives.max(axis=0)).all())
+
+    def test_smote_leaves_balanced_data_alone(self):
+        y = np.array([0, 1] * 10)
+        X, y_out, _ = resample(self.X[:20], y, "smote", ratio=1)
+        self.assertEqual(len(X), 20)
+        self.assertEqual(len(y_out), 20)
+
+    def test_weights_emulate_ratio(self):
+        X, y, weights = resample(self.X, self.y, "weights", ratio=4)
+        self.assertIs(X, self.X)
+        n_negative = len(self.y) - self.n_positive
+        self.assertAlmostEqual(weights[y == 1].sum(), n_negative / 4)
+        self.assertTrue((weights[y == 0] == 1).all())
+        # Never down-weights positives that are already common enough
+        self.assertTrue((class_weights(np.array([0, 1, 1]), ratio=5) == 1).all())
+
+    def test_none_and_unknown_strategy(self):
+        X, y, weights = resample(self.X, self.y, "none")
+        self.assertIs(X, self.X)
+        self.assertIsNone(weights)
+        with self.assertRaises(ValueError):
+            resample(self.X, self.y, "oversample")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import os
+import tempfile
+import unittest
+import joblib
+import numpy as np
+import pandas as pd
+from flask_jwt_extended import create_access_token
+from sklearn.linear_model import LogisticRegression
+from src.evaluation import save_threshold
+from src.reason_codes import ReasonCodeExplainer
+from src.serve_model import create_app
+
+
+class TestServeModel(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        X = np.array([[0.0, 1.0], [1.0, 1.0], [2.0, 3.0], [3.0, 5.0]])
+        self.model_path = os.path.join(self.tmp_dir.name, "model.pkl")
+        joblib.dump(LogisticRegression().fit(X, [0, 0, 1, 1]), self.model_path)
+        self.app = self._create_app()
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            self.headers = {"Authorization": f"Bearer {create_access_token(identity='test')}"}
+
+    def _create_app(self, **config):
+        return create_app({
+            "MODEL_PATH": self.model_path,
+            "LOG_FILE": os.path.join(self.tmp_dir.name, "audit.log"),
+            "INSIGHTS_PATH": os.path.join(self.tmp_dir.name, "insights.json"),
+            "JWT_SECRET_KEY": "test-secret-key-with-at-least-32-bytes",
+            # Nothing listens here, so the cache runs on its local tier only
+            "REDIS_HOST": "127.0.0.1",
+            "REDIS_PORT": 1,
+            **config,
+        })
+
+    def tearDown(self):
+        self.app.extensions["scoring"].audit_log.close()
+        self.tmp_dir.cleanup()
+
+    def test_apps_have_separate_services(self):
+        other = create_app(dict(self.app.config))
+        self.assertIsNot(other.extensions["scoring"], self.app.extensions["scoring"])
+        other.extensions["scoring"].audit_log.close()
+
+    def test_predict_and_ready(self):
+        response = self.client.post(
+            "/predict", json={"features": [3.0, 5.0]}, headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["prediction"], 1)
+        self.assertEqual(self.client.post("/predict", json={}).status_code, 401)
+
+        response = self.client.get("/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["pid"], os.getpid())
+
+    def test_malformed_features_are_rejected(self):
+        for features in ([3.0], [3.0, 5.0, 1.0], [[3.0, 5.0]], ["a", "b"], None):
+            response = self.client.post(
+                "/predict", json={"features": features}, headers=self.headers
+            )
+            self.assertEqual(response.status_code, 400, features)
+        response = self.client.post(
+            "/predict/batch", json=[[3.0, 5.0], [3.0]], headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+        # Concurrent well-formed requests are unaffected
+        response = self.client.post(
+            "/predict", json={"features": [3.0, 5.0]}, headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_rejected_requests_add_no_velocity_events(self):
+        X = pd.DataFrame({'purchase_value': [10.0, 20.0, 200.0, 300.0],
+                          'user_id_txn_1h': [1.0, 1.0, 4.0, 6.0]})
+        joblib.dump(LogisticRegression().fit(X, [0, 0, 1, 1]), self.model_path)
+        app = self._create_app(VELOCITY_STORE="local")
+        client = app.test_client()
+        transaction = {'user_id': 7, 'purchase_time': "2024-01-01 10:00:00"}
+        for payload in ({'features': {**transaction, 'purchase_value': "a lot"}},
+                        {'features': transaction}, {'features': "abc"}, {'features': 5},
+                        {}, [transaction], "abc"):
+            response = client.post("/predict", json=payload, headers=self.headers)
+            self.assertEqual(response.status_code, 400, payload)
+        response = client.post("/predict/batch", headers=self.headers,
+                               json=[{**transaction, 'purchase_value': 10.0}, transaction])
+        self.assertEqual(response.status_code, 400)
+
+        velocity = app.extensions["scoring"].velocity
+        self.assertEqual(velocity.update(transaction, add=False)['user_id_txn_1h'], 1.0)
+        response = client.post("/predict", json={'features': {**transaction, 'purchase_value': 10.0}},
+                               headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(velocity.update(transaction, add=False)['user_id_txn_1h'], 2.0)
+        app.extensions["scoring"].audit_log.close()
+
+    def test_explain_validates_top_k(self):
+        X = np.array([[0.0, 1.0], [1.0, 1.0], [2.0, 3.0], [3.0, 5.0]])
+        ReasonCodeExplainer.build(joblib.load(self.model_path), X, ["amount", "age"]).save(
+            os.path.join(self.tmp_dir.name, "reason_explainer.pkl"))
+        app = self._create_app()
+        client = app.test_client()
+        for top_k, status in ((2, 200), (0, 400), (3, 400), (-1, 400), ("2", 400), (True, 400)):
+            response = client.post("/explain", json={"features": [3.0, 5.0], "top_k": top_k},
+                                   headers=self.headers)
+            self.assertEqual(response.status_code, status, top_k)
+        # The default EXPLAIN_TOP_K of 5 is capped at the two features
+        response = client.post("/explain", json={"features": [3.0, 5.0]}, headers=self.headers)
+        self.assertEqual(len(response.get_json()["top_features"]), 2)
+        app.extensions["scoring"].audit_log.close()
+
+    def test_insights_are_shared_through_the_file(self):
+        other = self._create_app()
+        for client in (self.client, other.test_client()):
+            response = client.post(
+                "/predict", json={"features": [3.0, 5.0]}, headers=self.headers
+            )
+            self.assertEqual(response.status_code, 200)
+        self.app.extensions["scoring"].flush_insights()
+        other.extensions["scoring"].flush_insights()
+        # Each app serves the counts of both once it has flushed
+        response = other.test_client().get("/fraud-insights")
+        self.assertEqual(response.get_json()["total_transactions"], 2)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir.name, "insights.json")))
+        other.extensions["scoring"].audit_log.close()
+
+    def test_tuned_threshold_is_applied(self):
+        save_threshold(
+            os.path.join(self.tmp_dir.name, "threshold.json"),
+            {"threshold": 0.999, "alert_rate": 0.0, "precision": 1.0,
+             "recall": 0.1, "f1_score": 0.2},
+        )
+        for config, expected in (({}, 0), ({"PREDICTION_THRESHOLD": 0.01}, 1)):
+            app = self._create_app(**config)
+            client = app.test_client()
+            response = client.post(
+                "/predict/batch", json=[[3.0, 5.0]], headers=self.headers
+            )
+            self.assertEqual(response.get_json()["predictions"][0]["prediction"], expected)
+            app.extensions["scoring"].audit_log.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.data_cleaner import DataCleaner
+from src.feature_engineer import FeatureEngineer
+from src.streaming_pipeline import StreamingPipeline
+
+
+class TestStreamingPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmp_dir.name, "Fraud_Data.csv")
+        self.output_path = os.path.join(self.tmp_dir.name, "processed.csv")
+        self.df = pd.DataFrame({
+            'purchase_time': ['2015-04-18 02:47:11', '2015-06-08 01:38:54',
+                              '2015-04-18 02:47:11', '2015-01-01 10:00:00',
+                              '2015-02-02 11:00:00'],
+            'purchase_value': [34, 16, 34, 20, None],
+            'source': ['SEO', 'Ads', 'SEO', 'Direct', 'Ads'],
+            'ip_address': ['10.0.0.5', '10.0.0.20', '10.0.0.5', '1.1.1.1', '10.0.0.5'],
+            'class': [0, 1, 0, 0, 1]
+        })
+        self.df.to_csv(self.input_path, index=False)
+        self.ip_country_df = pd.DataFrame({
+            'lower_bound_ip_address': [167772160, 167772170],
+            'upper_bound_ip_address': [167772165, 167772200],
+            'country': ['DE', 'FR']
+        })
+        self.columns_to_drop = ['purchase_time', 'ip_address',
+                                'lower_bound_ip_address', 'upper_bound_ip_address']
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_matches_in_memory_pipeline(self):
+        pipeline = StreamingPipeline(
+            ip_country=self.ip_country_df,
+            categorical_columns=['source', 'country'],
+            columns_to_drop=self.columns_to_drop,
+            chunk_size=2
+        )
+        rows = pipeline.run(self.input_path, self.output_path)
+
+        expected = pd.read_csv(self.input_path)
+        expected = DataCleaner.handle_missing_values(expected)
+        expected = DataCleaner.remove_duplicates(expected)
+        expected = DataCleaner.correct_data_types(expected)
+        expected = FeatureEngineer.add_time_features(expected)
+        expected = FeatureEngineer.merge_with_geolocation(expected, self.ip_country_df)
+        expected = FeatureEngineer.drop_unnecessary_columns(expected, self.columns_to_drop)
+        expected = FeatureEngineer.encode_categorical_features(expected, ['source', 'country'])
+        expected.to_csv(os.path.join(self.tmp_dir.name, "expected.csv"), index=False)
+
+        self.assertEqual(rows, 3)
+        pd.testing.assert_frame_equal(
+            pd.read_csv(self.output_path),
+            pd.read_csv(os.path.join(self.tmp_dir.name, "expected.csv"))
+        )
+
+    def test_velocity_matches_in_memory_pipeline_on_unsorted_input(self):
+        rng = np.random.default_rng(0)
+        n = 300
+        df = pd.DataFrame({
+            'signup_time': ['2015-01-01 00:00:00'] * n,
+            'purchase_time': (pd.Timestamp('2015-01-02')
+                              + pd.to_timedelta(rng.integers(0, 2 * 86400, n), unit='s')
+                              ).astype(str),
+            'device_id': rng.integers(0, 10, n).astype(str),
+            'user_id': rng.integers(0, 30, n),
+            'source': rng.choice(['SEO', 'Ads'], n),
+            'ip_address': rng.integers(167772160, 167772200, n).astype(float),
+            'class': rng.integers(0, 2, n),
+        })
+        df = pd.concat([df, df.iloc[:20]], ignore_index=True)
+        df.to_csv(self.input_path, index=False)
+        columns_to_drop = ['signup_time', 'purchase_time', 'device_id', 'ip_address',
+                           'lower_bound_ip_address', 'upper_bound_ip_address']
+        pipeline = StreamingPipeline(
+            ip_country=self.ip_country_df,
+            categorical_columns=['source', 'country'],
+            columns_to_drop=columns_to_drop,
+            chunk_size=37,
+            velocity=True,
+        )
+        rows = pipeline.run(self.input_path, self.output_path)
+
+        expected = pd.read_csv(self.input_path)
+        expected = DataCleaner.handle_missing_values(expected)
+        expected = DataCleaner.remove_duplicates(expected)
+        expected = DataCleaner.correct_data_types(expected)
+        expected = FeatureEngineer.add_time_features(expected)
+        expected = FeatureEngineer.add_signup_to_purchase(expected)
+        expected = FeatureEngineer.add_velocity_features(expected)
+        expected = FeatureEngineer.merge_with_geolocation(expected, self.ip_country_df)
+        expected = FeatureEngineer.drop_unnecessary_columns(expected, columns_to_drop)
+        expected = FeatureEngineer.encode_categorical_features(expected, ['source', 'country'])
+        expected_path = os.path.join(self.tmp_dir.name, "expected.csv")
+        expected.to_csv(expected_path, index=False)
+
+        self.assertEqual(rows, n)
+        self.assertIn('device_id_txn_1h', pipeline.columns)
+        pd.testing.assert_frame_equal(pd.read_csv(self.output_path), pd.read_csv(expected_path))
+
+    def test_drop_seen_duplicates_across_chunks(self):
+        pipeline = StreamingPipeline(
+            ip_country=self.ip_country_df,
+            categorical_columns=['source'],
+            columns_to_drop=[]
+        )
+        rng = np.random.default_rng(1)
+        frames = [pd.DataFrame({'a': rng.integers(0, 50, 40)}) for _ in range(5)]
+        kept = pd.concat([pipeline.drop_seen_duplicates(frame) for frame in frames])
+        expected = pd.concat(frames).drop_duplicates()
+        self.assertEqual(kept['a'].tolist(), expected['a'].tolist())
+        hashes = pipeline._seen_hashes
+        self.assertTrue(np.all(hashes[1:] > hashes[:-1]))
+        self.assertEqual(len(pipeline._seen_hashes), len(expected))
+
+    def test_estimate_chunk_size(self):
+        pipeline = StreamingPipeline(
+            ip_country=self.ip_country_df,
+            categorical_columns=['source'],
+            columns_to_drop=[],
+            max_memory_mb=1
+        )
+        self.assertGreater(pipeline.estimate_chunk_size(self.input_path), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.feature_engineer import FeatureEngineer
+from src.velocity import (
+    RedisVelocityTracker,
+    VelocityTracker,
+    create_tracker,
+    velocity_counts,
+)
+
+
+class FakeRedis:
+    """
+    The sorted-set commands RedisVelocityTracker pipelines, applied in order.
+    """
+
+    def __init__(self):
+        self.sets = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        return [getattr(self, f"_{name}")(*args) for name, args in self.commands]
+
+    def _zadd(self, name, mapping):
+        self.redis.sets.setdefault(name, {}).update(mapping)
+        return len(mapping)
+
+    def _zremrangebyscore(self, name, low, high):
+        members = self.redis.sets.get(name, {})
+        removed = [member for member, score in members.items() if score <= high]
+        for member in removed:
+            del members[member]
+        return len(removed)
+
+    def _expire(self, name, seconds):
+        return True
+
+    def _zcount(self, name, low, high):
+        low = float(low.lstrip("("))
+        return sum(low < score <= high for score in self.redis.sets.get(name, {}).values())
+
+
+class BrokenRedis:
+    def pipeline(self):
+        raise ConnectionError("redis is down")
+
+
+class TestVelocity(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'purchase_time': pd.to_datetime(['2015-01-01 10:00:00', '2015-01-01 10:30:00',
+                                             '2015-01-01 10:30:00', '2015-01-01 11:00:00',
+                                             '2015-01-01 12:00:00', '2015-01-02 11:00:00']),
+            'signup_time': pd.to_datetime(['2015-01-01 09:00:00'] * 6),
+            'device_id': ['A', 'A', 'B', 'A', 'A', None],
+            'ip_address': [1.5, 2.5, 1.5, 1.5, 1.5, 1.5]
+        })
+        self.windows = {'1h': 3600, '24h': 86400}
+
+    def test_batch_counts(self):
+        counts = velocity_counts(self.df, ['device_id'], self.windows)
+        # The 1h window is (t - 1h, t]: the 10:00 event has left it at 11:00
+        np.testing.assert_array_equal(counts['device_id_txn_1h'][:5], [1, 2, 1, 2, 1])
+        np.testing.assert_array_equal(counts['device_id_txn_24h'][:5], [1, 2, 1, 3, 4])
+        self.assertTrue(np.isnan(counts['device_id_txn_1h'][5]))
+
+    def test_batch_counts_ignore_row_order(self):
+        shuffled = self.df.sample(frac=1, random_state=0)
+        counts = velocity_counts(shuffled, ['device_id', 'ip_address'], self.windows)
+        expected = velocity_counts(self.df, ['device_id', 'ip_address'], self.windows)
+        for name, values in expected.items():
+            pd.testing.assert_series_equal(
+                pd.Series(counts[name], index=shuffled.index).sort_index(),
+                pd.Series(values, index=self.df.index)
+            )
+
+    def test_online_matches_batch(self):
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            'purchase_time': pd.Timestamp('2015-01-01')
+            + pd.to_timedelta(np.sort(rng.integers(0, 3 * 86400, 2000)), unit='s'),
+            'device_id': rng.integers(0, 50, 2000).astype(str),
+            'ip_address': rng.integers(0, 20, 2000) * 1.5,
+            'user_id': rng.integers(0, 500, 2000)
+        })
+        expected = velocity_counts(df)
+        tracker = VelocityTracker()
+        online = tracker.update_frame(df)
+        for name, values in expected.items():
+            np.testing.assert_array_equal(online[name].to_numpy(), values)
+        # Keys idle for longer than the largest window are dropped
+        self.assertLess(len(tracker), 50 + 20 + 500)
+
+    def test_online_late_events_do_not_count_later_ones(self):
+        tracker = VelocityTracker(keys=['device_id'], windows={'1h': 3600})
+        times = ['2015-01-01 05:00:00', '2015-01-01 01:00:00',
+                 '2015-01-01 04:30:00', '2015-01-01 05:10:00']
+        counts = [tracker.update({'purchase_time': t, 'device_id': 'A'})['device_id_txn_1h']
+                  for t in times]
+        # Each event counts the events seen so far in (t - 1h, t]
+        self.assertEqual(counts, [1, 1, 1, 3])
+        peek = tracker.update({'purchase_time': '2015-01-01 04:45:00', 'device_id': 'A'},
+                              add=False)
+        self.assertEqual(peek['device_id_txn_1h'], 2)
+
+    def test_online_from_raw_records(self):
+        tracker = VelocityTracker(keys=['device_id'], windows=self.windows)
+        records = [{'purchase_time': str(t), 'device_id': d}
+                   for t, d in zip(self.df['purchase_time'], self.df['device_id'])]
+        counts = [tracker.update(record)['device_id_txn_24h'] for record in records[:5]]
+        self.assertEqual(counts, [1, 2, 1, 3, 4])
+        self.assertTrue(np.isnan(tracker.update(records[5])['device_id_txn_1h']))
+
+    def test_peek_does_not_record(self):
+        tracker = VelocityTracker(keys=['device_id'], windows=self.windows)
+        record = {'purchase_time': '2015-01-01 10:00:00', 'device_id': 'A'}
+        tracker.update(record)
+        self.assertEqual(tracker.update(record, add=False)['device_id_txn_1h'], 2)
+        self.assertEqual(tracker.update(record)['device_id_txn_1h'], 2)
+
+    def test_max_keys_evicts_least_recent(self):
+        tracker = VelocityTracker(keys=['device_id'], windows=self.windows, max_keys=2)
+        for device in ['A', 'B', 'C']:
+            tracker.update({'purchase_time': '2015-01-01 10:00:00', 'device_id': device})
+        self.assertEqual(len(tracker), 2)
+        self.assertEqual(tracker.evicted, 1)
+
+    def test_redis_tracker_shares_counts_between_workers(self):
+        redis_client = FakeRedis()
+        workers = [RedisVelocityTracker(redis_client, keys=['device_id'], windows=self.windows)
+                   for _ in range(2)]
+        local = VelocityTracker(keys=['device_id'], windows=self.windows)
+        records = [{'purchase_time': str(t), 'device_id': d}
+                   for t, d in zip(self.df['purchase_time'], self.df['device_id'])]
+        for i, record in enumerate(records):
+            expected = local.update(record)
+            counts = workers[i % 2].update(record)
+            np.testing.assert_array_equal(list(counts.values()), list(expected.values()))
+        peek = workers[0].update(records[4], add=False)
+        self.assertEqual(peek, local.update(records[4], add=False))
+
+    def test_redis_tracker_falls_back_to_local_counts(self):
+        tracker = RedisVelocityTracker(BrokenRedis(), keys=['device_id'], windows=self.windows,
+                                       retry_interval=60)
+        record = {'purchase_time': '2015-01-01 10:00:00', 'device_id': 'A'}
+        self.assertEqual(tracker.update(record)['device_id_txn_1h'], 1)
+        self.assertEqual(tracker.update(record)['device_id_txn_1h'], 2)
+        self.assertEqual(tracker.errors, 1)
+
+    def test_create_tracker(self):
+        self.assertIsNone(create_tracker(['purchase_value']))
+        self.assertIsInstance(create_tracker(['device_id_txn_1h'], 'local'), VelocityTracker)
+        tracker = create_tracker(['device_id_txn_1h'], prefix='velocity-labels')
+        self.assertIsInstance(tracker, RedisVelocityTracker)
+        self.assertEqual(tracker.prefix, 'velocity-labels')
+
+    def test_feature_engineer_adds_features(self):
+        df = FeatureEngineer.add_signup_to_purchase(self.df.copy())
+        df = FeatureEngineer.add_velocity_features(df, keys=['device_id'], windows=self.windows)
+        self.assertEqual(df['signup_to_purchase_s'].iloc[0], 3600)
+        self.assertIn('device_id_txn_1h', df.columns)
+
+
+if __name__ == "__main__":
+    unittest.main()